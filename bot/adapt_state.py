@@ -0,0 +1,191 @@
+"""
+Estado adaptativo dos scrapers (antes: debug/viajala_adapt.json reescrito
+inteiro várias vezes por URL).
+
+Fica no SQLite (state_store.adapt_*) com cache em memória por processo:
+- values: chave -> JSON (preferred_dest, last_run, run_metrics...), última escrita vence;
+- counters: incrementos atômicos (airport_url_failed...);
+- selectors: tries/hits acumulados por seletor (relatório); a ordem dos
+  seletores e a espera longa usam o histórico recente (values
+  "selector_recent", decaimento por tentativa com meia-vida
+  ADAPT_SELECTOR_HALF_LIFE_TRIES), para reagir logo a mudança no DOM.
+
+As mudanças ficam pendentes até flush() (uma transação); com write-behind
+ligado o flush fica para o hook do WriteBehindStore.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bot.config import ADAPT_SELECTOR_DEAD_AFTER, ADAPT_SELECTOR_HALF_LIFE_TRIES
+
+logger = logging.getLogger("kiwi_bot")
+
+_SELECTOR_DECAY = 0.5 ** (1 / ADAPT_SELECTOR_HALF_LIFE_TRIES)
+
+
+class AdaptState:
+    def __init__(self, provider: str, *, legacy_json: Optional[str] = None):
+        self.provider = provider
+        self.legacy_json = legacy_json
+        self.buffered = False
+        self._lock = threading.RLock()
+        self._db: Optional[str] = None
+        self._values: Dict[str, Any] = {}
+        self._counters: Dict[str, int] = {}
+        self._selectors: Dict[str, Dict[str, int]] = {}
+        self._dirty: Dict[str, Any] = {}
+        self._counter_delta: Dict[str, int] = {}
+        self._selector_delta: Dict[str, List[int]] = {}
+
+    # ====== CACHE ======
+
+    def _ensure_loaded(self) -> None:
+        import state_store
+
+        db = state_store.DB_PATH
+        if self._db == db:
+            return
+        # Outro banco (testes, --db): descarta cache e pendências do anterior
+        self._flush_to(self._db)
+        data = state_store.adapt_load(self.provider)
+        if not data["values"] and not data["selectors"] and self.legacy_json:
+            data = self._import_legacy(data)
+        self._values, self._counters, self._selectors = data["values"], data["counters"], data["selectors"]
+        self._dirty, self._counter_delta, self._selector_delta = {}, {}, {}
+        self._db = db
+
+    def _import_legacy(self, data: dict) -> dict:
+        """Migra o viajala_adapt.json antigo na primeira carga (banco sem estado)."""
+        import state_store
+
+        try:
+            with open(self.legacy_json, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return data
+        values = {k: v for k, v in legacy.items() if k not in ("selector_success", "viajala_stats")}
+        counters = {k: int(v) for k, v in (legacy.get("viajala_stats") or {}).items() if isinstance(v, (int, float))}
+        selectors = {sel: (int(h), int(h)) for sel, h in (legacy.get("selector_success") or {}).items()}
+        state_store.adapt_write(self.provider, values, counters, selectors)
+        logger.info(f"[ADAPT] {self.provider}: estado migrado de {os.path.basename(self.legacy_json)}")
+        return state_store.adapt_load(self.provider)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._ensure_loaded()
+            value = self._values.get(key, default)
+        # Cópia: quem altera um dict devolvido precisa chamar set()
+        return json.loads(json.dumps(value)) if isinstance(value, (dict, list)) else value
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._counters.get(name, 0)
+
+    def selector_stats(self, selector: str) -> Dict[str, int]:
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._selectors.get(selector) or {"tries": 0, "hits": 0})
+
+    # ====== ESCRITAS (pendentes até flush) ======
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            self._values[key] = value
+            self._dirty[key] = value
+
+    def update(self, key: str, **fields: Any) -> None:
+        """Atualiza campos de um valor dict (ex.: last_run.stable_wait)."""
+        current = self.get(key) or {}
+        current.update(fields)
+        self.set(key, current)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            self._counters[name] = self._counters.get(name, 0) + n
+            self._counter_delta[name] = self._counter_delta.get(name, 0) + n
+
+    def record_selector(self, selector: str, hit: bool) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            stats = self._selectors.setdefault(selector, {"tries": 0, "hits": 0})
+            stats["tries"] += 1
+            stats["hits"] += int(hit)
+            delta = self._selector_delta.setdefault(selector, [0, 0])
+            delta[0] += 1
+            delta[1] += int(hit)
+            # Histórico recente (última escrita vence, como os demais values)
+            recent = self._values.setdefault("selector_recent", {})
+            prev = recent.get(selector) or {"n": 0.0, "ok": 0.0, "miss_streak": 0}
+            recent[selector] = {
+                "n": round(prev["n"] * _SELECTOR_DECAY + 1, 4),
+                "ok": round(prev["ok"] * _SELECTOR_DECAY + int(hit), 4),
+                "miss_streak": 0 if hit else prev.get("miss_streak", 0) + 1,
+            }
+            self._dirty["selector_recent"] = recent
+
+    # ====== SELETORES ======
+
+    def _selector_recent(self, selector: str) -> Optional[dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return (self._values.get("selector_recent") or {}).get(selector)
+
+    def rank_selectors(self, candidates: Sequence[str]) -> List[str]:
+        """
+        Maior taxa de acerto recente primeiro (suavizada: sem histórico = 50%);
+        empate mantém a ordem dada. Sem histórico recente (estado antigo), usa o acumulado.
+        """
+
+        def score(sel: str) -> float:
+            recent = self._selector_recent(sel)
+            if recent:
+                return (recent["ok"] + 1) / (recent["n"] + 2)
+            st = self.selector_stats(sel)
+            return (st["hits"] + 1) / (st["tries"] + 2)
+
+        return sorted(candidates, key=lambda sel: -score(sel))
+
+    def selector_dead(self, selector: str, min_tries: int = ADAPT_SELECTOR_DEAD_AFTER) -> bool:
+        """min_tries tentativas seguidas sem acerto: não vale a espera longa."""
+        recent = self._selector_recent(selector)
+        if recent:
+            return recent.get("miss_streak", 0) >= min_tries
+        st = self.selector_stats(selector)
+        return st["tries"] >= min_tries and st["hits"] == 0
+
+    # ====== FLUSH ======
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty) + len(self._counter_delta) + len(self._selector_delta)
+
+    def save(self) -> None:
+        """Ponto de gravação do scraper: grava agora, ou espera o flush do write-behind."""
+        if not self.buffered:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_to(self._db)
+
+    def _flush_to(self, db: Optional[str]) -> None:
+        if db is None or not (self._dirty or self._counter_delta or self._selector_delta):
+            return
+        import state_store
+
+        selectors: Dict[str, Tuple[int, int]] = {s: (t, h) for s, (t, h) in self._selector_delta.items()}
+        try:
+            state_store.adapt_write(self.provider, self._dirty, self._counter_delta, selectors, db_path=db)
+        except Exception as e:
+            # Aprendizado é descartável: não derruba o scrape
+            logger.warning(f"[ADAPT] {self.provider}: estado não gravado: {e}")
+            return
+        self._dirty, self._counter_delta, self._selector_delta = {}, {}, {}
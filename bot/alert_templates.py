@@ -0,0 +1,219 @@
+"""
+Mensagens de alerta com templates pré-compilados.
+
+Um template por (tipo, idioma): "OW"/"RT" (build_grouped_message) e
+"ALERT" (format_flight_alert). As strings de formato viram str.format
+ligado uma vez só; data BR e preço em reais saem de LRU, já que o mesmo
+dia/valor se repete em centenas de alertas num backfill ou dry-run.
+A saída é byte a byte a dos builders antigos, que agora delegam aqui
+(ver test_alert_templates.py / debug/alert_golden.json).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from bot.config import ALERT_LANG
+from bot.date_utils import to_br_date
+from bot.parsing import offer_price_int
+from bot.pricing_utils import brl
+
+_CACHE_SIZE = 4096
+
+# Fontes dos templates: (tipo, idioma) -> parte -> string de formato
+_SOURCES: Dict[Tuple[str, str], Dict[str, str]] = {
+    ("OW", "pt"): {
+        "header": "✈️ {origin} → {dest}\n📅 Data: {depart}\n💰 Melhor preço: R$ {price}\n",
+        "reference": "📊 Referência ({samples}): R$ {avg} → agora R$ {price} (-{pct}%)\n",
+        "separator": "—\n",
+        "flight": "{idx}) {dep}-{arr} | {duration} | {stops}\n   {airline} | {price_text}",
+        "share_link": "\n   🔗 {link}",
+    },
+    ("RT", "pt"): {
+        "header": "✈️ {origin} → {dest} (IDA E VOLTA)\n📅 Ida: {depart} | Volta: {ret}\n💰 Agora: R$ {price}\n",
+        "reference": "📊 Referência ({samples}): R$ {avg} → agora R$ {price} (-{pct}%)\n",
+        "separator": "—\n",
+        "flight": "{idx}) {dep}-{arr} | {duration} | {stops}\n   {airline} | {price_text}",
+        "share_link": "\n   🔗 {link}",
+    },
+    ("ALERT", "pt"): {
+        "header": "🔔 Passagens {origin} → {dest} | {depart}",
+        "time": "🕒 {dep}–{arr}",
+        "time_duration": "🕒 {dep}–{arr} | ⏱ {duration}",
+        "airline": "🏷 {airline}",
+        "price": "💰 R$ {price}",
+        "link": "🔗 Abrir busca: {link}",
+    },
+}
+_COMPILED: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+
+def register_template(kind: str, lang: str, **parts: str) -> None:
+    """Novo idioma/variante; partes ausentes vêm do template 'pt' do mesmo tipo."""
+    kind = kind.upper()
+    _SOURCES[(kind, lang)] = {**_SOURCES[(kind, "pt")], **parts}
+    _COMPILED.pop((kind, lang), None)
+
+
+def get_template(kind: str, lang: Optional[str] = None) -> Dict[str, Any]:
+    """Template compilado: parte -> str.format ligado (texto fixo fica como str). Idioma desconhecido cai em 'pt'."""
+    key = (kind.upper(), lang or ALERT_LANG)
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        source = _SOURCES.get(key) or _SOURCES[(key[0], "pt")]
+        compiled = _COMPILED[key] = {
+            name: (text.format if "{" in text else text) for name, text in source.items()
+        }
+    return compiled
+
+
+# ====== FORMATAÇÃO CACHEADA ======
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def date_br(iso_date: str) -> str:
+    """'YYYY-MM-DD' -> 'DD/MM/YYYY' (format_date_br com LRU; ValueError não fica no cache)."""
+    return to_br_date(iso_date)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def price_brl(value: int) -> str:
+    """brl() com LRU: 1234 -> '1.234'."""
+    return brl(value)
+
+
+def price_text(value: int) -> str:
+    """'R$ 1.234' (price_text/price das ofertas no runner)."""
+    return "R$ " + price_brl(value)
+
+
+@lru_cache(maxsize=1024)
+def duration_text(minutes: Optional[int]) -> Optional[str]:
+    """Minutos -> '3h 20m' (duration_text das ofertas no runner)."""
+    if minutes is None:
+        return None
+    hours = minutes // 60
+    mins = minutes % 60
+    if hours and mins:
+        return f"{hours}h {mins}m"
+    if hours:
+        return f"{hours}h"
+    return f"{mins}m"
+
+
+@lru_cache(maxsize=1024)
+def duration_compact(minutes: Optional[int]) -> Optional[str]:
+    """Minutos -> '3h20' (linha ⏱ do format_flight_alert)."""
+    if minutes is None:
+        return None
+    hours = minutes // 60
+    mins = minutes % 60
+    if hours and mins:
+        return f"{hours}h{mins:02d}"
+    if hours:
+        return f"{hours}h"
+    return f"{mins}m"
+
+
+# ====== RENDER ======
+
+def render_grouped(
+    trip_type: str,
+    origin_iata: str,
+    dest_iata: str,
+    depart_iso: str,
+    flights: List[Dict],
+    min_price: int,
+    ceiling: int,
+    return_iso: Optional[str] = None,
+    avg_info: Optional[Tuple[int, int]] = None,
+    show_avg_drop_only: bool = True,
+    lang: Optional[str] = None,
+) -> str:
+    """Mesmo contrato de message_builder.build_grouped_message, com idioma."""
+    price = price_brl(min_price)
+    if trip_type.upper() == "RT" and return_iso:
+        tpl = get_template("RT", lang)
+        header = tpl["header"](origin=origin_iata, dest=dest_iata, depart=date_br(depart_iso),
+                               ret=date_br(return_iso), price=price)
+    else:
+        tpl = get_template("OW", lang)
+        header = tpl["header"](origin=origin_iata, dest=dest_iata, depart=date_br(depart_iso), price=price)
+
+    if avg_info:
+        avg_price, samples = avg_info
+        if avg_price and avg_price > 0 and min_price > 0:
+            drop = (avg_price - min_price) / avg_price
+            if (not show_avg_drop_only) or (drop >= 0.15):
+                header += tpl["reference"](samples=samples, avg=price_brl(avg_price), price=price,
+                                           pct=int(round(drop * 100)))
+
+    header += tpl["separator"]
+
+    flight_line = tpl["flight"]
+    share_line = tpl["share_link"]
+    lines = []
+    for idx, f in enumerate(flights, start=1):
+        line = flight_line(
+            idx=idx, dep=f.get('dep_time', '?'), arr=f.get('arr_time', '?'),
+            duration=f.get('duration_text', 'N/A'), stops=f.get('stops', '?'),
+            airline=f.get('airline', 'N/A'), price_text=f.get('price_text', 'N/A'),
+        )
+        share_link = f.get('share_link')
+        if share_link:
+            line += share_line(link=share_link)
+        lines.append(line)
+
+    return header + "\n".join(lines)
+
+
+def render_grouped_batch(jobs: Iterable[Mapping[str, Any]], lang: Optional[str] = None) -> List[str]:
+    """render_grouped em lote (replay de backfill / preview dry-run): cada job são os kwargs de uma mensagem."""
+    return [render_grouped(**{"lang": lang, **job}) for job in jobs]
+
+
+def render_alert_group(
+    origin: str,
+    destination: str,
+    depart_date: str,
+    offers: List[Dict[str, Any]],
+    lang: Optional[str] = None,
+) -> str:
+    """Um grupo do format_flight_alert (ofertas já ordenadas e cortadas)."""
+    tpl = get_template("ALERT", lang)
+    lines: List[str] = [tpl["header"](origin=origin, dest=destination,
+                                      depart=date_br(depart_date) if depart_date else "-")]
+    time_line, time_duration_line = tpl["time"], tpl["time_duration"]
+    airline_line, price_line = tpl["airline"], tpl["price"]
+    for offer in offers:
+        dep = offer.get("dep_time")
+        arr = offer.get("arr_time")
+        duration_min = offer.get("duration_min")
+        airline = offer.get("airline")
+        price = offer_price_int(offer)
+
+        if dep or arr:
+            duration = duration_compact(duration_min) if duration_min else None
+            if duration:
+                lines.append(time_duration_line(dep=dep or '-', arr=arr or '-', duration=duration))
+            else:
+                lines.append(time_line(dep=dep or '-', arr=arr or '-'))
+
+        if airline:
+            lines.append(airline_line(airline=airline))
+
+        if price is not None:
+            lines.append(price_line(price=price_brl(price)))
+
+    link = None
+    for offer in offers:
+        link = offer.get("link")
+        if link:
+            break
+    if link:
+        lines.append(tpl["link"](link=link))
+
+    return "\n".join(lines)
+
+
+def cache_info() -> Dict[str, object]:
+    return {fn.__name__: fn.cache_info() for fn in (date_br, price_brl, duration_text, duration_compact)}
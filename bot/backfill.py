@@ -0,0 +1,171 @@
+"""
+Backfill retomável: semeia route_date_state/rt_price_history para destinos novos.
+
+A lista de trabalho (OW por data, RT por par ida/volta) fica persistida em
+backfill_items; N workers, cada um com o próprio browser, pegam itens da
+fila e fazem checkpoint a cada busca. Se o Chrome morre o worker reabre o
+browser e o item volta para a fila (até BACKFILL_MAX_TRIES); se o processo
+cai, rodar de novo o mesmo job continua de onde parou.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from bot.status_codes import ScrapeResult, ScrapeStatus
+
+logger = logging.getLogger("kiwi_bot")
+
+# Mesmos cooldowns do bootstrap serial antigo
+GOOD_COOLDOWN_DAYS = 1
+BAD_COOLDOWN_HOURS = 6
+NO_DATA_COOLDOWN_HOURS = 12
+
+
+def build_items(
+    origin: str,
+    dests: Iterable[str],
+    start: datetime.date,
+    *,
+    ow_days: int,
+    rt_days: int,
+    rt_nights: Iterable[int],
+    ow_ceilings: Dict[str, int],
+    default_ow_ceiling: int,
+    rt_ceilings: Dict[str, int],
+    default_rt_ceiling: int,
+) -> List[dict]:
+    """Lista de trabalho: primeiro todas as idas, depois o baseline RT."""
+    dests = [d for d in dests if d != origin]
+    items: List[dict] = []
+    for dest in dests:
+        for i in range(ow_days):
+            date = (start + datetime.timedelta(days=i)).isoformat()
+            items.append({
+                "key": f"OW|{origin}|{dest}|{date}",
+                "kind": "OW",
+                "origin": origin,
+                "dest": dest,
+                "date": date,
+                "return_date": None,
+                "ceiling": ow_ceilings.get(dest, default_ow_ceiling),
+            })
+    for dest in dests:
+        for i in range(rt_days):
+            dep = start + datetime.timedelta(days=i)
+            for n in rt_nights:
+                date, ret = dep.isoformat(), (dep + datetime.timedelta(days=n)).isoformat()
+                items.append({
+                    "key": f"RT|{origin}|{dest}|{date}|{ret}",
+                    "kind": "RT",
+                    "origin": origin,
+                    "dest": dest,
+                    "date": date,
+                    "return_date": ret,
+                    "ceiling": rt_ceilings.get(dest, default_rt_ceiling),
+                })
+    return items
+
+
+def apply_result(store, item: dict, result: ScrapeResult) -> str:
+    """Grava o estado da (rota, data[, volta]) e devolve GOOD/BAD/NO_DATA."""
+    origin, dest, date, ret = item["origin"], item["dest"], item["date"], item.get("return_date")
+    min_price = result.min_price if result.min_price and result.min_price > 0 else None
+    if item["kind"] == "RT" and min_price:
+        store.rt_add_history(origin, dest, date, ret, min_price)
+    if result.status != ScrapeStatus.OK or min_price is None:
+        store.mark_no_data(origin, dest, item["kind"], date, ret, cooldown_hours=NO_DATA_COOLDOWN_HOURS)
+        return "NO_DATA"
+    if min_price <= item["ceiling"]:
+        store.mark_good(origin, dest, item["kind"], date, ret, price=min_price, cooldown_days=GOOD_COOLDOWN_DAYS)
+        return "GOOD"
+    store.mark_bad(origin, dest, item["kind"], date, ret, price=min_price, cooldown_hours=BAD_COOLDOWN_HOURS)
+    return "BAD"
+
+
+def run_job(
+    job_id: str,
+    *,
+    store,
+    scrape: Callable[[Any, dict], ScrapeResult],
+    open_driver: Callable[[], Any],
+    close_driver: Callable[[Any], None],
+    workers: int,
+    max_tries: int,
+    stop: Optional[threading.Event] = None,
+) -> dict:
+    """
+    Processa os itens PENDING do job com `workers` threads. scrape(driver, item)
+    faz a busca; ERROR/BLOCKED ou exceção reabrem o browser e devolvem o item
+    para a fila. Retorna o resumo (done/failed/retried, buscas/minuto).
+    """
+    stop = stop or threading.Event()
+    resumed = store.backfill_reset_running(job_id)
+    if resumed:
+        logger.info(f"[BACKFILL] {job_id}: {resumed} itens interrompidos voltaram para a fila")
+    lock = threading.Lock()
+    stats = {"searches": 0, "done": 0, "failed": 0, "retried": 0}
+    outcomes: Dict[str, int] = {}
+
+    def _retry_or_fail(item: dict, error: str) -> None:
+        status = "FAILED" if item["tries"] >= max_tries else "PENDING"
+        store.backfill_finish(job_id, item["key"], status, {"error": error})
+        with lock:
+            stats["failed" if status == "FAILED" else "retried"] += 1
+        logger.warning(f"[BACKFILL] {item['key']} try={item['tries']} {status}: {error}")
+
+    def _work(name: str) -> None:
+        driver = None
+        try:
+            while not stop.is_set():
+                item = store.backfill_claim(job_id, name)
+                if item is None:
+                    return
+                try:
+                    if driver is None:
+                        driver = open_driver()
+                    result = scrape(driver, item)
+                except Exception as e:
+                    close_driver(driver)
+                    driver = None
+                    with lock:
+                        stats["searches"] += 1
+                    _retry_or_fail(item, f"{type(e).__name__}: {e}")
+                    continue
+                with lock:
+                    stats["searches"] += 1
+                if result.status in (ScrapeStatus.ERROR, ScrapeStatus.BLOCKED):
+                    close_driver(driver)
+                    driver = None
+                    _retry_or_fail(item, f"{result.status.name}/{result.reason.name}")
+                    continue
+                outcome = apply_result(store, item, result)
+                store.backfill_finish(job_id, item["key"], "DONE", {"outcome": outcome, "min_price": result.min_price})
+                with lock:
+                    stats["done"] += 1
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                logger.info(f"[BACKFILL] {name} {item['key']}: {outcome} min={result.min_price}")
+        finally:
+            close_driver(driver)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=_work, args=(f"w{i + 1}",), name=f"backfill-{i + 1}", daemon=True) for i in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(timeout=0.5)
+    except KeyboardInterrupt:
+        # Workers terminam a busca atual; os RUNNING voltam para a fila na retomada
+        stop.set()
+        for t in threads:
+            t.join()
+    elapsed = time.monotonic() - started
+    summary = dict(stats, outcomes=outcomes, elapsed_s=round(elapsed, 1))
+    summary["per_minute"] = round(stats["searches"] / (elapsed / 60), 1) if elapsed > 0 else 0.0
+    summary["progress"] = store.backfill_progress(job_id)
+    return summary
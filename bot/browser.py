@@ -18,6 +18,7 @@ def open_browser(
     profile_dir: Optional[str] = None,
     scope: Optional[str] = None,
     kind: Optional[str] = None,
+    network_capture: bool = False,
 ) -> Tuple[webdriver.Chrome, Dict[str, Any]]:
     chrome_options = Options()
 
@@ -46,6 +47,11 @@ def open_browser(
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
 
+    if network_capture:
+        from bot.network_capture import enable_network_capture
+
+        enable_network_capture(chrome_options)
+
     chromedriver_path = os.environ.get("CHROMEDRIVER_PATH")
     if chromedriver_path:
         service = Service(executable_path=chromedriver_path)
@@ -67,6 +73,7 @@ def open_browser(
         "profile_dir": profile_dir,
         "chrome_binary": chrome_binary,
         "chromedriver_path": chromedriver_path,
+        "network_capture": network_capture,
     }
 
     return driver, meta
@@ -90,7 +97,7 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 
-def open_browser(headless=False, user_data_dir=None, profile_dir=None, scope=None, kind=None):
+def open_browser(headless=False, user_data_dir=None, profile_dir=None, scope=None, kind=None, network_capture=False):
     chrome_options = Options()
 
     # Chrome Beta 145
@@ -114,6 +121,12 @@ def open_browser(headless=False, user_data_dir=None, profile_dir=None, scope=Non
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
 
+    # Performance log para o fast path HTTP / captura de rede
+    if network_capture:
+        from bot.network_capture import enable_network_capture
+
+        enable_network_capture(chrome_options)
+
     service = Service(
         executable_path=(
             r"C:\tools\chromedriver145\chromedriver.exe\chromedriver-win64\chromedriver.exe"
@@ -0,0 +1,135 @@
+"""
+Modo calendário: menores preços por dia de uma janela inteira a partir de
+poucas páginas (faixa "±3 dias" dos resultados), para só agendar o scrape
+detalhado das datas cujo preço do calendário fica abaixo do teto.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bot import parsing
+from bot import utils_viajala as VU
+from bot.reasons import AttemptReport
+
+logger = logging.getLogger("kiwi_bot")
+
+_MONTHS_PT = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+_DAY_MONTH_NAME_RE = re.compile(r"\b(\d{1,2})\s*(?:de\s+)?(jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)\w*", re.IGNORECASE)
+_DAY_MONTH_NUM_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_PRICE_RE = parsing.PRICE_BRL_RE
+
+
+def _resolve_year(day: int, month: int, ref: datetime.date) -> Optional[datetime.date]:
+    # Sem ano no texto: a data mais próxima de ref (virada de ano na faixa)
+    best = None
+    for year in (ref.year - 1, ref.year, ref.year + 1):
+        try:
+            d = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if best is None or abs((d - ref).days) < abs((best - ref).days):
+            best = d
+    return best
+
+
+def parse_calendar_item(text: str, ref: datetime.date) -> Optional[Tuple[str, int]]:
+    """'sex, 13 fev R$ 512' / '13/02 R$ 512' -> ('2026-02-13', 512)."""
+    if not text:
+        return None
+    price_m = _PRICE_RE.search(text)
+    if not price_m:
+        return None
+    price = VU.parse_price_int(price_m.group(0))
+    if not price:
+        return None
+    head = text[: price_m.start()] + " " + text[price_m.end():]
+    m = _DAY_MONTH_NAME_RE.search(head)
+    if m:
+        d = _resolve_year(int(m.group(1)), _MONTHS_PT[m.group(2).lower()[:3]], ref)
+    else:
+        m = _DAY_MONTH_NUM_RE.search(head)
+        if not m:
+            return None
+        if m.group(3):
+            year = int(m.group(3))
+            year = year + 2000 if year < 100 else year
+            try:
+                d = datetime.date(year, int(m.group(2)), int(m.group(1)))
+            except ValueError:
+                d = None
+        else:
+            d = _resolve_year(int(m.group(1)), int(m.group(2)), ref)
+    return (d.isoformat(), price) if d else None
+
+
+def calendar_centers(dates: Iterable[str], span: int = 3) -> List[str]:
+    """Datas a abrir para cobrir todas as datas com faixas de ±span dias."""
+    centers: List[str] = []
+    covered_until: Optional[datetime.date] = None
+    for iso in sorted(set(dates)):
+        d = datetime.date.fromisoformat(iso)
+        if covered_until is not None and d <= covered_until:
+            continue
+        center = d + datetime.timedelta(days=span)
+        centers.append(center.isoformat())
+        covered_until = center + datetime.timedelta(days=span)
+    return centers
+
+
+def scan_calendar(
+    fetch: Callable[[str, str, str], Dict[str, int]],
+    origin: str,
+    dest: str,
+    dates: Iterable[str],
+    span: int = 3,
+) -> Dict[str, int]:
+    """
+    fetch(origin, dest, center) -> {data: menor preço} de uma página.
+    Junta as faixas (menor preço por data) e devolve só as datas pedidas.
+    """
+    wanted = set(dates)
+    prices: Dict[str, int] = {}
+    for center in calendar_centers(wanted, span):
+        try:
+            page = fetch(origin, dest, center) or {}
+        except Exception as e:
+            logger.warning(f"[CALENDAR] {origin}->{dest} {center} falhou: {type(e).__name__}: {e}")
+            continue
+        for iso, price in page.items():
+            if iso in wanted and (iso not in prices or price < prices[iso]):
+                prices[iso] = price
+    logger.info(f"[CALENDAR] {origin}->{dest} datas={len(wanted)} com_preço={len(prices)}")
+    return prices
+
+
+def apply_calendar(attempts: List[dict], prices: Dict[Tuple[str, str, str], int]) -> Tuple[List[dict], List[AttemptReport]]:
+    """
+    Mantém os attempts cuja data não tem preço no calendário ou tem preço
+    abaixo do teto; os demais viram SKIP CALENDAR_ABOVE_CEILING.
+    prices: {(origin, dest, data): menor preço}.
+    """
+    kept: List[dict] = []
+    reports: List[AttemptReport] = []
+    for attempt in attempts:
+        price = prices.get((attempt["origin"], attempt["dest"], attempt["date"]))
+        if price is None or price <= attempt["ceiling"]:
+            if price is not None:
+                attempt["calendar_price"] = price
+            kept.append(attempt)
+            continue
+        for dest in attempt.get("fanout") or [attempt["dest"]]:
+            reports.append(AttemptReport(
+                origin=attempt["origin"],
+                dest=dest,
+                date=attempt["date"],
+                phase="SKIP",
+                reason="CALENDAR_ABOVE_CEILING",
+                details={"calendar_price": price, "ceiling": attempt["ceiling"]},
+            ))
+    return kept, reports
@@ -0,0 +1,166 @@
+"""
+Circuit breaker por provider.
+
+CLOSED    -> tudo normal; bloqueio (challenge) abre na hora, falhas moles
+             (timeout/landing/exceção) abrem após BREAKER_FAILURE_THRESHOLD seguidas.
+OPEN      -> tentativas do provider são puladas até o cooldown vencer.
+HALF_OPEN -> libera UMA tentativa de prova: sucesso fecha, falha reabre com
+             cooldown dobrado (até BREAKER_MAX_COOLDOWN_SECONDS).
+
+Estado persistido no SQLite (state_store.provider_breaker) para valer entre ciclos.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from bot.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_BASE_COOLDOWN_SECONDS,
+    BREAKER_MAX_COOLDOWN_SECONDS,
+)
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+
+logger = logging.getLogger("kiwi_bot")
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+# Classificação de um ScrapeResult para o breaker
+OUTCOME_OK = "OK"
+OUTCOME_FAILURE = "FAILURE"
+OUTCOME_BLOCK = "BLOCK"
+
+_SOFT_FAILURE_REASONS = {
+    ScrapeReason.TIMEOUT_WAITING_RESULTS,
+    ScrapeReason.PAGE_NOT_LOADED,
+    ScrapeReason.SELENIUM_EXCEPTION,
+    ScrapeReason.COOKIE_MODAL_BLOCKING,
+}
+
+
+def classify_result(result: ScrapeResult) -> str:
+    """BLOCK (challenge/captcha), FAILURE (timeout, landing, exceção) ou OK (inclui 'sem resultados')."""
+    if result.reason is ScrapeReason.BLOCKED_CHALLENGE:
+        return OUTCOME_BLOCK
+    if result.flights:
+        return OUTCOME_OK
+    if result.reason in _SOFT_FAILURE_REASONS or result.status in (ScrapeStatus.ERROR, ScrapeStatus.BLOCKED):
+        return OUTCOME_FAILURE
+    return OUTCOME_OK
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        provider: str,
+        store=None,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_cooldown: int = BREAKER_BASE_COOLDOWN_SECONDS,
+        max_cooldown: int = BREAKER_MAX_COOLDOWN_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.provider = provider
+        self.store = store
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.base_cooldown = int(base_cooldown)
+        self.max_cooldown = int(max_cooldown)
+        self.clock = clock
+        self.transitions: Counter = Counter()
+        self._probe_in_flight = False
+
+        saved = None
+        if store is not None:
+            try:
+                saved = store.get_breaker_state(provider)
+            except Exception as e:
+                logger.warning(f"[BREAKER] {provider} falha ao carregar estado: {e}")
+        saved = saved or {}
+        self.state = saved.get("state") or CLOSED
+        self.failures = int(saved.get("failures") or 0)
+        self.trips = int(saved.get("trips") or 0)
+        self.opened_at = saved.get("opened_at")
+        self.cooldown_s = int(saved.get("cooldown_s") or 0)
+        self.last_reason = saved.get("last_reason")
+
+    def _as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "opened_at": self.opened_at,
+            "cooldown_s": self.cooldown_s,
+            "last_reason": self.last_reason,
+        }
+
+    def _persist(self, transition: Optional[tuple] = None) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save_breaker_state(self.provider, self._as_dict(), transition=transition)
+        except Exception as e:
+            logger.warning(f"[BREAKER] {self.provider} falha ao gravar estado: {e}")
+
+    def _transition(self, to_state: str, reason: str) -> None:
+        from_state = self.state
+        self.state = to_state
+        self.last_reason = reason
+        self.transitions[f"{from_state}->{to_state}"] += 1
+        extra = f" cooldown={self.cooldown_s}s trips={self.trips}" if to_state == OPEN else ""
+        logger.warning(f"[BREAKER] {self.provider} {from_state}->{to_state} reason={reason}{extra}")
+        self._persist((from_state, to_state, reason))
+
+    def _trip(self, reason: str) -> None:
+        self.trips += 1
+        self.cooldown_s = min(self.base_cooldown * (2 ** (self.trips - 1)), self.max_cooldown)
+        self.opened_at = int(self.clock())
+        self.failures = 0
+        self._probe_in_flight = False
+        self._transition(OPEN, reason)
+
+    def remaining_cooldown(self) -> int:
+        if self.state != OPEN or self.opened_at is None:
+            return 0
+        return max(0, int(self.opened_at + self.cooldown_s - self.clock()))
+
+    def allow(self) -> bool:
+        """True se o provider pode ser tentado agora (em HALF_OPEN, só uma prova)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.remaining_cooldown() > 0:
+                return False
+            self._transition(HALF_OPEN, "COOLDOWN_ELAPSED")
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record(self, result: ScrapeResult) -> str:
+        """Alimenta o breaker com o resultado de uma tentativa. Retorna a classificação."""
+        outcome = classify_result(result)
+        reason = result.reason.name if result.reason else outcome
+        if outcome == OUTCOME_OK:
+            if self.state != CLOSED:
+                self.failures = 0
+                self.trips = 0
+                self.cooldown_s = 0
+                self.opened_at = None
+                self._probe_in_flight = False
+                self._transition(CLOSED, "PROBE_OK")
+            elif self.failures:
+                self.failures = 0
+                self._persist()
+        elif outcome == OUTCOME_BLOCK or self.state == HALF_OPEN:
+            self._trip(reason)
+        else:
+            self.failures += 1
+            self.last_reason = reason
+            if self.failures >= self.failure_threshold:
+                self._trip(f"{reason}x{self.failures}")
+            else:
+                self._persist()
+        return outcome
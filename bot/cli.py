@@ -25,6 +25,9 @@ def build_parser():
     parser.add_argument("--dest", help="filtrar destino (ex: GRU)")
     parser.add_argument("--depart", help="data de ida (YYYY-MM-DD)")
     parser.add_argument("--return", dest="return_date", help="data de volta (YYYY-MM-DD)")
+    parser.add_argument("--provider", default="viajala", help="viajala | kiwi | google")
+    parser.add_argument("--providers", help="fan-out paralelo, ex: viajala,kiwi,google (um browser por provider)")
+    parser.add_argument("--calendar", action="store_true", help="poda datas pelo calendário de preços antes do scrape detalhado")
     parser.add_argument("--headless", action="store_true")
     parser.add_argument("--scope", default="")
     parser.add_argument("--dry-run", action="store_true")
@@ -99,6 +102,10 @@ def main():
             print("  Status da fila:")
             for k, v in state.get("queue", {}).items():
                 print(f"    {k}: {v}")
+            if state.get("breakers"):
+                print("  Circuit breakers:")
+                for name, b in state["breakers"].items():
+                    print(f"    {name}: {b.get('state')} trips={b.get('trips')} last_reason={b.get('last_reason')}")
         else:
             print("Nenhum resumo encontrado. Execute o bot pelo menos uma vez.")
         sys.exit(0)
@@ -24,3 +24,117 @@ MIN_SECONDS_BETWEEN_MESSAGES_PER_GROUP = 180
 def get_dest_list(mode, dest_filter=None):
     # TODO: migrar lógica de construção de lista de destinos
     return []
+
+# Notificação runner → sender (fila)
+QUEUE_NOTIFY_ENABLED = True
+QUEUE_NOTIFY_SOCKET_PATH = str(Path(tempfile.gettempdir()) / "kiwi_bot_queue.sock")
+QUEUE_NOTIFY_COALESCE_SECONDS = 5  # espera para juntar vários alertas do mesmo grupo
+QUEUE_NOTIFY_POLL_SECONDS = 2  # fallback quando não há socket Unix
+QUEUE_NOTIFY_IDLE_SECONDS = 300  # acorda o sender mesmo sem eventos (janelas de envio)
+
+# Circuit breaker por provider (bloqueio/challenge)
+BREAKER_ENABLED = True
+BREAKER_FAILURE_THRESHOLD = 3  # falhas "moles" seguidas (timeout/landing) para abrir
+BREAKER_BASE_COOLDOWN_SECONDS = 15 * 60  # primeira abertura
+BREAKER_MAX_COOLDOWN_SECONDS = 6 * 3600  # backoff dobra a cada reabertura até este teto
+
+# Rate limit por domínio (token bucket compartilhado pelos browsers do processo)
+RATE_LIMIT_ENABLED = True
+# domínio -> (requisições por minuto, burst)
+RATE_LIMITS_PER_DOMAIN = {
+    "viajala.com.br": (12, 2),
+    "kiwi.com": (6, 1),
+    "google.com": (10, 2),
+}
+RATE_LIMIT_DEFAULT = (10, 1)
+RATE_LIMIT_JITTER_SECONDS = 0.5
+
+# Fast path HTTP: replay da API JSON do provider (aprendida via CDP) antes do Selenium
+HTTP_FASTPATH_ENABLED = True
+HTTP_FASTPATH_TIMEOUT_SECONDS = 15
+HTTP_FASTPATH_MAX_FAILURES = 3  # replays inválidos seguidos até descartar o template
+
+# Cache de resultados de scrape (provider, origem, destino, data) entre ciclos
+SCRAPE_CACHE_ENABLED = True
+SCRAPE_CACHE_TTL_SECONDS = {
+    "viajala": 20 * 60,
+    "kiwi": 30 * 60,
+    "google": 20 * 60,
+}
+SCRAPE_CACHE_DEFAULT_TTL_SECONDS = 20 * 60
+METRO_SEARCH_PROVIDERS = ("viajala",)  # busca por cidade (SAO/RIO) traz todos os aeroportos
+
+# Modo calendário: faixa ±N dias por página poda as datas antes do scrape detalhado
+CALENDAR_MODE_ENABLED = False  # ou --calendar
+CALENDAR_SPAN_DAYS = 3
+CALENDAR_BAD_COOLDOWN_HOURS = 12  # datas com calendário acima do teto
+
+# Planner RT: poda de pares (ida, volta) por limite inferior de preço
+RT_HORIZON_DAYS = 21
+RT_OW_SUM_FACTOR = 0.85  # RT raramente sai abaixo de 85% da soma das idas
+RT_OW_MAX_AGE_DAYS = 3  # idade máxima dos preços OW usados na estimativa
+RT_HISTORY_MARGIN = 0.20  # queda máxima esperada desde a última leitura do par
+RT_HISTORY_MAX_AGE_DAYS = 7
+RT_MAX_PAIRS_PER_DEST = 12
+
+# Viajala: extrair ofertas do JSON que a própria página carrega (CDP), sem esperar o DOM
+import os
+VIAJALA_NETWORK_MODE = os.getenv("VIAJALA_NETWORK_MODE", "0").strip() == "1"
+VIAJALA_NETWORK_TIMEOUT_SECONDS = 20  # espera pela 1ª resposta de resultados
+VIAJALA_NETWORK_SETTLE_SECONDS = 2  # janela para respostas complementares (paginação/lotes)
+
+# Backfill (bootstrap_scrape.py): job retomável com N browsers em paralelo
+BACKFILL_WORKERS = 3
+BACKFILL_MAX_TRIES = 3  # tentativas por item antes de FAILED (browser morto/erro)
+BACKFILL_OW_DAYS = 10
+BACKFILL_RT_DAYS = 14
+BACKFILL_MAX_CARDS = 6
+
+# Write-behind: estado por attempt (cooldown, amostras, dedupe) gravado em lote
+WRITE_BEHIND_ENABLED = True
+WRITE_BEHIND_FLUSH_ATTEMPTS = 10  # flush a cada N attempts...
+WRITE_BEHIND_FLUSH_SECONDS = 30  # ...ou T segundos (e sempre no fim do ciclo/SIGTERM)
+
+# Share link: só para as ofertas que vão ser enviadas, com cache por offer_id
+SHARE_LINK_ENABLED = True
+SHARE_LINK_PROVIDERS = ("kiwi",)  # providers com botão Compartilhar no card
+SHARE_LINK_CACHE_TTL_SECONDS = 7 * 86400
+
+# Parada antecipada em páginas ordenadas por preço (sortBy=price nas URLs)
+EARLY_EXIT_ENABLED = True
+PRICE_SORTED_PROVIDERS = ("kiwi", "google")
+
+# Captura de debug (HTML/PNG/URL): amostrada, gravada em segundo plano, com limite de disco
+DEBUG_CAPTURE_ENABLED = os.getenv("DEBUG_CAPTURE", "1").strip() != "0"
+DEBUG_CAPTURE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "debug", "captures"))
+DEBUG_CAPTURE_SAMPLE_RATES = {
+    "viajala_zero": 0.25,  # attempt sem ofertas
+    "viajala_card": 0.10,  # card sem preço/link (só com VIAJALA_DEBUG_CARD=1)
+    "viajala_modal": 0.10,
+    "viajala_interstitial": 0.25,
+    "kiwi_after_get": 0.02,  # antes: todo driver.get
+    "selenium_retry": 0.25,
+}
+DEBUG_CAPTURE_DEFAULT_RATE = 0.10
+DEBUG_CAPTURE_MAX_BYTES = 200 * 1024 * 1024
+DEBUG_CAPTURE_MAX_BUNDLES = 300
+DEBUG_CAPTURE_QUEUE_SIZE = 8  # fila cheia descarta a captura
+
+# Estado adaptativo dos scrapers (SQLite): seletor que nunca casou não ganha espera longa
+ADAPT_SELECTOR_DEAD_AFTER = 20  # tentativas seguidas sem acerto
+ADAPT_SELECTOR_HALF_LIFE_TRIES = 5  # meia-vida (em tentativas) do histórico recente de cada seletor
+ADAPT_CARD_WAIT_SECONDS = 25  # espera pelo seletor de card mais provável
+
+# Viajala: ordem das URLs alternativas (aeroporto x cidade) aprendida por destino
+URL_MODEL_HALF_LIFE_HOURS = 72  # observações perdem metade do peso a cada 3 dias
+URL_MODEL_SKIP_AFTER = 4  # tentativas seguidas sem oferta até pular a URL...
+URL_MODEL_REPROBE_HOURS = 24  # ...por até N horas desde a última tentativa
+
+# Mensagens de alerta: idioma padrão dos templates (bot/alert_templates.py)
+ALERT_LANG = "pt"
+
+# Métricas do ciclo (Prometheus textfile / HTTP local), atualizadas durante o ciclo
+METRICS_ENABLED = os.getenv("METRICS", "1").strip() != "0"
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR") or str(Path(tempfile.gettempdir()) / "kiwi_bot_metrics")
+METRICS_WRITE_SECONDS = 10  # regrava o .prom no máximo a cada N segundos, só se algo mudou
+METRICS_HTTP_PORT = int(os.getenv("METRICS_HTTP_PORT", "0"))  # 0 = sem endpoint; senão 127.0.0.1:<porta>/metrics
@@ -0,0 +1,238 @@
+"""
+Captura de diagnóstico (HTML, screenshot, URL, textos) fora do caminho do scrape.
+
+- Amostragem por tipo (DEBUG_CAPTURE_SAMPLE_RATES): fora da amostra, nem o
+  page_source é lido do browser.
+- Só o que precisa do driver roda na thread do scrape (page_source e PNG em
+  memória); compressão e disco ficam com uma thread de fundo.
+- Cada captura vira um bundle .zip próprio (nada de sobrescrever
+  viajala_last.*); os mais antigos são apagados acima de
+  DEBUG_CAPTURE_MAX_BYTES / DEBUG_CAPTURE_MAX_BUNDLES.
+- Fila cheia descarta a captura (contador dropped) em vez de segurar o scrape.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, Optional, Union
+
+from bot.config import (
+    DEBUG_CAPTURE_DEFAULT_RATE,
+    DEBUG_CAPTURE_DIR,
+    DEBUG_CAPTURE_ENABLED,
+    DEBUG_CAPTURE_MAX_BUNDLES,
+    DEBUG_CAPTURE_MAX_BYTES,
+    DEBUG_CAPTURE_QUEUE_SIZE,
+    DEBUG_CAPTURE_SAMPLE_RATES,
+)
+
+logger = logging.getLogger("kiwi_bot")
+
+
+def _safe(text: str, limit: int = 60) -> str:
+    return re.sub(r"[^a-zA-Z0-9_-]+", "_", text or "")[:limit]
+
+
+class DebugCapture:
+    def __init__(
+        self,
+        directory: str = DEBUG_CAPTURE_DIR,
+        *,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: float = DEBUG_CAPTURE_DEFAULT_RATE,
+        max_bytes: int = DEBUG_CAPTURE_MAX_BYTES,
+        max_bundles: int = DEBUG_CAPTURE_MAX_BUNDLES,
+        queue_size: int = DEBUG_CAPTURE_QUEUE_SIZE,
+        enabled: bool = DEBUG_CAPTURE_ENABLED,
+        rng: Optional[random.Random] = None,
+    ):
+        self.directory = directory
+        self.rates = dict(DEBUG_CAPTURE_SAMPLE_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.max_bytes = max_bytes
+        self.max_bundles = max_bundles
+        self.enabled = enabled
+        self._rng = rng or random.Random()
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self.stats = {"sampled_out": 0, "queued": 0, "written": 0, "dropped": 0, "pruned": 0}
+
+    # ====== THREAD DO SCRAPE ======
+
+    def should_capture(self, kind: str) -> bool:
+        if not self.enabled:
+            return False
+        rate = self.rates.get(kind, self.default_rate)
+        if rate >= 1:
+            return True
+        return rate > 0 and self._rng.random() < rate
+
+    def capture(
+        self,
+        kind: str,
+        driver=None,
+        *,
+        tag: str = "",
+        html: Union[str, Callable[[], str], None] = None,
+        screenshot: bool = True,
+        meta: Optional[Dict[str, Any]] = None,
+        texts: Union[Dict[str, str], Callable[[], Dict[str, str]], None] = None,
+    ) -> bool:
+        """
+        Enfileira um bundle (kind, tag). Com driver, lê page_source/URL/título
+        e o PNG (se screenshot); html e texts podem ser callables, avaliados
+        só se a captura entrar na amostra. Retorna False se ficou fora da amostra ou
+        foi descartado.
+        """
+        if not self.should_capture(kind):
+            with self._lock:
+                self.stats["sampled_out"] += 1
+            return False
+
+        if callable(texts):
+            try:
+                texts = texts()
+            except Exception:
+                texts = None
+        files: Dict[str, Any] = dict(texts or {})
+        info = {"kind": kind, "tag": tag, "ts": time.strftime("%Y-%m-%dT%H:%M:%S"), **(meta or {})}
+        if driver is not None:
+            for attr in ("current_url", "title"):
+                try:
+                    info.setdefault(attr, getattr(driver, attr))
+                except Exception:
+                    pass
+            if html is None:
+                try:
+                    html = driver.page_source
+                except Exception:
+                    html = None
+            if screenshot:
+                try:
+                    files["page.png"] = driver.get_screenshot_as_png()
+                except Exception:
+                    pass
+        if callable(html):
+            try:
+                html = html()
+            except Exception:
+                html = None
+        if html is not None:
+            files["page.html"] = html
+        files["meta.json"] = json.dumps(info, ensure_ascii=False, indent=2, default=str)
+
+        with self._lock:
+            self._seq += 1
+            name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self._seq:04d}_{_safe(kind)}"
+        if tag:
+            name += f"_{_safe(tag)}"
+        self._start()
+        try:
+            self._queue.put_nowait({"name": name, "files": files})
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            return False
+        with self._lock:
+            self.stats["queued"] += 1
+        return True
+
+    # ====== THREAD DE FUNDO ======
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="debug-capture", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._write(job)
+                self._prune()
+            except Exception as e:
+                logger.warning(f"[DEBUG] captura não gravada: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, job: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, job["name"] + ".zip")
+        tmp = path + ".tmp"
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for fname, data in job["files"].items():
+                # PNG já é comprimido
+                method = zipfile.ZIP_STORED if fname.endswith(".png") else zipfile.ZIP_DEFLATED
+                zf.writestr(fname, data, compress_type=method)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["written"] += 1
+        logger.debug(f"[DEBUG] bundle {path}")
+
+    def bundles(self) -> list:
+        """Bundles gravados, do mais antigo para o mais novo."""
+        paths = glob.glob(os.path.join(self.directory, "*.zip"))
+        return sorted(paths, key=lambda p: (os.path.getmtime(p), p))
+
+    def _prune(self) -> None:
+        entries = [(p, os.path.getsize(p)) for p in self.bundles()]
+        total = sum(size for _, size in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_bundles):
+            path, size = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["pruned"] += 1
+
+    def latest(self, kind: Optional[str] = None) -> Optional[str]:
+        for path in reversed(self.bundles()):
+            if kind is None or f"_{_safe(kind)}" in os.path.basename(path):
+                return path
+        return None
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a fila esvaziar (fim do ciclo, testes). False se estourou o timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+
+_DEFAULT: Optional[DebugCapture] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_capture() -> DebugCapture:
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = DebugCapture()
+        return _DEFAULT
+
+
+def capture(kind: str, driver=None, **kwargs) -> bool:
+    """Atalho para o serviço padrão (DEBUG_CAPTURE_DIR)."""
+    return get_capture().capture(kind, driver, **kwargs)
+
+
+def flush_default(timeout: float = 5.0) -> bool:
+    """Fim do ciclo: espera os bundles pendentes do serviço padrão (se foi usado)."""
+    return _DEFAULT.flush(timeout) if _DEFAULT is not None else True
@@ -1,6 +1,6 @@
 from typing import List, Dict, Tuple
 
-from bot.pricing_utils import parse_brl_to_int
+from bot.parsing import offer_price_int
 
 ALERT_BUCKET_RULES = {
     "imperdivel": {
@@ -27,16 +27,7 @@ ALERT_BUCKET_RULES = {
 }
 
 
-def _price_int_from_offer(offer: Dict) -> int | None:
-    if offer.get("price_int") is not None:
-        return offer.get("price_int")
-    price = offer.get("price")
-    if isinstance(price, int):
-        return price
-    if isinstance(price, str):
-        p = parse_brl_to_int(price)
-        return None if p == -1 else p
-    return None
+_price_int_from_offer = offer_price_int
 
 
 def classify_alert_bucket(offer: Dict, *, ceiling: int, avg_price: float | None = None) -> tuple[str, Dict]:
@@ -116,8 +107,8 @@ def pick_best_3_buckets(flights: List[Dict], ceiling: int) -> List[Dict]:
     buckets = {"manha": None, "tarde": None, "noite": None}
     filtered: List[Tuple[int, Dict]] = []
     for f in flights:
-        p = parse_brl_to_int(f.get("price", ""))
-        if p == -1:
+        p = offer_price_int(f)
+        if p is None:
             continue
         if p > ceiling:
             continue
@@ -5,7 +5,7 @@ Decision Engine: centraliza regras de negócio, dedupe, prioridade, seleção de
 # Wrapper para compatibilidade
 class DecisionEngine:
     @staticmethod
-    def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_date, queue, state_store):
+    def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_date, queue, state_store, enrich=None):
         return evaluate_offer_batch(
             flights=flights,
             min_price=min_price,
@@ -14,21 +14,30 @@ class DecisionEngine:
             dest=dest,
             depart_date=depart_date,
             queue=queue,
-            state_store=state_store
+            state_store=state_store,
+            enrich=enrich,
         )
 from bot.selector import pick_best_3_buckets
 from bot.prioritizer import compute_priority_score
+from bot.alert_templates import duration_text, price_text
 from bot.message_builder import build_grouped_message
 from bot.queue_store import is_in_queue
-from bot.dedupe import make_offer_id, make_dedupe_key
-from bot.pricing_utils import parse_brl_to_int
+from bot.dedupe import offer_group_parts
+from bot.offer_model import Offer
+from bot.parsing import offer_price_int
 from bot import utils_viajala as VU
 import logging
+from array import array
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, List
 from copy import deepcopy
 import re
 
+try:
+    import numpy as np  # opcional: acelera o ranking em lote (backfill)
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
 @dataclass
 class DecisionResult:
     should_enqueue: bool
@@ -38,44 +47,17 @@ class DecisionResult:
     message_text: Optional[str]
 
 
-def _price_int_from_offer(offer: dict) -> Optional[int]:
-    if offer.get("price_int") is not None:
-        return offer.get("price_int")
-    price = offer.get("price")
-    if isinstance(price, int):
-        return price
-    if isinstance(price, str):
-        return parse_brl_to_int(price)
-    return None
-
-
-def _normalize_duration_bucket(duration_min: Optional[int]) -> Optional[int]:
-    if duration_min is None:
-        return None
-    try:
-        return int(round(duration_min / 5) * 5)
-    except Exception:
-        return duration_min
+# price_int gravado na normalização (providers); parse só se faltar
+_price_int_from_offer = offer_price_int
 
 
 def fingerprint_offer(o: dict) -> str:
-    provider = o.get("provider") or ""
-    origin = o.get("origin") or ""
-    dest = o.get("destination") or o.get("dest") or ""
-    depart_date = o.get("depart_date") or ""
-    dep = o.get("dep_time") or ""
-    arr = o.get("arr_time") or ""
-    next_day = "1" if o.get("next_day") else "0"
-    stops = str(o.get("stops") if o.get("stops") is not None else "")
-    airline = (o.get("airline") or "").strip().upper()
-    dur = _normalize_duration_bucket(o.get("duration_min"))
-    dur = str(dur if dur is not None else "")
-    return "|".join([provider, origin, dest, depart_date, dep, arr, next_day, dur, stops, airline])
+    return "|".join(offer_group_parts(o))
 
 
-def merge_offer(a: dict, b: dict) -> dict:
-    out = deepcopy(a)
-    pa, pb = _price_int_from_offer(a), _price_int_from_offer(b)
+def _merge_into(out: dict, b: dict) -> dict:
+    """Funde b em out (in-place). Mesmas regras de merge_offer."""
+    pa, pb = _price_int_from_offer(out), _price_int_from_offer(b)
     if pa is None:
         out["price"] = b.get("price")
         out["price_int"] = pb
@@ -92,17 +74,21 @@ def merge_offer(a: dict, b: dict) -> dict:
         if "oficial" not in out["partner"].lower() and "oficial" in b["partner"].lower():
             out["partner"] = b.get("partner")
 
-    ea = a.get("extra_offers") or a.get("extra_offers_count") or 0
+    ea = out.get("extra_offers") or out.get("extra_offers_count") or 0
     eb = b.get("extra_offers") or b.get("extra_offers_count") or 0
     out["extra_offers"] = max(ea, eb)
 
-    ta = a.get("raw_text") or ""
+    ta = out.get("raw_text") or ""
     tb = b.get("raw_text") or ""
     if len(tb) > len(ta):
         out["raw_text"] = tb
     return out
 
 
+def merge_offer(a: dict, b: dict) -> dict:
+    return _merge_into(deepcopy(a), b)
+
+
 def compute_confidence(o: dict) -> int:
     price_ok = _price_int_from_offer(o) is not None
     link_ok = bool(o.get("link"))
@@ -172,7 +158,107 @@ def dedupe_and_rank(offers: list[dict], *, avg_price: Optional[float] = None) ->
     deduped.sort(key=lambda o: compute_rank_score(o, avg_price=avg_price))
     return deduped
 
-def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_date, queue, state_store):
+
+def _num(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def rank_order_batch(offers: List[dict], *, avg_price: Optional[float] = None) -> List[int]:
+    """
+    Ordem (índices) de compute_rank_score para uma lista já deduplicada.
+
+    Converte as ofertas em colunas uma única vez e calcula o score em bloco
+    (NumPy se instalado, senão arrays da stdlib). compute_confidence só roda
+    para ofertas sem preço, único caso em que entra no score.
+    Ordenação estável: empates mantêm a ordem de entrada, como em dedupe_and_rank.
+    """
+    n = len(offers)
+    price = array("d", bytes(8 * n))
+    has_price = array("b", bytes(n))
+    dur = array("d", bytes(8 * n))
+    stops = array("d", bytes(8 * n))
+    next_day = array("d", bytes(8 * n))
+    extra = array("d", bytes(8 * n))
+    conf = array("d", bytes(8 * n))
+    for i, o in enumerate(offers):
+        p = _price_int_from_offer(o)
+        if p is not None:
+            price[i] = p
+            has_price[i] = 1
+        else:
+            conf[i] = compute_confidence(o)
+        dur[i] = _num(o.get("duration_min") or 9999, 9999.0)
+        stops[i] = _num(o.get("stops") or 0, 0.0)
+        next_day[i] = 1.0 if o.get("next_day") else 0.0
+        extra[i] = min(int(o.get("extra_offers") or o.get("extra_offers_count") or 0), 10)
+
+    w_price = RANK_WEIGHTS["price"]
+    w_dur = RANK_WEIGHTS["duration"]
+    w_stops = RANK_WEIGHTS["stops"]
+    w_next = RANK_WEIGHTS["next_day_penalty"]
+    w_below = RANK_WEIGHTS["below_avg_bonus"]
+
+    if np is not None and n:
+        P = np.frombuffer(price, dtype=np.float64)
+        D = np.frombuffer(dur, dtype=np.float64)
+        S = np.frombuffer(stops, dtype=np.float64)
+        N = np.frombuffer(next_day, dtype=np.float64)
+        E = np.frombuffer(extra, dtype=np.float64)
+        C = np.frombuffer(conf, dtype=np.float64)
+        H = np.frombuffer(has_price, dtype=np.int8).astype(bool)
+        below = np.maximum(0.0, (avg_price - P) / avg_price) if avg_price else np.zeros(n)
+        priced = w_price * P + w_dur * D + w_stops * S + w_next * N - w_below * below - 2.0 * E
+        unpriced = 1_000_000.0 - C * 100.0 - D + w_next * N
+        scores = np.where(H, priced, unpriced)
+        return np.argsort(scores, kind="stable").tolist()
+
+    scores = array("d", bytes(8 * n))
+    for i in range(n):
+        if has_price[i]:
+            below = max(0.0, (avg_price - price[i]) / avg_price) if avg_price else 0.0
+            scores[i] = (
+                w_price * price[i]
+                + w_dur * dur[i]
+                + w_stops * stops[i]
+                + w_next * next_day[i]
+                - w_below * below
+                - 2.0 * extra[i]
+            )
+        else:
+            scores[i] = 1_000_000.0 - conf[i] * 100.0 - dur[i] + w_next * next_day[i]
+    return sorted(range(n), key=scores.__getitem__)
+
+
+def dedupe_and_rank_batch(offers: List[dict], *, avg_price: Optional[float] = None) -> List[dict]:
+    """
+    Variante de dedupe_and_rank para lotes grandes: mesma ordem, sem deepcopy.
+
+    Ofertas únicas voltam como o próprio objeto de entrada (não são copiadas
+    nem recebem "confidence"); só itinerários repetidos geram um dict novo
+    (cópia rasa + merge). Agrupa pela tupla da chave de fingerprint_offer
+    (cacheada quando a oferta é um Offer); a tupla, e não só o hash, evita
+    juntar itinerários diferentes numa colisão.
+    """
+    bucket: dict[tuple, dict] = {}
+    merged_keys = set()
+    for o in offers:
+        key = o.group_parts if isinstance(o, Offer) else offer_group_parts(o)
+        cur = bucket.get(key)
+        if cur is None:
+            bucket[key] = o
+        elif key in merged_keys:
+            _merge_into(cur, o)
+        else:
+            bucket[key] = _merge_into(cur.copy(), o)
+            merged_keys.add(key)
+    deduped = list(bucket.values())
+    return [deduped[i] for i in rank_order_batch(deduped, avg_price=avg_price)]
+
+
+def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_date, queue, state_store, enrich=None):
     logger = logging.getLogger("kiwi_bot")
     if not flights:
         return DecisionResult(False, "NO_FLIGHTS", None, 0, None)
@@ -186,7 +272,7 @@ def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_da
     except Exception:
         avg_price = None
 
-    ranked = dedupe_and_rank(flights, avg_price=avg_price)
+    ranked = dedupe_and_rank_batch(flights, avg_price=avg_price)
     if not ranked:
         return DecisionResult(False, "NO_FLIGHTS", None, 0, None)
     min_price_local = _price_int_from_offer(ranked[0])
@@ -197,9 +283,13 @@ def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_da
     best = pick_best_3_buckets(ranked, ceiling)
     if not best:
         return DecisionResult(False, "NO_BEST_BUCKETS", None, 0, None)
+    # Ranking não copia: só os vencedores (≤3) viram cópia antes de enrich/price_text
+    best = [f.copy() for f in best]
     # ID forte
-    offer = dict(best[0])
-    offer["depart_date"] = depart_date
+    offer = Offer.wrap(best[0])
+    if offer.get("depart_date") != depart_date:
+        offer = offer.copy()
+        offer["depart_date"] = depart_date
     score, meta = compute_priority_score(
         price=min_price_local,
         ceiling=ceiling,
@@ -208,8 +298,7 @@ def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_da
         state_store=state_store
     )
     priority = score
-    offer_id = make_offer_id(offer)
-    dedupe_key = make_dedupe_key(offer_id, channel="WHATSAPP", kind="ALERT")
+    dedupe_key = offer.dedupe_key(channel="WHATSAPP", kind="ALERT")
     # Dedupe fila
     if is_in_queue(queue, dedupe_key):
         logger.debug(f"[DEDUPE] skip reason=DUPLICATE_QUEUE key={dedupe_key}")
@@ -227,7 +316,20 @@ def evaluate_offer_batch(*, flights, min_price, ceiling, origin, dest, depart_da
             state_store.record_sample(route_key, trip_type, min_price_local)
         except Exception:
             pass
+    # Só os vencedores que vão virar mensagem ganham share link (interação cara no browser)
+    if enrich is not None:
+        try:
+            enrich(best)
+        except Exception as e:
+            logger.warning(f"[SHARE] enrich falhou: {e}")
+    for f in best:
+        price_int = _price_int_from_offer(f)
+        if price_int is not None and not f.get("price_text"):
+            f["price_text"] = price_text(price_int)
+        if not f.get("duration_text"):
+            f["duration_text"] = duration_text(f.get("duration_min"))
     message_text = build_grouped_message(
+        "OW",
         origin,
         dest,
         depart_date,
@@ -1,22 +1,18 @@
 import hashlib
 import logging
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
-def make_offer_fingerprint(offer: Dict) -> str:
-    """
-    Build a stable fingerprint for dedupe, including provider.
+# Campos que definem a identidade da oferta: mudar qualquer um invalida as chaves
+OFFER_KEY_FIELDS = frozenset({
+    "provider", "origin", "origin_code", "destination", "dest_code", "dest",
+    "depart_date", "dep_time", "arr_time", "airline", "duration_min", "stops", "next_day",
+})
 
-    Key order (stable itinerary core):
-        provider|origin|destination|depart_date|dep_time|arr_time|airline|duration_min|stops|next_day
 
-    Normalization rules:
-        - provider/origin/destination/airline -> upper()
-        - missing fields -> empty string
-        - next_day -> "1" or "0"
-    """
+def _offer_key_parts(offer: Dict) -> Tuple[str, ...]:
     provider = (offer.get("provider") or "").upper()
     origin = (offer.get("origin") or offer.get("origin_code") or "").upper()
     destination = (offer.get("destination") or offer.get("dest_code") or "").upper()
@@ -29,7 +25,7 @@ def make_offer_fingerprint(offer: Dict) -> str:
     stops = stops if stops is not None else ""
     next_day = "1" if offer.get("next_day") else "0"
 
-    parts = [
+    return (
         provider,
         origin,
         destination,
@@ -40,10 +36,67 @@ def make_offer_fingerprint(offer: Dict) -> str:
         str(duration_min or ""),
         str(stops or ""),
         next_day,
-    ]
-    raw = "|".join(parts)
+    )
+
+
+def make_offer_fingerprint(offer: Dict) -> str:
+    """
+    Build a stable fingerprint for dedupe, including provider.
+
+    Key order (stable itinerary core):
+        provider|origin|destination|depart_date|dep_time|arr_time|airline|duration_min|stops|next_day
+
+    Normalization rules:
+        - provider/origin/destination/airline -> upper()
+        - missing fields -> empty string
+        - next_day -> "1" or "0"
+
+    Persisted (queue / seen keys): never change the hash or the key layout.
+    """
+    raw = "|".join(_offer_key_parts(offer))
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
+
+def _normalize_duration_bucket(duration_min: Optional[int]) -> Optional[int]:
+    if duration_min is None:
+        return None
+    try:
+        return int(round(duration_min / 5) * 5)
+    except Exception:
+        return duration_min
+
+
+def offer_group_parts(offer: Dict) -> Tuple[str, ...]:
+    """
+    Chave de agrupamento em memória (dedupe do decision engine): duração em
+    buckets de 5 min, sem normalizar origem/destino.
+    Ordem: provider|origin|dest|depart_date|dep|arr|next_day|dur|stops|airline
+    """
+    stops = offer.get("stops")
+    dur = _normalize_duration_bucket(offer.get("duration_min"))
+    return (
+        offer.get("provider") or "",
+        offer.get("origin") or "",
+        offer.get("destination") or offer.get("dest") or "",
+        offer.get("depart_date") or "",
+        offer.get("dep_time") or "",
+        offer.get("arr_time") or "",
+        "1" if offer.get("next_day") else "0",
+        str(dur if dur is not None else ""),
+        str(stops if stops is not None else ""),
+        (offer.get("airline") or "").strip().upper(),
+    )
+
+
+def fast_offer_hash(offer: Dict) -> int:
+    """
+    Hash não-criptográfico (hash() nativo) da chave de agrupamento.
+    Só para agrupar dentro do processo: muda a cada execução (PYTHONHASHSEED),
+    nunca persistir.
+    """
+    return hash(offer_group_parts(offer))
+
+
 def make_offer_id(offer: Dict) -> str:
     """
     Gera um ID forte e estável para o voo/oferta.
@@ -0,0 +1,92 @@
+"""
+Ganchos de parada antecipada para os scrapers em streaming (iter_offers).
+
+Cada gancho é um callable stop(offer) -> bool, chamado depois que a oferta
+foi entregue; True encerra a extração dos cards restantes. Os ganchos
+guardam estado: crie um novo por busca.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from bot.decision_buckets import day_bucket
+
+DAY_BUCKETS = ("manha", "tarde", "noite")
+
+StopHook = Callable[[Dict[str, Any]], bool]
+
+
+def offer_price(offer: Dict[str, Any]) -> Optional[int]:
+    price = offer.get("price_int")
+    if price is None and isinstance(offer.get("price"), int):
+        price = offer["price"]
+    return price if price and price > 0 else None
+
+
+def k_below_ceiling(k: int, ceiling: int) -> StopHook:
+    """Para quando k ofertas com preço <= teto já saíram."""
+    found = 0
+
+    def stop(offer: Dict[str, Any]) -> bool:
+        nonlocal found
+        price = offer_price(offer)
+        if price is not None and price <= ceiling:
+            found += 1
+        return found >= k
+
+    return stop
+
+
+def sorted_above_ceiling(ceiling: int) -> StopHook:
+    """Página ordenada por preço: o primeiro card acima do teto encerra (os seguintes são mais caros)."""
+
+    def stop(offer: Dict[str, Any]) -> bool:
+        price = offer_price(offer)
+        return price is not None and price > ceiling
+
+    return stop
+
+
+def buckets_filled(ceiling: int) -> StopHook:
+    """
+    Página ordenada por preço: pick_best_3_buckets só usa a 1ª oferta <= teto
+    de cada período (manhã/tarde/noite); com os três preenchidos, o resto
+    da página não pode ser escolhido.
+    """
+    filled = set()
+
+    def stop(offer: Dict[str, Any]) -> bool:
+        price = offer_price(offer)
+        if price is not None and price <= ceiling:
+            bucket = day_bucket(offer.get("dep_time") or "")
+            if bucket in DAY_BUCKETS:
+                filled.add(bucket)
+        return len(filled) == len(DAY_BUCKETS)
+
+    return stop
+
+
+def any_of(*hooks: Optional[StopHook]) -> Optional[StopHook]:
+    """Combina ganchos (todos são chamados, para manterem o estado em dia)."""
+    hooks = tuple(h for h in hooks if h is not None)
+    if not hooks:
+        return None
+    if len(hooks) == 1:
+        return hooks[0]
+
+    def stop(offer: Dict[str, Any]) -> bool:
+        return any([h(offer) for h in hooks])
+
+    return stop
+
+
+def sorted_page_stop(ceiling: Optional[int], *, round_trip: bool = False) -> Optional[StopHook]:
+    """
+    Gancho padrão para páginas ordenadas por preço: para no 1º card acima do
+    teto ou quando o que a decisão usa já saiu (OW: os três períodos do dia;
+    RT: as 3 mais baratas).
+    """
+    if ceiling is None:
+        return None
+    enough = k_below_ceiling(3, ceiling) if round_trip else buckets_filled(ceiling)
+    return any_of(enough, sorted_above_ceiling(ceiling))
@@ -0,0 +1,121 @@
+"""
+Share link sob demanda: só para os vencedores de pick_best_3_buckets que vão
+virar mensagem, nunca para todos os cards do scrape.
+
+O link sai primeiro do cache (share_links, por offer_id: o mesmo itinerário
+realertado reaproveita o link). Os que faltam são buscados no card
+(card_index) ainda aberto no browser do provider; providers diferentes rodam
+em paralelo, um por browser (uma página só comporta um modal por vez).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bot.config import SHARE_LINK_CACHE_TTL_SECONDS, SHARE_LINK_ENABLED, SHARE_LINK_PROVIDERS
+from bot.offer_model import Offer
+
+logger = logging.getLogger("kiwi_bot")
+
+CARD_SELECTOR = '[data-test="ResultCardWrapper"]'
+
+Fetch = Callable[[Any, dict], Tuple[Optional[str], str]]
+
+
+def _offer_id(offer: dict) -> str:
+    return offer.get("offer_id") or Offer.wrap(offer).offer_id
+
+
+def _price_digits(offer: dict) -> Optional[str]:
+    price = offer.get("price_int")
+    return str(price) if price else None
+
+
+def fetch_from_card(driver, offer: dict) -> Tuple[Optional[str], str]:
+    """(link, reason) do card offer['card_index'] da página de resultados aberta."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from bot.enrichment.share_link_enricher import enrich_share_link
+
+    index = offer.get("card_index")
+    if index is None:
+        return None, "NO_CARD_INDEX"
+    cards = driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR)
+    if index >= len(cards):
+        return None, "CARD_NOT_FOUND"
+    card = cards[index]
+    # A página pode ser outra busca (oferta veio do cache): confere o preço no card
+    digits = _price_digits(offer)
+    if digits and digits not in re.sub(r"\D", "", card.text or ""):
+        return None, "CARD_MISMATCH"
+    return enrich_share_link(driver, WebDriverWait(driver, 3), card_element=card)
+
+
+def enrich_winners(
+    winners: List[dict],
+    drivers: Dict[str, Any],
+    *,
+    store=None,
+    fetch: Fetch = fetch_from_card,
+    providers=SHARE_LINK_PROVIDERS,
+    ttl_seconds: int = SHARE_LINK_CACHE_TTL_SECONDS,
+) -> Dict[str, int]:
+    """
+    Preenche offer['share_link'] nos vencedores (in-place).
+    Retorna contadores {"cached", "fetched", "failed"}.
+    """
+    counts = {"cached": 0, "fetched": 0, "failed": 0}
+    todo = [o for o in winners if not o.get("share_link") and o.get("provider") in providers]
+    if not SHARE_LINK_ENABLED or not todo:
+        return counts
+    if store is None:
+        import state_store as store
+
+    ids = {id(o): _offer_id(o) for o in todo}
+    try:
+        cached = store.get_share_links(sorted(set(ids.values())), ttl_seconds)
+    except Exception as e:
+        logger.warning(f"[SHARE] cache indisponível: {e}")
+        cached = {}
+    by_provider: Dict[str, List[dict]] = {}
+    for offer in todo:
+        link = cached.get(ids[id(offer)])
+        if link:
+            offer["share_link"] = link
+            counts["cached"] += 1
+        elif offer.get("provider") in drivers:
+            by_provider.setdefault(offer["provider"], []).append(offer)
+
+    def _run(provider: str) -> List[Tuple[dict, Optional[str], str]]:
+        out = []
+        for offer in by_provider[provider]:
+            try:
+                link, reason = fetch(drivers[provider], offer)
+            except Exception as e:
+                link, reason = None, f"ERROR: {e}"
+            out.append((offer, link, reason))
+        return out
+
+    names = list(by_provider)
+    if len(names) == 1:
+        results = [_run(names[0])]
+    elif names:
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="share") as pool:
+            results = list(pool.map(_run, names))
+    else:
+        results = []
+
+    for offer, link, reason in (r for batch in results for r in batch):
+        if not link:
+            counts["failed"] += 1
+            logger.info(f"[SHARE] {offer.get('provider')} card={offer.get('card_index')} sem link: {reason}")
+            continue
+        offer["share_link"] = link
+        counts["fetched"] += 1
+        try:
+            store.save_share_link(ids[id(offer)], link)
+        except Exception as e:
+            logger.warning(f"[SHARE] cache não gravado: {e}")
+    return counts
@@ -29,7 +29,8 @@ def find_share_button(card, wait=None, timeout=2):
     for by, sel in selectors:
         try:
             if wait:
-                btn = wait.until(EC.element_to_be_clickable((by, sel)), timeout=timeout)
+                # WebDriverWait sobre o card: o localizador busca só dentro dele
+                btn = WebDriverWait(card, timeout).until(EC.element_to_be_clickable((by, sel)))
             else:
                 btn = card.find_element(by, sel)
             return btn
@@ -53,8 +54,8 @@ def extract_link_from_share_modal(modal):
             href = a.get_attribute('href')
             if href and href.startswith('http') and 'kiwi' in href:
                 return href
-        # 3. textContent
-        spans = modal.find_elements(By.CSS_SELECTOR, '*')
+        # 3. textContent (só elementos cujo texto começa com http, não a árvore toda)
+        spans = modal.find_elements(By.XPATH, ".//*[starts-with(normalize-space(text()), 'http')]")
         for s in spans:
             txt = s.text.strip()
             if txt.startswith('http') and 'kiwi' in txt:
@@ -89,7 +90,7 @@ def enrich_share_link(driver, wait, *, card_element=None, card_index=0):
         except Exception:
             driver.execute_script("arguments[0].click();", share_btn)
         try:
-            modal = wait.until(EC.visibility_of_element_located((By.XPATH, "//div[contains(@role,'dialog') or contains(@class,'modal') or contains(@data-test,'ShareDialog')]")), timeout=3)
+            modal = WebDriverWait(driver, 3).until(EC.visibility_of_element_located((By.XPATH, "//div[contains(@role,'dialog') or contains(@class,'modal') or contains(@data-test,'ShareDialog')]")))
         except TimeoutException:
             return None, 'MODAL_NOT_FOUND'
         # 5. Extrair link do DOM
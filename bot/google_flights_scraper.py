@@ -11,6 +11,7 @@ from selenium.common.exceptions import TimeoutException
 from bot.status_codes import ScrapeStatus, ScrapeReason, ScrapeResult
 from bot.price_extractor import extract_price_int_from_text, _parse_duration_minutes, parse_flight_card_text
 from bot.pricing_utils import brl
+from bot.rate_limit import polite_get
 
 RESULT_SELECTORS = [
     (By.CSS_SELECTOR, "div[role='listitem']"),
@@ -292,13 +293,14 @@ def _parse_card_text(text: str) -> dict:
     }
 
 
-def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
+def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10, stop=None):
+    """stop(flight) -> True encerra a leitura dos cards; debug["cards_skipped"] conta os não lidos."""
     flights = []
     min_price = None
     debug = {"url": url, "source": "google_flights"}
     try:
         print(f"[SCRAPE] {url}")
-        driver.get(url)
+        polite_get(driver, url)
         time.sleep(1.0)
 
         try:
@@ -327,7 +329,9 @@ def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
                 debug=debug
             )
 
-        for card in cards[:max_results]:
+        cards = cards[:max_results]
+        debug["cards_skipped"] = 0
+        for index, card in enumerate(cards):
             try:
                 dep_time, arr_time = _parse_times_from_card(card)
                 origin, dest = _parse_route_from_card(card)
@@ -362,6 +366,9 @@ def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
             if not data or data.get("price_int") is None:
                 continue
             flights.append(data)
+            if stop is not None and stop(data):
+                debug["cards_skipped"] = len(cards) - index - 1
+                break
 
         prices = [f.get("price_int") for f in flights if f.get("price_int") is not None]
         min_price = min(prices) if prices else None
@@ -0,0 +1,235 @@
+"""
+Fast path HTTP para providers cujo resultado vem de uma API JSON.
+
+1. Na busca via Selenium, a resposta JSON de resultados é capturada (CDP) e
+   vira um ReplayTemplate (URL/corpo com {{origin}}, {{dest}}, {{date}}...).
+2. Nas buscas seguintes o template é reenviado com um requests.Session
+   compartilhado (keep-alive); a resposta passa por spec.validate/parse.
+3. Qualquer falha (HTTP, JSON, schema) cai no Selenium, que reaprende.
+
+Cada provider com API conhecida registra um ApiSpec em API_SPECS.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from bot.config import (
+    HTTP_FASTPATH_ENABLED,
+    HTTP_FASTPATH_TIMEOUT_SECONDS,
+    HTTP_FASTPATH_MAX_FAILURES,
+)
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+
+logger = logging.getLogger("kiwi_bot")
+
+
+@dataclass
+class ApiSpec:
+    provider: str
+    match: Callable[[str], bool]  # URL da resposta de resultados
+    validate: Callable[[Any], bool]  # schema esperado?
+    parse: Callable[..., List[dict]]  # parse(data, origin, dest, depart_date) -> ofertas
+
+
+API_SPECS: Dict[str, ApiSpec] = {}
+
+
+def register_api_spec(spec: ApiSpec) -> None:
+    API_SPECS[spec.provider] = spec
+
+
+def fastpath_enabled(provider: str) -> bool:
+    return HTTP_FASTPATH_ENABLED and provider in API_SPECS
+
+
+# ====== TEMPLATE ======
+
+# Headers que o requests/HTTP refaz sozinho ou que não fazem sentido no replay
+_DROP_HEADERS = {"content-length", "host", "accept-encoding", "connection"}
+
+
+def _token_re(value: str) -> re.Pattern:
+    return re.compile(r"(?<![A-Za-z0-9])" + re.escape(value) + r"(?![A-Za-z0-9])")
+
+
+def _placeholders(origin: str, dest: str, depart_date: str) -> List[tuple]:
+    # Ordem importa: data antes dos códigos (evita casar pedaços)
+    return [
+        ("{{date}}", depart_date),
+        ("{{date_compact}}", depart_date.replace("-", "")),
+        ("{{date_br}}", "-".join(reversed(depart_date.split("-")))),  # DD-MM-YYYY (viajala)
+        ("{{origin}}", origin.upper()),
+        ("{{origin_lower}}", origin.lower()),
+        ("{{dest}}", dest.upper()),
+        ("{{dest_lower}}", dest.lower()),
+    ]
+
+
+def _templatize(text: Optional[str], origin: str, dest: str, depart_date: str) -> tuple:
+    if not text:
+        return text, set()
+    found = set()
+    for token, value in _placeholders(origin, dest, depart_date):
+        text, n = _token_re(value).subn(token, text)
+        if n:
+            found.add(token.strip("{}").split("_")[0])
+    return text, found
+
+
+@dataclass
+class ReplayTemplate:
+    method: str
+    url: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+
+    def render(self, origin: str, dest: str, depart_date: str) -> tuple:
+        def fill(text):
+            if text is None:
+                return None
+            for token, value in _placeholders(origin, dest, depart_date):
+                text = text.replace(token, value)
+            return text
+
+        return fill(self.url), dict(self.headers), fill(self.body)
+
+    def to_dict(self) -> dict:
+        return {"method": self.method, "url": self.url, "headers": self.headers, "body": self.body}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ReplayTemplate":
+        return cls(method=d.get("method") or "GET", url=d["url"], headers=d.get("headers") or {}, body=d.get("body"))
+
+
+def learn_template(exchange, origin: str, dest: str, depart_date: str) -> Optional[ReplayTemplate]:
+    """
+    Converte a requisição capturada em template. Exige que data e origem/destino
+    apareçam na URL ou no corpo; senão a API não é parametrizável e retorna None.
+    """
+    url, found_url = _templatize(exchange.url, origin, dest, depart_date)
+    body, found_body = _templatize(exchange.post_data, origin, dest, depart_date)
+    found = found_url | found_body
+    if "date" not in found or not ({"origin", "dest"} & found):
+        return None
+    headers = {
+        k: v for k, v in (exchange.request_headers or {}).items()
+        if not k.startswith(":") and k.lower() not in _DROP_HEADERS
+    }
+    return ReplayTemplate(method=(exchange.method or "GET").upper(), url=url, headers=headers, body=body)
+
+
+# ====== HTTP ======
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    """requests.Session compartilhado (keep-alive, pool por host)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def replay(template: ReplayTemplate, origin: str, dest: str, depart_date: str, timeout: float = HTTP_FASTPATH_TIMEOUT_SECONDS) -> Any:
+    """Reenvia a requisição e retorna o JSON. Levanta exceção em erro HTTP/JSON."""
+    from bot.rate_limit import acquire_for_url
+
+    url, headers, body = template.render(origin, dest, depart_date)
+    acquire_for_url(url)
+    resp = get_session().request(
+        template.method,
+        url,
+        headers=headers,
+        data=body.encode("utf-8") if body is not None else None,
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+# ====== SCRAPE ======
+
+def _store():
+    import state_store
+
+    return state_store
+
+
+def http_first_scrape(
+    provider: str,
+    selenium_fn: Callable[..., ScrapeResult],
+    driver,
+    origin: str,
+    dest: str,
+    depart_date: str,
+    *,
+    ceiling: Optional[int] = None,
+    max_cards: int = 30,
+    store=None,
+) -> ScrapeResult:
+    """Tenta o replay HTTP; se não houver template ou falhar, usa o Selenium (aprendendo o template)."""
+    spec = API_SPECS.get(provider)
+    if spec is None or not HTTP_FASTPATH_ENABLED:
+        return selenium_fn(driver, origin, dest, depart_date, ceiling=ceiling, max_cards=max_cards)
+    store = store or _store()
+
+    raw_tpl = None
+    try:
+        raw_tpl = store.get_api_template(provider)
+    except Exception as e:
+        logger.warning(f"[FASTPATH] {provider} falha ao ler template: {e}")
+
+    if raw_tpl:
+        template = ReplayTemplate.from_dict(raw_tpl)
+        try:
+            data = replay(template, origin, dest, depart_date)
+            if not spec.validate(data):
+                raise ValueError("schema inesperado")
+            offers = spec.parse(data, origin, dest, depart_date)[:max_cards]
+            store.record_api_template_result(provider, True, HTTP_FASTPATH_MAX_FAILURES)
+            prices = [o["price_int"] for o in offers if o.get("price_int")]
+            logger.info(f"[FASTPATH] {provider} {origin}->{dest} {depart_date} http offers={len(offers)}")
+            return ScrapeResult(
+                status=ScrapeStatus.OK if offers else ScrapeStatus.EMPTY,
+                reason=ScrapeReason.UNKNOWN if offers else ScrapeReason.NO_RESULTS,
+                flights=offers,
+                min_price=min(prices) if prices else -1,
+                debug={"provider": provider, "mode": "http"},
+            )
+        except Exception as e:
+            failures = store.record_api_template_result(provider, False, HTTP_FASTPATH_MAX_FAILURES)
+            logger.info(f"[FASTPATH] {provider} replay falhou ({type(e).__name__}: {e}) failures={failures}; usando Selenium")
+
+    from bot.network_capture import shared_capture
+
+    capture = shared_capture(driver)
+    capture.watch(spec.match)
+    capture.reset()
+    result = selenium_fn(driver, origin, dest, depart_date, ceiling=ceiling, max_cards=max_cards)
+    capture.poll()
+    for exchange in capture.completed:
+        if not spec.match(exchange.url) or not spec.validate(exchange.body):
+            continue
+        template = learn_template(exchange, origin, dest, depart_date)
+        if template is not None:
+            store.save_api_template(provider, template.to_dict())
+            logger.info(f"[FASTPATH] {provider} template aprendido: {template.method} {template.url[:120]}")
+            break
+    if result.debug is None:
+        result.debug = {}
+    result.debug.setdefault("mode", "selenium")
+    return result
@@ -22,46 +22,23 @@ def wait_results(driver, timeout=20):
 import time
 import re
 import traceback
-from pathlib import Path
-import tempfile
 from typing import List, Dict, Tuple
 from bot.status_codes import ScrapeStatus, ScrapeReason, ScrapeResult
 from bot.kiwi_cookies import try_accept_cookies, is_overlay_blocking
 from bot.price_extractor import compute_min_price, find_price_for_sector
+from bot.rate_limit import polite_get
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
 # === Debug helpers ===
-DEBUG_DIR = Path(tempfile.gettempdir()) / "kiwi_debug"
-DEBUG_DIR.mkdir(parents=True, exist_ok=True)
-
 def dump_debug(driver, tag=""):
-    ts = time.strftime("%Y%m%d_%H%M%S")
-    safe_tag = tag.replace(" ", "_")[:60]
-    base = DEBUG_DIR / f"{ts}_{safe_tag}"
-    html = ""
-    # URL/título
-    try:
-        (base.with_suffix(".meta.txt")).write_text(
-            f"URL: {getattr(driver, 'current_url', '?')}\nTITLE: {getattr(driver, 'title', '?')}\n",
-            encoding="utf-8", errors="ignore",
-        )
-    except Exception:
-        pass
-    # HTML completo
-    try:
-        html = getattr(driver, 'page_source', '') or ""
-        (base.with_suffix(".html")).write_text(html, encoding="utf-8", errors="ignore")
-    except Exception:
-        pass
-    # Screenshot
-    try:
-        driver.save_screenshot(str(base.with_suffix(".png")))
-    except Exception:
-        pass
-    print(f"[DEBUG] dumped: {base}.html/.png/.meta.txt  (len_html={len(html)})")
+    """HTML/PNG/URL da página, amostrado e gravado em segundo plano (bot.debug_capture)."""
+    from bot.debug_capture import capture
+
+    if capture(f"kiwi_{tag.replace(' ', '_')}" if tag else "kiwi", driver):
+        print(f"[DEBUG] captura enfileirada: kiwi {tag}")
 
 def looks_like_block(driver) -> bool:
     html = (getattr(driver, 'page_source', '') or '').lower()
@@ -81,10 +58,12 @@ def print_browser_logs(driver):
 from typing import List, Dict, Tuple
 
 
-def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
+def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10, stop=None):
     """
     Função principal de scraping Selenium para Kiwi.
     Retorna ScrapeResult.
+    stop(flight) -> True encerra a leitura dos cards (página ordenada por preço,
+    ver bot.early_exit); debug["cards_skipped"] conta os cards não lidos.
     """
     # === Navegação e scraping principal ===
     flights = []
@@ -92,7 +71,7 @@ def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
     debug = {"url": url}
     try:
         print(f"[SCRAPE] {url}")
-        driver.get(url)
+        polite_get(driver, url)
         dump_debug(driver, "after_get")
 
 
@@ -265,8 +244,11 @@ def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
                 debug=debug
             )
         # Preenche voos e preços robustamente
-        min_price, price_debug = compute_min_price(sectors[:max_results])
-        for sector in sectors[:max_results]:
+        sectors = sectors[:max_results]
+        if stop is None:
+            min_price, price_debug = compute_min_price(sectors)
+        cards_skipped = 0
+        for card_index, sector in enumerate(sectors):
             try:
                 times = sector.find_elements(By.CSS_SELECTOR, '[data-test="TripTimestamp"] time')
                 hhmm = [t.text.strip() for t in times if re.match(r"^\d{1,2}:\d{2}$", (t.text or "").strip())]
@@ -301,9 +283,19 @@ def scrape_with_selenium(driver, wait, url, price_ceiling, max_results=10):
                     "dest_code": dest_code,
                     "stops": stops,
                     "airline": airline,
+                    "card_index": card_index,  # share link sob demanda (bot.enrichment.lazy_share)
                 })
             except Exception:
                 continue
+            if stop is not None and stop(flights[-1]):
+                cards_skipped = len(sectors) - card_index - 1
+                break
+        if stop is not None:
+            # Preço mínimo só dos cards lidos (página ordenada: o 1º é o mais barato)
+            prices = [f["price_int"] for f in flights if f.get("price_int")]
+            min_price = min(prices) if prices else None
+            price_debug = {"prices_found": prices, "early_exit": True}
+        debug["cards_skipped"] = cards_skipped
         debug["price_debug"] = price_debug
         if not flights:
             # Salva HTML, screenshot e printa page_source para debug de página sem resultados
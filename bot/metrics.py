@@ -0,0 +1,291 @@
+"""
+Métricas do ciclo num registro só, no formato texto do Prometheus.
+
+- Contadores, gauges e histogramas com labels, atualizados na hora:
+  attempts por fase/motivo, latência de scrape por provider, fila por
+  status, envios por grupo, restart de browser e latência de banco.
+- Uma thread de fundo regrava o textfile (node_exporter
+  --collector.textfile) no máximo a cada METRICS_WRITE_SECONDS e só se
+  algo mudou; com METRICS_HTTP_PORT o mesmo texto sai em
+  http://127.0.0.1:<porta>/metrics.
+- Cada processo grava o seu arquivo (kiwi_bot_<component>.prom) e toda
+  série leva o label component: runner e sender não colidem.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Tuple
+
+from bot.config import METRICS_ENABLED, METRICS_HTTP_PORT, METRICS_TEXTFILE_DIR, METRICS_WRITE_SECONDS
+
+logger = logging.getLogger("kiwi_bot")
+
+_LATENCY_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Mapping[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._registry.dirty = True
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _lines(self, component: str) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key, component)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._registry.lock:
+            self._values[key] = value
+            self._registry.dirty = True
+
+    def set_by(self, values: Mapping[str, float], label: str) -> None:
+        """Troca todas as séries de um gauge de 1 label (ex.: fila por status; status que sumiu vai a 0)."""
+        with self._registry.lock:
+            for key in self._values:
+                self._values[key] = 0
+            for label_value, value in values.items():
+                self._values[self._key({label: label_value})] = value
+            self._registry.dirty = True
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = _LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [contagem por bucket..., soma, total]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._registry.lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+            self._registry.dirty = True
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0
+
+    def _lines(self, component: str) -> Iterator[str]:
+        for key, row in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, component + ',' + le if component else le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key, component)} {_number(row[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key, component)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.component = ""
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help_text: str, labelnames: Sequence[str] = (), **kwargs):
+        with self.lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=_LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Formato texto do Prometheus (0.0.4), com label component quando definido."""
+        component = f'component="{_escape(self.component)}"' if self.component else ""
+        out = []
+        with self.lock:
+            for name, metric in sorted(self._metrics.items()):
+                lines = list(metric._lines(component))
+                if not lines:
+                    continue
+                out.append(f"# HELP {name} {metric.help}")
+                out.append(f"# TYPE {name} {metric.kind}")
+                out.extend(lines)
+            self.dirty = False
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+ATTEMPTS = REGISTRY.counter("kiwi_bot_attempts_total", "Attempts por fase e motivo (SKIP/SCRAPE/DECISION).", ("phase", "reason"))
+SCRAPE_SECONDS = REGISTRY.histogram("kiwi_bot_scrape_seconds", "Duração de um scrape por provider, tipo de viagem e status.",
+                                    ("provider", "trip_type", "status"))
+QUEUE_DEPTH = REGISTRY.gauge("kiwi_bot_queue_depth", "Itens na fila de mensagens por status.", ("status",))
+SENDS = REGISTRY.counter("kiwi_bot_sends_total", "Mensagens enviadas por grupo.", ("group",))
+BROWSER_RESTARTS = REGISTRY.counter("kiwi_bot_browser_restarts_total", "Browsers reabertos após janela morta.", ("provider",))
+DB_SECONDS = REGISTRY.histogram("kiwi_bot_db_op_seconds", "Duração de operações no SQLite por função.", ("op",), buckets=_DB_BUCKETS)
+CYCLE_SECONDS = REGISTRY.gauge("kiwi_bot_cycle_duration_seconds", "Duração do último ciclo.")
+CYCLE_END = REGISTRY.gauge("kiwi_bot_last_cycle_end_timestamp_seconds", "Fim do último ciclo (unix).")
+CONSECUTIVE_FAILURES = REGISTRY.gauge("kiwi_bot_consecutive_failures", "Falhas seguidas de ciclo no serviço.")
+
+
+# ====== EXPORT ======
+
+def textfile_path(component: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or METRICS_TEXTFILE_DIR, f"kiwi_bot_{component}.prom")
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """Grava atômico (tmp + replace): o collector nunca lê arquivo pela metade."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Exporter:
+    """Thread de fundo que regrava o textfile; opcionalmente serve /metrics em 127.0.0.1."""
+
+    def __init__(self, component: str, registry: Registry = REGISTRY, directory: Optional[str] = None,
+                 interval: float = METRICS_WRITE_SECONDS, http_port: int = METRICS_HTTP_PORT):
+        self.registry = registry
+        self.path = textfile_path(component, directory)
+        self.interval = interval
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        registry.component = component
+        registry.dirty = True
+        if http_port:
+            try:
+                handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+                self.server = ThreadingHTTPServer(("127.0.0.1", http_port), handler)
+                threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+            except OSError as e:
+                logger.warning(f"[METRICS] porta {http_port} indisponível: {e}")
+        self._thread = threading.Thread(target=self._loop, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush(only_dirty=True)
+
+    def flush(self, only_dirty: bool = False) -> None:
+        if only_dirty and not self.registry.dirty:
+            return
+        try:
+            write_textfile(self.path, self.registry)
+        except OSError as e:
+            logger.warning(f"[METRICS] falha ao gravar {self.path}: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+_EXPORTER: Optional[Exporter] = None
+
+
+def start(component: str) -> Optional[Exporter]:
+    """Liga o export do processo (idempotente); com METRICS_ENABLED desligado só acumula em memória."""
+    global _EXPORTER
+    if _EXPORTER is None and METRICS_ENABLED:
+        _EXPORTER = Exporter(component)
+    return _EXPORTER
+
+
+def flush() -> None:
+    """Grava já (fim de ciclo / saída do sender)."""
+    if _EXPORTER is not None:
+        _EXPORTER.flush()
@@ -0,0 +1,176 @@
+"""
+Captura de respostas de rede do Chrome (CDP via performance log).
+
+Com o browser aberto com enable_network_capture(options), NetworkCapture lê
+Network.requestWillBeSent / responseReceived / loadingFinished do performance
+log e busca o corpo das respostas JSON com Network.getResponseBody.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("kiwi_bot")
+
+
+def enable_network_capture(options) -> None:
+    """Liga o performance log (eventos Network.*) nas opções do Chrome."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+@dataclass
+class CapturedExchange:
+    request_id: str
+    url: str
+    method: str = "GET"
+    request_headers: Dict[str, str] = field(default_factory=dict)
+    post_data: Optional[str] = None
+    status: Optional[int] = None
+    mime_type: str = ""
+    body: Any = None  # JSON decodificado
+
+
+def _read_events(driver) -> List[dict]:
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return []
+    events = []
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if str(msg.get("method", "")).startswith("Network."):
+            events.append(msg)
+    return events
+
+
+class NetworkCapture:
+    """
+    Acompanha as trocas de rede de um driver.
+
+    url_filter limita quais respostas JSON têm o corpo baixado (evita puxar
+    todo JSON de analytics). Criar o objeto descarta o log acumulado antes.
+    """
+
+    def __init__(self, driver, url_filter: Optional[Callable[[str], bool]] = None):
+        self.driver = driver
+        self.filters: List[Callable[[str], bool]] = [url_filter] if url_filter else []
+        self._pending: Dict[str, CapturedExchange] = {}
+        self.completed: List[CapturedExchange] = []
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+        except Exception:
+            pass
+        _read_events(driver)
+
+    def watch(self, url_filter: Callable[[str], bool]) -> None:
+        """Acrescenta um filtro de URL (quem compartilha a captura soma filtros)."""
+        if url_filter not in self.filters:
+            self.filters.append(url_filter)
+
+    def reset(self) -> None:
+        """Nova busca: descarta eventos e trocas anteriores."""
+        _read_events(self.driver)
+        self._pending.clear()
+        self.completed.clear()
+
+    def _wanted(self, url: str) -> bool:
+        return not self.filters or any(f(url) for f in self.filters)
+
+    def poll(self) -> List[CapturedExchange]:
+        """Processa eventos novos; retorna as trocas JSON concluídas nesta chamada."""
+        done: List[CapturedExchange] = []
+        for ev in _read_events(self.driver):
+            method = ev.get("method")
+            params = ev.get("params") or {}
+            rid = params.get("requestId")
+            if not rid:
+                continue
+            if method == "Network.requestWillBeSent":
+                req = params.get("request") or {}
+                url = req.get("url") or ""
+                if not self._wanted(url):
+                    continue
+                self._pending[rid] = CapturedExchange(
+                    request_id=rid,
+                    url=url,
+                    method=req.get("method") or "GET",
+                    request_headers=dict(req.get("headers") or {}),
+                    post_data=req.get("postData"),
+                )
+            elif method == "Network.responseReceived":
+                resp = params.get("response") or {}
+                ex = self._pending.get(rid)
+                if ex is None:
+                    url = resp.get("url") or ""
+                    if not self._wanted(url):
+                        continue
+                    ex = self._pending[rid] = CapturedExchange(request_id=rid, url=url)
+                ex.status = resp.get("status")
+                ex.mime_type = (resp.get("mimeType") or "").lower()
+            elif method == "Network.loadingFinished":
+                ex = self._pending.pop(rid, None)
+                if ex is None or "json" not in ex.mime_type:
+                    continue
+                ex.body = self._fetch_body(rid)
+                if ex.body is not None:
+                    done.append(ex)
+            elif method == "Network.loadingFailed":
+                self._pending.pop(rid, None)
+        self.completed.extend(done)
+        return done
+
+    def _fetch_body(self, request_id: str) -> Any:
+        try:
+            res = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception as e:
+            logger.debug(f"[NETCAP] getResponseBody falhou: {e}")
+            return None
+        body = res.get("body") or ""
+        if res.get("base64Encoded"):
+            import base64
+
+            body = base64.b64decode(body).decode("utf-8", "replace")
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    def wait_for(
+        self,
+        predicate: Callable[[CapturedExchange], bool],
+        timeout: float,
+        interval: float = 0.25,
+    ) -> Optional[CapturedExchange]:
+        """Espera a primeira troca que satisfaça predicate (ou None no timeout)."""
+        for ex in self.completed:
+            if predicate(ex):
+                return ex
+        deadline = time.time() + timeout
+        while True:
+            for ex in self.poll():
+                if predicate(ex):
+                    return ex
+            if time.time() >= deadline:
+                return None
+            time.sleep(interval)
+
+
+def shared_capture(driver) -> NetworkCapture:
+    """
+    Uma captura por driver: get_log consome o buffer, então scraper e fast
+    path precisam ler do mesmo objeto.
+    """
+    cap = getattr(driver, "_kiwi_network_capture", None)
+    if cap is None:
+        cap = NetworkCapture(driver)
+        try:
+            driver._kiwi_network_capture = cap
+        except AttributeError:
+            pass
+    return cap
@@ -0,0 +1,118 @@
+from typing import Dict, Optional
+
+from bot.dedupe import (
+    OFFER_KEY_FIELDS,
+    make_offer_fingerprint,
+    make_dedupe_key,
+    offer_group_parts,
+)
+
+
+class Offer(dict):
+    """
+    Oferta normalizada: continua sendo um dict (scrapers, selector e builder
+    não mudam), mas calcula fingerprint, offer_id, dedupe_key e a chave de
+    agrupamento uma única vez, sob demanda.
+
+    Alterar um campo de identidade (OFFER_KEY_FIELDS) via item/update/pop
+    descarta o cache. Cópias com dict(o) voltam a ser dict comum; use o.copy().
+    """
+
+    __slots__ = ("_fingerprint", "_group_parts", "_group_hash", "_dedupe_keys")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset_keys()
+
+    @classmethod
+    def wrap(cls, offer: Dict) -> "Offer":
+        """Retorna a própria oferta se já for Offer; senão converte (cópia rasa)."""
+        if isinstance(offer, cls):
+            return offer
+        return cls(offer)
+
+    def _reset_keys(self) -> None:
+        self._fingerprint: Optional[str] = None
+        self._group_parts = None
+        self._group_hash: Optional[int] = None
+        self._dedupe_keys: Dict[tuple, str] = {}
+
+    # ====== invalidação ======
+
+    def __setitem__(self, key, value):
+        if key in OFFER_KEY_FIELDS and self.get(key) != value:
+            self._reset_keys()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if key in OFFER_KEY_FIELDS:
+            self._reset_keys()
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        if not OFFER_KEY_FIELDS.isdisjoint(other):
+            self._reset_keys()
+        super().update(other)
+
+    def pop(self, key, *default):
+        if key in OFFER_KEY_FIELDS:
+            self._reset_keys()
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self and key in OFFER_KEY_FIELDS:
+            self._reset_keys()
+        return super().setdefault(key, default)
+
+    def copy(self) -> "Offer":
+        """Cópia rasa que preserva as chaves já calculadas."""
+        out = Offer(self)
+        out._fingerprint = self._fingerprint
+        out._group_parts = self._group_parts
+        out._group_hash = self._group_hash
+        out._dedupe_keys = dict(self._dedupe_keys)
+        return out
+
+    # ====== chaves persistidas (SHA-1, formato estável) ======
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = make_offer_fingerprint(self)
+        return self._fingerprint
+
+    @property
+    def offer_id(self) -> str:
+        return f"F_{self.fingerprint}"
+
+    def dedupe_key(self, *, channel: str = "WHATSAPP", kind: str = "ALERT") -> str:
+        key = self._dedupe_keys.get((kind, channel))
+        if key is None:
+            key = make_dedupe_key(self.offer_id, channel=channel, kind=kind)
+            self._dedupe_keys[(kind, channel)] = key
+        return key
+
+    # ====== agrupamento em memória ======
+
+    @property
+    def group_key(self) -> str:
+        """Mesmo formato de decision_engine.fingerprint_offer."""
+        return "|".join(self._parts())
+
+    @property
+    def group_parts(self) -> tuple:
+        """Tupla de offer_group_parts, cacheada: chave de dict sem risco de colisão de hash."""
+        return self._parts()
+
+    @property
+    def group_hash(self) -> int:
+        """Hash rápido (não persistir, varia entre processos)."""
+        if self._group_hash is None:
+            self._group_hash = hash(self._parts())
+        return self._group_hash
+
+    def _parts(self) -> tuple:
+        if self._group_parts is None:
+            self._group_parts = offer_group_parts(self)
+        return self._group_parts
@@ -0,0 +1,245 @@
+"""
+Parsing de texto dos cards (horário, duração, preço) num lugar só.
+
+Regexes pré-compiladas no import e resultados memoizados (LRU) por texto:
+o mesmo "03h20" ou "R$ 1.067" aparece em vários cards e é relido pelo
+scraper, pelo normalizador e pelo decision engine.
+
+Preço: um parser só (parse_brl), aplicado uma vez na normalização
+(offer['price_int']); os nomes antigos (parse_price_int, parse_brl_to_int,
+extract_price_int_from_text) são aliases dele. Os módulos antigos
+reexportam daqui.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CACHE_SIZE = 4096
+
+TIME_HHMM_RE = re.compile(r"^\d{2}:\d{2}$")
+TIME_IN_TEXT_RE = re.compile(r"\b(\d{2}:\d{2})\b")
+HAS_DIGIT_RE = re.compile(r"\d")
+# Número de preço: milhar por espaço/NBSP/NNBSP só em grupos de 3 ('1 234', '1\u202f234,56');
+# senão dígitos com . e , ('1.234', '1,234.00')
+_SPACE_SEP = " \xa0\u202f"
+_PRICE_NUMBER = rf"(?:\d{{1,3}}(?:[{_SPACE_SEP}]\d{{3}})+(?:[.,]\d{{2}})?(?!\d)|\d[\d.,]*)"
+PRICE_TOKEN_RE = re.compile(_PRICE_NUMBER)
+CURRENCY_PRICE_RE = re.compile(rf"(?:R\$|BRL)\s*({_PRICE_NUMBER})", re.IGNORECASE)
+PRICE_BRL_RE = re.compile(rf"R\$\s*{_PRICE_NUMBER}")
+EXTRA_OFFERS_RE = re.compile(r"(\d+)\s+ofertas\s+mais")
+NEXT_DAY_RE = re.compile(r"\d{2}:\d{2}\s*\+1\b")
+
+_DUR_HHMM_RE = re.compile(r"(\d{1,2})h(\d{2})")
+_DUR_H_MIN_RE = re.compile(r"(\d{1,2})h\s*(\d{1,2})\s*min")
+_DUR_H_RE = re.compile(r"(\d{1,2})h")
+_DUR_MIN_RE = re.compile(r"(\d{1,2})\s*min")
+_DUR_LOOSE_H_RE = re.compile(r"(\d+)\s*h")
+_DUR_LOOSE_MIN_RE = re.compile(r"(\d+)\s*min")
+
+_PROMO_MARKERS = ("a partir de", "desde", "promo", "oferta", "desconto")
+_INSTALLMENT_MARKERS = (" x ", "x ", "vez", "parcel", "sem juros")
+
+
+# ====== HORÁRIO / DURAÇÃO ======
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def is_time_hhmm(s: Optional[str]) -> bool:
+    """'HH:MM' válido (antes utils_viajala.is_time_hhmm)."""
+    if not s:
+        return False
+    s = s.strip()
+    if not TIME_HHMM_RE.match(s):
+        return False
+    try:
+        h, m = int(s[:2]), int(s[3:])
+    except ValueError:
+        return False
+    return 0 <= h <= 23 and 0 <= m <= 59
+
+
+def _parse_duration_min(text: Optional[str]) -> Optional[int]:
+    if not text:
+        return None
+    t = text.strip().lower()
+
+    match = _DUR_HHMM_RE.search(t)
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+
+    match = _DUR_H_MIN_RE.search(t)
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+
+    match = _DUR_H_RE.search(t)
+    hours = int(match.group(1)) if match else 0
+    match = _DUR_MIN_RE.search(t)
+    minutes = int(match.group(1)) if match else 0
+
+    total = hours * 60 + minutes
+    return total if total > 0 else None
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_duration_min(text: Optional[str]) -> Optional[int]:
+    """'03h20', '3h 20 min', '2h', '45 min' -> minutos (antes utils_viajala.parse_duration_min)."""
+    return _parse_duration_min(text)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def duration_minutes(text: Optional[str]) -> Optional[int]:
+    """'3h 20 min', '3 h 20min', '20 min' -> minutos, horas sem limite de dígitos (antes price_extractor._parse_duration_minutes)."""
+    if not text:
+        return None
+    match = _DUR_LOOSE_H_RE.search(text)
+    hours = int(match.group(1)) if match else 0
+    match = _DUR_LOOSE_MIN_RE.search(text)
+    minutes = int(match.group(1)) if match else 0
+    total = hours * 60 + minutes
+    return total if total > 0 else None
+
+
+# ====== PREÇO ======
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_brl(text: Optional[str]) -> Optional[int]:
+    """
+    Parser canônico de preço em reais -> inteiro (centavos descartados).
+
+    Usa o 1º número depois de R$/BRL ('1 conexão R$ 1.036' -> 1036,
+    'R$ 530 Ver oferta ... R$ 629' -> 530) ou, sem moeda, o 1º número;
+    separador seguido de exatamente 2 dígitos no fim é decimal
+    ('1.234,56' / '1,234.56' / '530,00'), os demais são milhar
+    ('1.234' / '1,234' / '1 234' com espaço, NBSP ou NNBSP entre grupos
+    de 3). None sem número ou com valor <= 0.
+    """
+    if not text:
+        return None
+    match = CURRENCY_PRICE_RE.search(text)
+    if match:
+        token = match.group(1)
+    else:
+        match = PRICE_TOKEN_RE.search(text)
+        if not match:
+            return None
+        token = match.group(0)
+    token = token.rstrip(".,")
+    for sep in _SPACE_SEP:
+        token = token.replace(sep, "")
+    cut = max(token.rfind(","), token.rfind("."))
+    if cut != -1 and len(token) - cut - 1 == 2:
+        token = token[:cut]
+    digits = token.replace(".", "").replace(",", "")
+    try:
+        value = int(digits)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def offer_price_int(offer: dict) -> Optional[int]:
+    """
+    Preço inteiro da oferta: offer['price_int'] (gravado na normalização);
+    sem ele, parseia offer['price'] uma vez e grava em price_int.
+    """
+    price_int = offer.get("price_int")
+    if isinstance(price_int, int) and not isinstance(price_int, bool):
+        return price_int if price_int > 0 else None
+    price = offer.get("price")
+    if isinstance(price, bool):
+        return None
+    if isinstance(price, (int, float)):
+        value = int(price) if price > 0 else None
+    elif isinstance(price, str):
+        value = parse_brl(price)
+    else:
+        return None
+    if value is not None:
+        offer["price_int"] = value
+    return value
+
+
+# Nomes antigos: mesmas regras do parser canônico
+parse_price_int = parse_brl  # utils_viajala.parse_price_int
+extract_price_int = parse_brl  # price_extractor.extract_price_int_from_text
+
+
+def parse_brl_to_int(price_text: Optional[str]) -> int:
+    """parse_brl com -1 no lugar de None (contrato de pricing_utils.parse_brl_to_int)."""
+    value = parse_brl(price_text)
+    return -1 if value is None else value
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def evaluate_price_candidate(text: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    """(valor, motivo da rejeição) de um texto candidato a preço do card viajala."""
+    if not text:
+        return None, "empty"
+    raw = text.strip()
+    t = " ".join(raw.lower().split())
+
+    if "ver preço" in t or "ver preco" in t:
+        return None, "placeholder"
+    if not ("r$" in t or "brl" in t):
+        return None, "currency_missing"
+    if any(m in t for m in _PROMO_MARKERS):
+        return None, "promo_text"
+    if any(m in t for m in _INSTALLMENT_MARKERS):
+        return None, "installment"
+
+    value = parse_brl(raw)
+    if value is None:
+        return None, "parse_failed"
+    if value <= 0 or value > 200000:
+        return None, "out_of_range"
+    return value, None
+
+
+def extra_offers_count(text: str) -> Optional[int]:
+    """'9 ofertas mais' -> 9."""
+    match = EXTRA_OFFERS_RE.search(text.lower())
+    return int(match.group(1)) if match else None
+
+
+# ====== LOTE ======
+
+def parse_card_text(text: str) -> Dict[str, Optional[object]]:
+    """
+    Campos do texto corrido de um card viajala
+    ('03h20 21:20 REC 00:40 +1 GRU R$ 530 Ver oferta ... 9 ofertas mais').
+    """
+    low = text.lower()
+    times = TIME_IN_TEXT_RE.findall(text)
+    price = PRICE_BRL_RE.search(text)
+    extra = EXTRA_OFFERS_RE.search(low)
+    dep = times[0] if times else None
+    arr = times[1] if len(times) > 1 else None
+    return {
+        "duration_min": _parse_duration_min(low),  # texto inteiro: fora do LRU
+        "dep_time": dep if is_time_hhmm(dep) else None,
+        "arr_time": arr if is_time_hhmm(arr) else None,
+        "next_day": bool(NEXT_DAY_RE.search(text)),
+        "price_int": parse_brl(price.group(0)) if price else None,
+        "extra_offers_count": int(extra.group(1)) if extra else None,
+    }
+
+
+def parse_card_texts(texts: Iterable[str]) -> List[Dict[str, Optional[object]]]:
+    """parse_card_text em lote; textos repetidos (mesmo voo em vários cards) são parseados uma vez."""
+    done: Dict[str, Dict[str, Optional[object]]] = {}
+    out = []
+    for text in texts:
+        text = text or ""
+        parsed = done.get(text)
+        if parsed is None:
+            parsed = done[text] = parse_card_text(text)
+        out.append(dict(parsed))
+    return out
+
+
+def cache_info() -> Dict[str, object]:
+    return {
+        fn.__name__: fn.cache_info()
+        for fn in (is_time_hhmm, parse_duration_min, duration_minutes, parse_brl, evaluate_price_candidate)
+    }
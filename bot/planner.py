@@ -1,17 +1,74 @@
 from bot.reasons import SkipReason, AttemptReport
-from typing import List, Tuple
+from bot.viajala_urls import AIRPORT_TO_CITY
+from typing import Dict, List, Tuple
 import datetime
 
+
+def expand_dests(dests, groups: Dict[str, List[str]]) -> List[str]:
+    """Troca chaves de grupo (SP, RIO) pelos aeroportos, sem repetir."""
+    out: List[str] = []
+    for dest in dests:
+        for code in groups.get(dest, [dest]):
+            if code not in out:
+                out.append(code)
+    return out
+
+
+def coalesce_metro(dests: List[str]) -> List[Tuple[str, List[str]]]:
+    """
+    (destino da busca, aeroportos atendidos): aeroportos da mesma metrópole
+    viram uma busca da cidade (GRU/CGH/VCP -> SAO). Aeroporto sozinho da
+    cidade continua buscado direto.
+    """
+    by_city: Dict[str, List[str]] = {}
+    for dest in dests:
+        city = AIRPORT_TO_CITY.get(dest)
+        if city:
+            by_city.setdefault(city, []).append(dest)
+    out: List[Tuple[str, List[str]]] = []
+    done = set()
+    for dest in dests:
+        city = AIRPORT_TO_CITY.get(dest)
+        if city and len(by_city[city]) > 1:
+            if city not in done:
+                done.add(city)
+                out.append((city, by_city[city]))
+        else:
+            out.append((dest, [dest]))
+    return out
+
+
+def _build_url(url_builder, origin, dest, date_str):
+    if not url_builder:
+        return None
+    try:
+        return url_builder(origin, dest, date_str, sort_by_price=True)
+    except TypeError:
+        # build_viajala_url_ow não tem sort_by_price
+        return url_builder(origin, dest, date_str)
+
+
 def plan_attempts(*, origin, dests, config, state_store) -> Tuple[list, list]:
     """
     Retorna:
       - attempts: lista de dicts (origin, dest, date, ceiling, url, ...)
       - reports: lista de AttemptReport (SKIP)
+
+    Com config['coalesce_metro'], aeroportos da mesma metrópole viram um
+    attempt só por data (dest=cidade) com fanout=[aeroportos] e
+    ceilings={aeroporto: teto}.
     """
     attempts = []
     reports = []
     from routes_config import IATA_TO_SLUG
-    for dest in dests:
+    dests = expand_dests(dests, config.get('destination_groups') or {})
+    if config.get('coalesce_metro'):
+        searches = coalesce_metro(dests)
+    else:
+        searches = [(dest, [dest]) for dest in dests]
+    ceilings_cfg = config.get('PRICE_CEILINGS_OW', {})
+    default_ceiling = config.get('DEFAULT_PRICE_CEILING_OW', 9999)
+    for dest, airports in searches:
         # Se config['depart'] estiver presente, usa só essa data
         depart = config.get('depart')
         if depart:
@@ -26,39 +83,50 @@ def plan_attempts(*, origin, dests, config, state_store) -> Tuple[list, list]:
             if config.get('weekdays_only'):
                 eligible_dates = [d for d in eligible_dates if d.weekday() < 5]
         if not eligible_dates:
-            reports.append(AttemptReport(
-                origin=origin,
-                dest=dest,
-                date=None,
-                phase="SKIP",
-                reason=SkipReason.NO_ELIGIBLE_DATES.name,
-                details={"date_window_days": config.get('date_window_days', 7), "weekdays_only": config.get('weekdays_only', False)}
-            ))
-            continue
-        for date in eligible_dates:
-            date_str = date.isoformat()
-            cooldown_key = f"{origin}|{dest}|{date_str}"
-            if hasattr(state_store, "is_in_cooldown") and state_store.is_in_cooldown(cooldown_key):
+            for airport in airports:
                 reports.append(AttemptReport(
                     origin=origin,
-                    dest=dest,
-                    date=date_str,
+                    dest=airport,
+                    date=None,
                     phase="SKIP",
-                    reason=SkipReason.COOLDOWN_ACTIVE.name,
-                    details={"cooldown_key": cooldown_key}
+                    reason=SkipReason.NO_ELIGIBLE_DATES.name,
+                    details={"date_window_days": config.get('date_window_days', 7), "weekdays_only": config.get('weekdays_only', False)}
                 ))
+            continue
+        for date in eligible_dates:
+            date_str = date.isoformat()
+            active = []
+            for airport in airports:
+                cooldown_key = f"{origin}|{airport}|{date_str}"
+                if hasattr(state_store, "is_in_cooldown") and state_store.is_in_cooldown(cooldown_key):
+                    reports.append(AttemptReport(
+                        origin=origin,
+                        dest=airport,
+                        date=date_str,
+                        phase="SKIP",
+                        reason=SkipReason.COOLDOWN_ACTIVE.name,
+                        details={"cooldown_key": cooldown_key}
+                    ))
+                    continue
+                active.append(airport)
+            if not active:
                 continue
+            search_dest = dest if len(active) > 1 else active[0]
             # Monta attempt usando slugs apenas quando necessário
             use_slugs = config.get('use_slugs', False)
             origin_slug = IATA_TO_SLUG.get(origin, origin) if use_slugs else origin
-            dest_slug = IATA_TO_SLUG.get(dest, dest) if use_slugs else dest
+            dest_slug = IATA_TO_SLUG.get(search_dest, search_dest) if use_slugs else search_dest
             url_builder = config.get('build_url_ow') or config.get('build_kiwi_url_ow')
+            ceilings = {airport: ceilings_cfg.get(airport, default_ceiling) for airport in active}
             attempt = {
                 "origin": origin,
-                "dest": dest,
+                "dest": search_dest,
                 "date": date_str,
-                "ceiling": config.get('PRICE_CEILINGS_OW', {}).get(dest, config.get('DEFAULT_PRICE_CEILING_OW', 9999)),
-                "url": url_builder(origin_slug, dest_slug, date_str, sort_by_price=True) if url_builder else None
+                "ceiling": max(ceilings.values()),
+                "url": _build_url(url_builder, origin_slug, dest_slug, date_str),
             }
+            if len(active) > 1:
+                attempt["fanout"] = active
+                attempt["ceilings"] = ceilings
             attempts.append(attempt)
     return attempts, reports
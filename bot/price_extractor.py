@@ -1,7 +1,8 @@
-import re
 from dataclasses import dataclass
 from typing import Optional, List, Tuple, Dict
 
+from bot.parsing import duration_minutes, parse_brl
+
 
 @dataclass(frozen=True)
 class FlightCard:
@@ -14,27 +15,8 @@ class FlightCard:
     price_brl: int
 
 
-def _parse_duration_minutes(duration_text: str) -> Optional[int]:
-    """
-    Converte durações como "3h 20 min" para minutos (200).
-    Aceita variações como "3h", "20 min", "3 h 20min".
-    """
-    if not duration_text:
-        return None
-
-    hours = 0
-    minutes = 0
-
-    h_match = re.search(r"(\d+)\s*h", duration_text)
-    if h_match:
-        hours = int(h_match.group(1))
-
-    m_match = re.search(r"(\d+)\s*min", duration_text)
-    if m_match:
-        minutes = int(m_match.group(1))
-
-    total = hours * 60 + minutes
-    return total if total > 0 else None
+# "3h 20 min" -> 200 (regex pré-compilada + LRU em bot.parsing)
+_parse_duration_minutes = duration_minutes
 
 
 def parse_flight_card_text(text: str) -> Optional[FlightCard]:
@@ -86,24 +68,8 @@ def parse_flight_card_text(text: str) -> Optional[FlightCard]:
     )
 
 
-def extract_price_int_from_text(text: str) -> Optional[int]:
-    """
-    Extrai um preço inteiro de textos como:
-    'R$ 1.234', '1.234', 'BRL 1,234'.
-    Retorna None se não encontrar algo válido.
-    ⚠️ Limitação: separadores decimais são ignorados (R$ 1.234,56 vira 123456).
-    """
-    if not text:
-        return None
-
-    cleaned = re.sub(r"[^0-9.,]", "", text)
-    cleaned = cleaned.replace(".", "").replace(",", "")
-
-    try:
-        value = int(cleaned)
-        return value if value > 0 else None
-    except Exception:
-        return None
+# Parser canônico de BRL (bot.parsing.parse_brl)
+extract_price_int_from_text = parse_brl
 
 
 PRICE_SELECTORS = (
@@ -188,102 +154,3 @@ def compute_min_price(flight_sectors: List) -> Tuple[Optional[int], Dict]:
             "sectors_count": len(flight_sectors),
         },
     )
-import re
-from typing import Optional, List, Tuple, Dict
-
-def extract_price_int_from_text(text: str) -> Optional[int]:
-    """
-    Extrai um inteiro de preço de textos como 'R$ 1.234', '1.234', 'BRL 1,234', etc.
-    Retorna None se não encontrar.
-    """
-    if not text:
-        return None
-    # Remove currency symbols and letters
-    cleaned = re.sub(r'[^0-9.,]', '', text)
-    # Troca vírgula por ponto se for separador decimal
-    if cleaned.count(',') == 1 and cleaned.count('.') == 0:
-        cleaned = cleaned.replace(',', '.')
-    # Remove milhares
-    cleaned = cleaned.replace('.', '').replace(',', '')
-    try:
-        value = int(cleaned)
-        return value if value > 0 else None
-    except Exception:
-        return None
-
-def find_price_for_sector(sector_element) -> Optional[int]:
-    """
-    Tenta extrair o preço de um sector/card, subindo para containers pais e siblings se necessário.
-    sector_element: Selenium WebElement
-    """
-    # 1. Tenta dentro do próprio sector
-    price_selectors = [
-        '[data-test-id="price"]',
-        '.price',
-        '.amount',
-        '[class*="Price"]',
-    ]
-    for sel in price_selectors:
-        try:
-            el = sector_element.find_element('css selector', sel)
-            price = extract_price_int_from_text(el.text)
-            if price:
-                return price
-        except Exception:
-            continue
-    # 2. Sobe para o card pai
-    try:
-        parent = sector_element.find_element('xpath', './ancestor::*[contains(@class,"card")]')
-        for sel in price_selectors:
-            try:
-                el = parent.find_element('css selector', sel)
-                price = extract_price_int_from_text(el.text)
-                if price:
-                    return price
-            except Exception:
-                continue
-    except Exception:
-        pass
-    # 3. Siblings/containers próximos
-    try:
-        sibling = sector_element.find_element('xpath', 'following-sibling::*')
-        for sel in price_selectors:
-            try:
-                el = sibling.find_element('css selector', sel)
-                price = extract_price_int_from_text(el.text)
-                if price:
-                    return price
-            except Exception:
-                continue
-    except Exception:
-        pass
-    # 4. Falhou
-    return None
-
-def compute_min_price(flight_sectors: List) -> Tuple[Optional[int], Dict]:
-    """
-    Itera setores, chama find_price_for_sector, coleta preços e debug.
-    Retorna (min_price, debug_dict)
-    """
-    prices_found = []
-    debug_samples = []
-    missing_count = 0
-    for sector in flight_sectors:
-        price = find_price_for_sector(sector)
-        if price is not None:
-            prices_found.append(price)
-            if len(debug_samples) < 3:
-                try:
-                    debug_samples.append(sector.text)
-                except Exception:
-                    debug_samples.append('NO_TEXT')
-        else:
-            missing_count += 1
-    min_price = min(prices_found) if prices_found else None
-    debug = {
-        'prices_found': prices_found,
-        'missing_count': missing_count,
-        'debug_samples': debug_samples,
-        'sectors_count': len(flight_sectors),
-    }
-    return min_price, debug
@@ -0,0 +1,328 @@
+"""
+Camada de providers: todos os scrapers com a mesma assinatura.
+
+    scrape(driver, origin, dest, depart_date, *, ceiling=None, max_cards=30) -> ScrapeResult
+
+As ofertas saem no formato do viajala (provider/origin/destination/depart_date,
+duration_min e stops numéricos), para que fingerprint_offer/merge_offer
+funcionem entre providers.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bot import metrics
+from bot.decision_engine import _price_int_from_offer, fingerprint_offer, merge_offer
+from bot.early_exit import StopHook, sorted_page_stop
+from bot.config import EARLY_EXIT_ENABLED, PRICE_SORTED_PROVIDERS, VIAJALA_NETWORK_MODE
+from bot.http_fastpath import ApiSpec, fastpath_enabled, http_first_scrape, register_api_spec
+from bot.scrape_cache import cached_scrape
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+from bot import utils_viajala as VU
+from bot import viajala_api as VA
+
+logger = logging.getLogger("kiwi_bot")
+
+ProviderFn = Callable[..., ScrapeResult]
+
+
+def _parse_stops(value) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return None
+    t = value.strip().lower()
+    if not t or t == "?":
+        return None
+    if "diret" in t or "sem escala" in t or "nonstop" in t:
+        return 0
+    m = re.search(r"\d+", t)
+    return int(m.group(0)) if m else None
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value if value and value != "?" else None
+
+
+def _normalize_offer(offer: Dict[str, Any], provider: str, origin: str, dest: str, depart_date: str) -> Dict[str, Any]:
+    offer["provider"] = offer.get("provider") or provider
+    offer["origin"] = offer.get("origin") or origin
+    offer["destination"] = offer.get("destination") or dest
+    offer["depart_date"] = offer.get("depart_date") or depart_date
+    for key in ("dep_time", "arr_time", "airline"):
+        if key in offer:
+            offer[key] = _clean(offer[key])
+    if offer.get("airline"):
+        offer["airline"] = VU.normalize_airline(offer["airline"])
+    if offer.get("duration_min") is None and offer.get("duration_text"):
+        offer["duration_min"] = VU.parse_duration_min(str(offer["duration_text"]))
+    if not isinstance(offer.get("stops"), int) and offer.get("stops") is not None:
+        offer["stops"] = _parse_stops(offer["stops"])
+    if offer.get("price_int") is None:
+        price = _price_int_from_offer(offer)
+        if price is not None and price > 0:
+            offer["price_int"] = price
+    return offer
+
+
+def _from_scrape_result(result: ScrapeResult, provider: str, origin: str, dest: str, depart_date: str) -> ScrapeResult:
+    result.flights = [_normalize_offer(dict(f), provider, origin, dest, depart_date) for f in (result.flights or [])]
+    if result.debug is None:
+        result.debug = {}
+    result.debug.setdefault("provider", provider)
+    return result
+
+
+def _early_stop(provider: str, ceiling: Optional[int], *, round_trip: bool = False) -> Optional[StopHook]:
+    """Parada antecipada só onde a URL pede ordenação por preço (PRICE_SORTED_PROVIDERS)."""
+    if not EARLY_EXIT_ENABLED or provider not in PRICE_SORTED_PROVIDERS:
+        return None
+    return sorted_page_stop(ceiling, round_trip=round_trip)
+
+
+# ====== ADAPTERS ======
+
+def stream_viajala(
+    driver, origin: str, dest: str, depart_date: str, *, max_cards: int = 30, stop: Optional[StopHook] = None,
+    run=None,
+) -> Iterator[Dict[str, Any]]:
+    """Ofertas normalizadas card a card (ordem da página); stop encerra a extração; run: viajala_scraper.PageRun."""
+    from bot import viajala_scraper
+
+    # stop roda dentro do scraper (que fecha as métricas da página); o card cru é
+    # normalizado antes (in place, idempotente) para o hook ver a oferta normalizada
+    def page_stop(raw: Dict[str, Any]) -> bool:
+        return stop(_normalize_offer(raw, "viajala", origin, dest, depart_date))
+
+    for offer in viajala_scraper.iter_offers(
+        driver, origin, dest, depart_date, max_cards=max_cards, stop=page_stop if stop is not None else None, run=run
+    ):
+        yield _normalize_offer(offer, "viajala", origin, dest, depart_date)
+
+
+def scrape_viajala(
+    driver, origin: str, dest: str, depart_date: str, *, ceiling: Optional[int] = None, max_cards: int = 30,
+    stop: Optional[StopHook] = None,
+) -> ScrapeResult:
+    from bot import viajala_scraper
+
+    # Estado da página por chamada: workers do backfill rodam em paralelo
+    run = viajala_scraper.PageRun()
+    offers = list(stream_viajala(driver, origin, dest, depart_date, max_cards=max_cards, stop=stop, run=run))
+    offers.sort(key=viajala_scraper._offer_sort_key)
+    prices = [o["price_int"] for o in offers if o.get("price_int")]
+    page_states = run.page_states
+    if offers:
+        status, reason = ScrapeStatus.OK, ScrapeReason.UNKNOWN
+    elif "BLOCKED" in page_states:
+        status, reason = ScrapeStatus.BLOCKED, ScrapeReason.BLOCKED_CHALLENGE
+    elif page_states and all(st in ("LANDING", "LOADING") for st in page_states):
+        status, reason = ScrapeStatus.EMPTY, ScrapeReason.PAGE_NOT_LOADED
+    else:
+        status, reason = ScrapeStatus.EMPTY, ScrapeReason.NO_RESULTS
+    return ScrapeResult(
+        status=status,
+        reason=reason,
+        flights=offers,
+        min_price=min(prices) if prices else -1,
+        debug={"provider": "viajala", "page_states": page_states, "cards_skipped": run.cards_skipped},
+    )
+
+
+def _scrape_kiwi(driver, origin: str, dest: str, depart_date: str, return_date: Optional[str], ceiling, max_cards: int) -> ScrapeResult:
+    from selenium.webdriver.support.ui import WebDriverWait
+    from bot import kiwi_scraper
+    from bot.kiwi_urls import build_kiwi_url_ow, build_kiwi_url_rt
+
+    try:
+        from routes_config import IATA_TO_SLUG
+    except ImportError:
+        IATA_TO_SLUG = {}
+    o_slug, d_slug = IATA_TO_SLUG.get(origin), IATA_TO_SLUG.get(dest)
+    if not o_slug or not d_slug:
+        return ScrapeResult(
+            status=ScrapeStatus.ERROR,
+            reason=ScrapeReason.UNKNOWN,
+            debug={"provider": "kiwi", "error": f"slug ausente {origin}->{dest}"},
+        )
+    if return_date:
+        url = build_kiwi_url_rt(o_slug, d_slug, depart_date, return_date)
+    else:
+        url = build_kiwi_url_ow(o_slug, d_slug, depart_date)
+    stop = _early_stop("kiwi", ceiling, round_trip=bool(return_date))
+    result = kiwi_scraper.scrape_with_selenium(driver, WebDriverWait(driver, 20), url, ceiling, max_results=max_cards, stop=stop)
+    result = _from_scrape_result(result, "kiwi", origin, dest, depart_date)
+    if return_date:
+        for f in result.flights:
+            f["return_date"] = return_date
+    return result
+
+
+def scrape_kiwi(driver, origin: str, dest: str, depart_date: str, *, ceiling: Optional[int] = None, max_cards: int = 30) -> ScrapeResult:
+    return _scrape_kiwi(driver, origin, dest, depart_date, None, ceiling, max_cards)
+
+
+def scrape_kiwi_rt(
+    driver, origin: str, dest: str, depart_date: str, return_date: str, *, ceiling: Optional[int] = None, max_cards: int = 30
+) -> ScrapeResult:
+    return _scrape_kiwi(driver, origin, dest, depart_date, return_date, ceiling, max_cards)
+
+
+def scrape_google(driver, origin: str, dest: str, depart_date: str, *, ceiling: Optional[int] = None, max_cards: int = 30) -> ScrapeResult:
+    from selenium.webdriver.support.ui import WebDriverWait
+    from bot import google_flights_scraper
+    from bot.google_flights_urls import build_google_flights_url_ow
+
+    url = build_google_flights_url_ow(origin, dest, depart_date)
+    stop = _early_stop("google", ceiling)
+    result = google_flights_scraper.scrape_with_selenium(driver, WebDriverWait(driver, 20), url, ceiling, max_results=max_cards, stop=stop)
+    return _from_scrape_result(result, "google", origin, dest, depart_date)
+
+
+def calendar_viajala(driver, origin: str, dest: str, center_date: str) -> Dict[str, int]:
+    from bot import viajala_scraper
+
+    return viajala_scraper.scrape_calendar(driver, origin, dest, center_date)
+
+
+PROVIDERS: Dict[str, ProviderFn] = {
+    "viajala": scrape_viajala,
+    "kiwi": scrape_kiwi,
+    "google": scrape_google,
+}
+
+
+# Providers com extração em streaming: (driver, origin, dest, depart_date, *, max_cards, stop) -> Iterator[oferta]
+STREAM_PROVIDERS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    "viajala": stream_viajala,
+}
+
+# Providers com busca ida e volta: (driver, origin, dest, depart, return, *, ceiling, max_cards)
+RT_PROVIDERS: Dict[str, ProviderFn] = {
+    "kiwi": scrape_kiwi_rt,
+}
+
+# Providers com faixa de datas flexíveis: (driver, origin, dest, center_date) -> {data: preço}
+CALENDAR_PROVIDERS: Dict[str, Callable[..., Dict[str, int]]] = {
+    "viajala": calendar_viajala,
+}
+
+
+def _parse_viajala_api(data, origin: str, dest: str, depart_date: str) -> List[Dict[str, Any]]:
+    return [_normalize_offer(o, "viajala", origin, dest, depart_date) for o in VA.parse_results(data, origin, dest, depart_date)]
+
+
+if VIAJALA_NETWORK_MODE:
+    # Mesmo parser do modo rede do scraper serve para o replay HTTP
+    register_api_spec(ApiSpec("viajala", match=VA.is_results_url, validate=VA.looks_like_results, parse=_parse_viajala_api))
+
+
+def network_capture_wanted(name: str) -> bool:
+    """O browser do provider precisa do performance log (fast path ou modo rede)?"""
+    return fastpath_enabled(name) or (name == "viajala" and VIAJALA_NETWORK_MODE)
+
+
+def get_provider(name: str) -> ProviderFn:
+    """
+    Adapter do provider, atrás do cache de resultados; com API JSON
+    registrada, tenta antes o fast path HTTP.
+    """
+    name = (name or "").lower()
+    fn = PROVIDERS.get(name)
+    if not fn:
+        raise ValueError(f"Provider desconhecido: {name}")
+    if fastpath_enabled(name):
+        fn = functools.partial(http_first_scrape, name, fn)
+    return functools.partial(cached_scrape, name, fn)
+
+
+# ====== FAN-OUT + MERGE ======
+
+def scrape_many(
+    drivers: Dict[str, Any],
+    origin: str,
+    dest: str,
+    depart_date: str,
+    *,
+    ceiling: Optional[int] = None,
+    max_cards: int = 30,
+    call: Optional[Callable[[str, Any], ScrapeResult]] = None,
+) -> Dict[str, ScrapeResult]:
+    """
+    Consulta vários providers para a mesma (rota, data) em paralelo, um
+    browser por provider (drivers[provider]). Falha de um provider vira
+    ScrapeResult ERROR e não derruba os outros.
+
+    call(provider, driver) permite ao chamador envolver o adapter (ex.: reabrir
+    browser morto); por padrão chama PROVIDERS[provider] direto.
+    """
+
+    def _call(provider: str) -> ScrapeResult:
+        try:
+            if call is not None:
+                return call(provider, drivers[provider])
+            return get_provider(provider)(
+                drivers[provider], origin, dest, depart_date, ceiling=ceiling, max_cards=max_cards
+            )
+        except Exception as e:
+            logger.warning(f"[PROVIDER] {provider} falhou: {type(e).__name__}: {e}")
+            return ScrapeResult(
+                status=ScrapeStatus.ERROR,
+                reason=ScrapeReason.SELENIUM_EXCEPTION,
+                debug={"provider": provider, "exception": str(e)},
+            )
+
+    def _run(provider: str) -> ScrapeResult:
+        t0 = time.perf_counter()
+        result = _call(provider)
+        metrics.SCRAPE_SECONDS.observe(time.perf_counter() - t0, provider=provider, trip_type="OW", status=result.status.name)
+        return result
+
+    names = list(drivers)
+    if len(names) == 1:
+        return {names[0]: _run(names[0])}
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="provider") as pool:
+        results = dict(zip(names, pool.map(_run, names)))
+    for name, res in results.items():
+        logger.info(f"[PROVIDER] {name} status={res.status.name} offers={len(res.flights or [])}")
+    return results
+
+
+def merge_provider_offers(offers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Junta ofertas de vários providers: mesmo itinerário (fingerprint_offer sem
+    provider) vira uma oferta só, mantendo o link/provider da mais barata.
+    Registra em provider_prices o menor preço visto em cada provider.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for o in offers:
+        key = fingerprint_offer(dict(o, provider=""))
+        groups.setdefault(key, []).append(o)
+
+    merged: List[Dict[str, Any]] = []
+    for members in groups.values():
+        if len(members) == 1:
+            merged.append(members[0])
+            continue
+        # estável: empate de preço mantém a ordem de chegada (ordem dos providers)
+        members = sorted(members, key=lambda m: (_price_int_from_offer(m) is None, _price_int_from_offer(m) or 0))
+        out = members[0]
+        for other in members[1:]:
+            out = merge_offer(out, other)
+        provider_prices: Dict[str, int] = {}
+        for m in members:
+            p = _price_int_from_offer(m)
+            name = m.get("provider") or "?"
+            if p is not None and (name not in provider_prices or p < provider_prices[name]):
+                provider_prices[name] = p
+        out["provider_prices"] = provider_prices
+        merged.append(out)
+    return merged
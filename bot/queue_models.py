@@ -1,31 +1,179 @@
+import datetime
+import json
 import time
-from typing import List, Dict
-from dataclasses import dataclass, asdict
+from typing import List, Iterable, Optional
+
+try:
+    import msgpack  # codec binário opcional para a fila
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+
+STATUS_ORDER = {"APPROVED": 0, "PENDING": 1, "SENT": 2, "DROPPED": 3}
+
 
-@dataclass
 class QueueItem:
-    id: str  # dedupe_key
-    created_ts: int  # unix timestamp
-    priority: int
-    channel: str
-    text: str
-    status: str  # PENDING, APPROVED, SENT, DROPPED
-    meta: dict = None
-    group: str = None  # grupo WhatsApp alvo
+    """
+    Registro único da fila, usado pelo produtor (runner) e pelo consumidor (sender).
 
-def sort_queue(items):
-    status_order = {"APPROVED": 0, "PENDING": 1, "SENT": 2, "DROPPED": 3}
+    Usa __slots__ para não carregar um dict por item; to_row/from_row fazem a
+    (de)serialização e from_row aceita os formatos antigos da fila
+    (message/offer_hash/dedupe_key, route/origin/dest/min_price no topo).
+    """
+
+    __slots__ = ("id", "created_ts", "priority", "channel", "text", "status", "meta", "group")
+
+    def __init__(
+        self,
+        id: str,  # dedupe_key
+        created_ts: int,  # unix timestamp
+        priority: float,
+        channel: str,
+        text: str,
+        status: str,  # PENDING, APPROVED, SENT, DROPPED
+        meta: Optional[dict] = None,
+        group: Optional[str] = None,  # grupo WhatsApp alvo
+    ):
+        self.id = id
+        self.created_ts = created_ts
+        self.priority = priority
+        self.channel = channel
+        self.text = text
+        self.status = status
+        self.meta = meta if meta is not None else {}
+        self.group = group
+
+    def __repr__(self) -> str:
+        return (
+            f"QueueItem(id={self.id!r}, status={self.status!r}, priority={self.priority!r}, "
+            f"group={self.group!r}, created_ts={self.created_ts!r})"
+        )
+
+    @property
+    def dedupe_key(self) -> str:
+        return self.id
+
+    @property
+    def route(self) -> Optional[str]:
+        """Chave de rota (ORIG-DEST) usada no rate-limit por rota do sender."""
+        route = self.meta.get("route")
+        if route:
+            return str(route)
+        origin = self.meta.get("origin")
+        dest = self.meta.get("dest")
+        if origin and dest:
+            return f"{origin}-{dest}"
+        return None
+
+    @property
+    def price(self) -> Optional[int]:
+        price = self.meta.get("min_price") or self.meta.get("price")
+        if isinstance(price, (int, float)):
+            return int(price)
+        return None
+
+    def to_row(self) -> dict:
+        return {
+            "id": self.id,
+            "created_ts": self.created_ts,
+            "priority": self.priority,
+            "channel": self.channel,
+            "text": self.text,
+            "status": self.status,
+            "meta": self.meta,
+            "group": self.group,
+        }
+
+    @classmethod
+    def from_row(cls, row) -> Optional["QueueItem"]:
+        """Monta QueueItem a partir de uma linha serializada. Retorna None se inválida."""
+        if isinstance(row, cls):
+            return row
+        if not isinstance(row, dict):
+            return None
 
-    def get_status(x):
-        return x.status if hasattr(x, "status") else x.get("status", "PENDING")
+        mid = row.get("id") or row.get("dedupe_key") or row.get("offer_hash") or ""
+        text = row.get("text") or row.get("message") or ""
+        if not str(mid).strip() or not str(text).strip():
+            return None
 
-    def get_priority(x):
-        return x.priority if hasattr(x, "priority") else x.get("priority", 0)
+        meta = row.get("meta") if isinstance(row.get("meta"), dict) else {}
+        # compat: campos de roteamento/preço que ficavam no topo do item
+        for key in ("route", "origin", "dest", "min_price"):
+            if row.get(key) is not None and key not in meta:
+                meta[key] = row[key]
 
-    def get_created(x):
-        return x.created_ts if hasattr(x, "created_ts") else x.get("created_ts", 0)
+        created_ts = row.get("created_ts")
+        if not isinstance(created_ts, (int, float)):
+            created_ts = _ts_from_iso(row.get("created_at"))
 
-    return sorted(items, key=lambda x: (status_order.get(get_status(x), 99), -get_priority(x), get_created(x)))
+        priority = row.get("priority") or 0
+        if not isinstance(priority, (int, float)):
+            try:
+                priority = float(priority)
+            except (TypeError, ValueError):
+                priority = 0
+
+        return cls(
+            id=str(mid),
+            created_ts=int(created_ts),
+            priority=priority,
+            channel=row.get("channel") or "WHATSAPP",
+            text=str(text),
+            status=row.get("status") or "APPROVED",
+            meta=meta,
+            group=row.get("group") or None,
+        )
+
+
+def _ts_from_iso(value) -> int:
+    if isinstance(value, str) and value:
+        try:
+            return int(datetime.datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            pass
+    return int(time.time())
+
+
+# ====== CODEC ======
+
+def codec_for_path(path: str) -> str:
+    """Arquivos .msgpack usam o codec binário (se msgpack estiver instalado); o resto, JSON."""
+    if str(path).endswith(".msgpack") and msgpack is not None:
+        return "msgpack"
+    return "json"
+
+
+def encode_queue(items: Iterable[QueueItem], codec: str = "json") -> bytes:
+    rows = [item.to_row() for item in items]
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ValueError("codec msgpack indisponível (pip install msgpack)")
+        return msgpack.packb(rows, use_bin_type=True)
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_queue(data: bytes, codec: str = "json") -> List[QueueItem]:
+    if not data:
+        return []
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ValueError("codec msgpack indisponível (pip install msgpack)")
+        rows = msgpack.unpackb(data, raw=False)
+    else:
+        rows = json.loads(data.decode("utf-8"))
+    if not isinstance(rows, list):
+        return []
+    items: List[QueueItem] = []
+    for row in rows:
+        item = QueueItem.from_row(row)
+        if item is not None:
+            items.append(item)
+    return items
+
+
+def sort_queue(items):
+    return sorted(items, key=lambda x: (STATUS_ORDER.get(x.status, 99), -x.priority, x.created_ts))
 
 def dequeue_sendable(items: List[QueueItem], limit: int) -> List[QueueItem]:
     sendable = [x for x in sort_queue(items) if x.status == "APPROVED"]
@@ -37,7 +185,7 @@ def mark_sent(items: List[QueueItem], id: str):
             x.status = "SENT"
             break
 
-def mark_dropped(items: List[QueueItem], id: str, reason: str = ""): 
+def mark_dropped(items: List[QueueItem], id: str, reason: str = ""):
     for x in items:
         if x.id == id:
             x.status = "DROPPED"
@@ -0,0 +1,145 @@
+"""
+Canal local de notificação da fila: o runner avisa, o sender acorda.
+
+Fonte da verdade: contador de eventos no SQLite (state_store.queue_events).
+Aceleração: datagrama num socket Unix em que o sender fica escutando; sem
+socket (Windows ou sender parado) o sender cai no polling do contador.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import select
+import socket
+import time
+from typing import Optional, Set, Tuple
+
+from bot.config import (
+    QUEUE_NOTIFY_ENABLED,
+    QUEUE_NOTIFY_SOCKET_PATH,
+    QUEUE_NOTIFY_COALESCE_SECONDS,
+    QUEUE_NOTIFY_POLL_SECONDS,
+)
+
+logger = logging.getLogger("kiwi_bot")
+
+_HAS_UNIX_SOCKET = hasattr(socket, "AF_UNIX")
+
+
+def notify_queue_changed(group: Optional[str] = None, socket_path: Optional[str] = None) -> Optional[int]:
+    """Registra evento da fila e acorda um sender em espera (best-effort)."""
+    if not QUEUE_NOTIFY_ENABLED:
+        return None
+    import state_store
+
+    try:
+        seq = state_store.record_queue_event(group)
+    except Exception as e:
+        logger.warning(f"[NOTIFY_QUEUE] falha ao gravar evento: {e}")
+        return None
+
+    path = socket_path or QUEUE_NOTIFY_SOCKET_PATH
+    if _HAS_UNIX_SOCKET and os.path.exists(path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+                s.sendto(str(seq).encode("ascii"), path)
+        except OSError:
+            # Ninguém escutando (socket órfão): o contador já garante a entrega
+            pass
+    logger.debug(f"[NOTIFY_QUEUE] seq={seq} group={group}")
+    return seq
+
+
+class QueueWaiter:
+    """Lado do sender: espera eventos novos da fila com janela de coalescência."""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        coalesce_seconds: float = QUEUE_NOTIFY_COALESCE_SECONDS,
+        poll_seconds: float = QUEUE_NOTIFY_POLL_SECONDS,
+    ):
+        import state_store
+
+        self._store = state_store
+        self.socket_path = socket_path or QUEUE_NOTIFY_SOCKET_PATH
+        self.coalesce_seconds = coalesce_seconds
+        self.poll_seconds = poll_seconds
+        self.last_seq = state_store.get_last_queue_event_seq()
+        self._sock = None
+        if _HAS_UNIX_SOCKET:
+            try:
+                if os.path.exists(self.socket_path):
+                    os.remove(self.socket_path)
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._sock.bind(self.socket_path)
+            except OSError as e:
+                logger.warning(f"[NOTIFY_QUEUE] socket indisponível ({e}), usando polling")
+                self._sock = None
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                try:
+                    os.remove(self.socket_path)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _sleep_or_wake(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        if self._sock is None:
+            time.sleep(seconds)
+            return
+        ready, _, _ = select.select([self._sock], [], [], seconds)
+        if ready:
+            # Drena os datagramas pendentes; o conteúdo real vem do contador
+            self._sock.setblocking(False)
+            try:
+                while True:
+                    self._sock.recv(64)
+            except (BlockingIOError, OSError):
+                pass
+            finally:
+                self._sock.setblocking(True)
+
+    def _poll(self, groups: Set[Optional[str]]) -> bool:
+        events = self._store.get_queue_events_since(self.last_seq)
+        for seq, grp in events:
+            self.last_seq = max(self.last_seq, seq)
+            groups.add(grp)
+        return bool(events)
+
+    def wait(self, timeout: float) -> Tuple[bool, Set[Optional[str]]]:
+        """
+        Bloqueia até chegar evento novo (ou timeout). Após o primeiro evento,
+        espera mais coalesce_seconds para juntar alertas seguidos.
+        Retorna (houve_evento, grupos_afetados).
+        """
+        groups: Set[Optional[str]] = set()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._poll(groups):
+                break
+            step = self.poll_seconds if self._sock is None else min(30.0, self.poll_seconds * 15)
+            self._sleep_or_wake(min(step, deadline - time.time()))
+        else:
+            self._poll(groups)
+        if not groups:
+            return False, groups
+
+        coalesce_until = time.time() + self.coalesce_seconds
+        while time.time() < coalesce_until:
+            self._sleep_or_wake(min(self.poll_seconds, coalesce_until - time.time()))
+            self._poll(groups)
+        logger.info(f"[NOTIFY_QUEUE] wake seq={self.last_seq} groups={sorted(g or '' for g in groups)}")
+        return True, groups
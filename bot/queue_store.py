@@ -1,55 +1,123 @@
-import json
 import os
-def load_queue(scope=None):
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+from bot import metrics
+from bot.queue_models import QueueItem, sort_queue, codec_for_path, encode_queue, decode_queue
+
+
+def _queue_path() -> str:
     path = os.path.join(os.path.dirname(__file__), '..', 'queue_messages.json')
-    path = os.path.abspath(path)
+    return os.path.abspath(path)
+
+
+def load_queue_file(path: str) -> list:
+    """Lê a fila do disco como lista de QueueItem (vazia se ausente/corrompida)."""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            queue = json.load(f)
-        # Monta set de dedupe_keys para O(1) lookup
-        queue_keys_set = set(item.get("dedupe_key") for item in queue if item.get("dedupe_key"))
-        return queue, queue_keys_set
+        with open(path, 'rb') as f:
+            return decode_queue(f.read(), codec_for_path(path))
     except Exception:
-        return [], set()
+        return []
 
-def save_queue(queue, scope=None):
-    path = os.path.join(os.path.dirname(__file__), '..', 'queue_messages.json')
-    path = os.path.abspath(path)
+
+def save_queue_file(queue, path: str) -> None:
+    """Grava a fila de forma atômica (tmp + replace) no codec do arquivo."""
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp, 'wb') as f:
+        f.write(encode_queue(queue, codec_for_path(path)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    export_queue_depth(queue)
+
+
+def export_queue_depth(queue) -> None:
+    """kiwi_bot_queue_depth{status}: fila como ficou no disco."""
+    depth = {}
+    for item in queue:
+        depth[item.status] = depth.get(item.status, 0) + 1
+    metrics.QUEUE_DEPTH.set_by(depth, "status")
+
+
+@contextmanager
+def queue_file_lock(path: str):
+    """Lock exclusivo entre processos (runner x sender) para ler-modificar-gravar a fila."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", 'a') as lock_f:
+        fcntl.flock(lock_f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_f.fileno(), fcntl.LOCK_UN)
+
+
+def remove_from_queue_file(ids, path: str) -> int:
+    """Remove itens (por id) direto do arquivo, preservando o que outro processo enfileirou."""
+    ids = set(ids)
+    with queue_file_lock(path):
+        queue = load_queue_file(path)
+        kept = [item for item in queue if item.id not in ids]
+        if len(kept) != len(queue):
+            save_queue_file(kept, path)
+    return len(queue) - len(kept)
+
+
+# Grupos com itens enfileirados ainda não avisados ao sender (ver save_queue)
+_PENDING_NOTIFY: list = []
+
+
+def load_queue(scope=None):
+    queue = load_queue_file(_queue_path())
+    export_queue_depth(queue)
+    # Monta set de dedupe_keys para O(1) lookup
+    queue_keys_set = set(item.id for item in queue)
+    return queue, queue_keys_set
+
+def save_queue(queue, scope=None, loaded_keys=None):
+    """
+    Grava a fila. Com loaded_keys (keys devolvidas por load_queue), faz merge com
+    o disco: itens que o sender já consumiu não voltam e itens de outros
+    processos são mantidos. loaded_keys é atualizado com tudo que foi gravado:
+    key que já esteve no disco e sumiu foi consumida. Depois de gravar, acorda
+    o sender (queue_notify).
+    """
+    path = _queue_path()
     try:
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(queue, f, ensure_ascii=False, indent=2)
+        with queue_file_lock(path):
+            if loaded_keys is not None:
+                on_disk = {item.id: item for item in load_queue_file(path)}
+                mine = {item.id for item in queue}
+                queue[:] = [
+                    item for item in queue if item.id not in loaded_keys or item.id in on_disk
+                ] + [item for key, item in on_disk.items() if key not in mine]
+            save_queue_file(queue, path)
+            if loaded_keys is not None:
+                loaded_keys.update(item.id for item in queue)
     except Exception as e:
         print(f"[QUEUE][ERRO] Falha ao salvar fila: {e}")
-
-
-def sort_queue(queue):
-    # Ordenação forte: status, prioridade, created_ts
-    status_order = {"APPROVED": 0, "PENDING": 1, "SENT": 2, "DROPPED": 3}
-    def get_status(x):
-        return x.status if hasattr(x, "status") else x.get("status", "PENDING")
-    def get_priority(x):
-        return x.priority if hasattr(x, "priority") else x.get("priority", 0)
-    def get_created(x):
-        return x.created_ts if hasattr(x, "created_ts") else x.get("created_ts", 0)
-    return sorted(
-        queue,
-        key=lambda x: (
-            status_order.get(get_status(x), 99),
-            -get_priority(x),
-            get_created(x)
-        )
-    )
+        return
+    if _PENDING_NOTIFY:
+        from bot.queue_notify import notify_queue_changed
+        for group in dict.fromkeys(_PENDING_NOTIFY):
+            notify_queue_changed(group)
+        _PENDING_NOTIFY.clear()
 
 
 import datetime
 import logging
 from bot.config import QUEUE_MAX_SIZE, QUEUE_DROP_POLICY, QUEUE_MIN_PRIORITY_TO_KEEP, MODERATION_ENABLED, AUTO_APPROVE_MIN_PRIORITY
-from bot.queue_models import QueueItem, sort_queue
 
 def enqueue_message(queue, msg, dedupe_key, priority=0.0, group=None, channel="WHATSAPP", meta=None):
     logger = logging.getLogger("kiwi_bot")
     # Dedupe na fila
-    if any(x.get("dedupe_key") == dedupe_key for x in queue):
+    if is_in_queue(queue, dedupe_key):
         logger.info(f"[QUEUE] dedupe: já existe dedupe_key={dedupe_key}")
         return "DUPLICATE"
     # Status/moderação
@@ -78,17 +146,13 @@ def enqueue_message(queue, msg, dedupe_key, priority=0.0, group=None, channel="W
         channel=channel,
         text=str(msg),
         status=status,
-        meta=meta or {}
+        meta=meta or {},
+        group=target_group or None,
     )
-    # Adiciona target_group ao item
-    if target_group:
-        if not hasattr(item, 'group'):
-            setattr(item, 'group', target_group)
-        else:
-            item.group = target_group
     # Limite e política
     if len(queue) < QUEUE_MAX_SIZE:
         queue.append(item)
+        _PENDING_NOTIFY.append(item.group)
         logger.info(f"[QUEUE] enfileirado dedupe_key={dedupe_key} status={status} priority={priority} group={target_group}")
         return "ENQUEUED"
     # Fila cheia
@@ -99,6 +163,7 @@ def enqueue_message(queue, msg, dedupe_key, priority=0.0, group=None, channel="W
         if item.priority > lowest.priority:
             queue.remove(lowest)
             queue.append(item)
+            _PENDING_NOTIFY.append(item.group)
             logger.warning(f"[QUEUE] full policy=drop_lowest dropped={lowest.id} new={item.id}")
             return "DROPPED_LOWEST"
         else:
@@ -112,23 +177,21 @@ def enqueue_message(queue, msg, dedupe_key, priority=0.0, group=None, channel="W
         return "DROP_NEW"
 
 def is_in_queue(queue, dedupe_key):
-    def prune_queue_sent(queue_path=None, older_than_days=7):
-        """Remove itens da fila com status SENT mais antigos que X dias."""
-        import time
-        path = queue_path or os.path.join(os.path.dirname(__file__), '..', 'queue_messages.json')
-        path = os.path.abspath(path)
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                queue = json.load(f)
-        except Exception:
-            return 0
-        now = int(time.time())
-        cutoff = now - older_than_days * 86400
-        new_queue = [item for item in queue if not (item.get('status') == 'SENT' and item.get('created_ts', 0) < cutoff)]
-        removed = len(queue) - len(new_queue)
-        if removed > 0:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_queue, f, ensure_ascii=False, indent=2)
-        return removed
     # Verifica se a dedupe_key já está na fila
-    return any(item.get("dedupe_key") == dedupe_key for item in queue)
+    return any(item.id == dedupe_key for item in queue)
+
+
+def prune_queue_sent(queue_path=None, older_than_days=7):
+    """Remove itens da fila com status SENT mais antigos que X dias."""
+    import time
+    path = queue_path or _queue_path()
+    queue = load_queue_file(path)
+    if not queue:
+        return 0
+    now = int(time.time())
+    cutoff = now - older_than_days * 86400
+    new_queue = [item for item in queue if not (item.status == 'SENT' and item.created_ts < cutoff)]
+    removed = len(queue) - len(new_queue)
+    if removed > 0:
+        save_queue_file(new_queue, path)
+    return removed
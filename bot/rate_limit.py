@@ -0,0 +1,124 @@
+"""
+Rate limit por domínio (token bucket) para o scraping.
+
+Todos os workers do processo (browsers paralelos do fan-out) pegam token do
+mesmo bucket do domínio antes de driver.get, então o ritmo total por site
+respeita RATE_LIMITS_PER_DOMAIN mesmo com vários browsers abertos.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from bot.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMITS_PER_DOMAIN,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMIT_JITTER_SECONDS,
+)
+
+logger = logging.getLogger("kiwi_bot")
+
+
+class TokenBucket:
+    """rate_per_minute tokens/min, acumulando até burst. Thread-safe."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = max(float(rate_per_minute), 1e-6) / 60.0
+        self.capacity = max(1, int(burst))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.capacity)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Bloqueia até ter token. Retorna o tempo esperado (s).
+        Com timeout, levanta TimeoutError se não conseguir a tempo.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                need = (1.0 - self._tokens) / self.rate
+            if timeout is not None and waited + need > timeout:
+                raise TimeoutError(f"token indisponível em {timeout}s")
+            # Acorda e disputa de novo: outro worker pode ter pego o token
+            self.sleep(need)
+            waited += need
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def domain_for_url(url: str) -> str:
+    """Domínio configurado que casa com o host da URL (sufixo); senão o próprio host."""
+    host = (urlparse(url).hostname or "").lower()
+    for domain in RATE_LIMITS_PER_DOMAIN:
+        if host == domain or host.endswith("." + domain):
+            return domain
+    return host
+
+
+def _limits_for(domain: str) -> Tuple[float, int]:
+    return RATE_LIMITS_PER_DOMAIN.get(domain, RATE_LIMIT_DEFAULT)
+
+
+def get_bucket(domain: str) -> TokenBucket:
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(domain)
+        if bucket is None:
+            per_minute, burst = _limits_for(domain)
+            bucket = TokenBucket(per_minute, burst)
+            _BUCKETS[domain] = bucket
+        return bucket
+
+
+def acquire_for_url(url: str) -> float:
+    """Espera a vez do domínio da URL. Retorna o tempo total esperado (s)."""
+    if not RATE_LIMIT_ENABLED or not url:
+        return 0.0
+    domain = domain_for_url(url)
+    waited = get_bucket(domain).acquire()
+    if RATE_LIMIT_JITTER_SECONDS > 0:
+        # Pequeno jitter para os browsers não baterem em lockstep
+        jitter = random.uniform(0, RATE_LIMIT_JITTER_SECONDS)
+        time.sleep(jitter)
+        waited += jitter
+    if waited >= 1.0:
+        logger.info(f"[RATE] {domain} aguardou {waited:.1f}s")
+    return waited
+
+
+def polite_get(driver, url: str) -> None:
+    """driver.get respeitando o rate limit do domínio."""
+    acquire_for_url(url)
+    driver.get(url)
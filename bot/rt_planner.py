@@ -0,0 +1,135 @@
+"""
+Planner de ida e volta (RT) com poda de pares (ida, volta).
+
+Todos os pares ida × noites crescem quadraticamente com o horizonte. Para
+cada par calculamos um limite inferior do preço RT a partir do que já
+sabemos e só buscamos os pares que ainda podem ficar abaixo do teto:
+
+  - soma das idas em cada sentido (OW recente, route_date_state/cache) vezes
+    RT_OW_SUM_FACTOR (RT raramente sai muito abaixo da soma das idas);
+  - último preço do próprio par em rt_price_history, com margem de queda.
+
+Os pares que sobram são ordenados pelo limite (desconhecidos por último) e
+cortados em max_pairs por destino.
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bot.planner import expand_dests
+from bot.reasons import AttemptReport
+
+
+def pair_lower_bound(
+    depart: str,
+    ret: str,
+    out_prices: Dict[str, int],
+    in_prices: Dict[str, int],
+    pair_prices: Dict[Tuple[str, str], int],
+    *,
+    ow_sum_factor: float,
+    history_margin: float,
+) -> Optional[int]:
+    """Maior limite inferior disponível para o preço RT do par (None: nada se sabe)."""
+    bounds = []
+    out_p, in_p = out_prices.get(depart), in_prices.get(ret)
+    if out_p is not None or in_p is not None:
+        bounds.append(int(((out_p or 0) + (in_p or 0)) * ow_sum_factor))
+    seen = pair_prices.get((depart, ret))
+    if seen is not None:
+        bounds.append(int(seen * (1 - history_margin)))
+    return max(bounds) if bounds else None
+
+
+def _candidate_pairs(config) -> List[Tuple[str, str]]:
+    depart, ret = config.get("depart"), config.get("return_date")
+    if depart and ret:
+        return [(depart, ret)]
+    if depart:
+        d0 = datetime.date.fromisoformat(depart)
+        departs = [d0]
+    else:
+        start = datetime.date.today() + datetime.timedelta(days=config.get("start_offset_days", 1))
+        departs = [start + datetime.timedelta(days=i) for i in range(config.get("horizon_days", 21))]
+    pairs = []
+    for d in departs:
+        for n in config.get("nights_options", [3]):
+            pairs.append((d.isoformat(), (d + datetime.timedelta(days=n)).isoformat()))
+    return pairs
+
+
+def plan_rt_attempts(*, origin, dests, config, state_store) -> Tuple[list, list, dict]:
+    """
+    Retorna:
+      - attempts: dicts (origin, dest, date, return_date, ceiling, url, bound)
+      - reports: AttemptReport SKIP dos pares podados
+      - counts: {"pairs", "cooldown", "pruned_bound", "pruned_budget", "scraped"}
+    """
+    attempts: List[dict] = []
+    reports: List[AttemptReport] = []
+    counts = {"pairs": 0, "cooldown": 0, "pruned_bound": 0, "pruned_budget": 0, "scraped": 0}
+    ceilings = config.get("PRICE_CEILINGS_RT", {})
+    default_ceiling = config.get("DEFAULT_PRICE_CEILING_RT", 99999)
+    url_builder = config.get("build_url_rt")
+    max_pairs = config.get("max_pairs")
+    ow_max_age = config.get("ow_max_age_days", 3)
+    pairs = _candidate_pairs(config)
+
+    for dest in expand_dests(dests, config.get("destination_groups") or {}):
+        ceiling = ceilings.get(dest, default_ceiling)
+        out_prices = state_store.get_ow_best_prices(origin, dest, max_age_days=ow_max_age)
+        in_prices = state_store.get_ow_best_prices(dest, origin, max_age_days=ow_max_age)
+        pair_prices = state_store.get_rt_pair_prices(origin, dest, max_age_days=config.get("history_max_age_days", 7))
+
+        candidates = []
+        for depart, ret in pairs:
+            counts["pairs"] += 1
+            if not state_store.should_check(origin, dest, "RT", depart, ret):
+                counts["cooldown"] += 1
+                continue
+            bound = pair_lower_bound(
+                depart, ret, out_prices, in_prices, pair_prices,
+                ow_sum_factor=config.get("ow_sum_factor", 0.85),
+                history_margin=config.get("history_margin", 0.2),
+            )
+            if bound is not None and bound > ceiling:
+                counts["pruned_bound"] += 1
+                reports.append(AttemptReport(
+                    origin=origin,
+                    dest=dest,
+                    date=depart,
+                    phase="SKIP",
+                    reason="RT_BOUND_ABOVE_CEILING",
+                    details={"return_date": ret, "bound": bound, "ceiling": ceiling},
+                ))
+                continue
+            candidates.append((depart, ret, bound))
+
+        # Mais promissores primeiro; sem estimativa depois dos que cabem no teto
+        candidates.sort(key=lambda c: (c[2] is None, c[2] or 0, c[0], c[1]))
+        if max_pairs is not None and len(candidates) > max_pairs:
+            for depart, ret, bound in candidates[max_pairs:]:
+                reports.append(AttemptReport(
+                    origin=origin,
+                    dest=dest,
+                    date=depart,
+                    phase="SKIP",
+                    reason="RT_PAIR_BUDGET",
+                    details={"return_date": ret, "bound": bound},
+                ))
+            counts["pruned_budget"] += len(candidates) - max_pairs
+            candidates = candidates[:max_pairs]
+
+        for depart, ret, bound in candidates:
+            attempts.append({
+                "origin": origin,
+                "dest": dest,
+                "date": depart,
+                "return_date": ret,
+                "ceiling": ceiling,
+                "bound": bound,
+                "url": url_builder(origin, dest, depart, ret) if url_builder else None,
+            })
+            counts["scraped"] += 1
+    return attempts, reports, counts
@@ -1,19 +1,49 @@
 from __future__ import annotations
 
+import signal
+import sys
+import threading
 import time
 from typing import Dict, Any, Tuple, List
 
 from selenium.common.exceptions import NoSuchWindowException, WebDriverException
 from bot.browser import open_browser, close_browser
+from bot.circuit_breaker import CircuitBreaker, OUTCOME_OK
+from bot.calendar_mode import apply_calendar, scan_calendar
+from bot.config import (
+    BREAKER_ENABLED,
+    CALENDAR_BAD_COOLDOWN_HOURS,
+    CALENDAR_MODE_ENABLED,
+    CALENDAR_SPAN_DAYS,
+    METRO_SEARCH_PROVIDERS,
+    RT_HISTORY_MARGIN,
+    RT_HISTORY_MAX_AGE_DAYS,
+    RT_HORIZON_DAYS,
+    RT_MAX_PAIRS_PER_DEST,
+    RT_OW_MAX_AGE_DAYS,
+    RT_OW_SUM_FACTOR,
+    WRITE_BEHIND_ENABLED,
+    WRITE_BEHIND_FLUSH_ATTEMPTS,
+    WRITE_BEHIND_FLUSH_SECONDS,
+)
+from bot import debug_capture, metrics
+from bot.alert_templates import duration_text, price_text
 from bot.decision_engine import evaluate_offer_batch
-from bot.dedupe import make_offer_id, make_dedupe_key
+from bot.enrichment.lazy_share import enrich_winners
+from bot.offer_model import Offer
 from bot.logging_setup import setup_logger
 from bot.planner import plan_attempts
-from bot.pricing_utils import brl
+from bot.prioritizer import compute_priority_score
+from bot.parsing import offer_price_int
 from bot.queue_store import load_queue, save_queue, enqueue_message, sort_queue, is_in_queue
 from bot.reasons import AttemptReport
+from bot.message_builder import build_grouped_message
+from bot.providers import CALENDAR_PROVIDERS, RT_PROVIDERS, get_provider, network_capture_wanted, scrape_many, merge_provider_offers
 from bot.reporting import print_summary
-from bot import viajala_scraper
+from bot.rt_planner import plan_rt_attempts
+from bot.scrape_cache import split_by_airport
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+from bot.write_behind import DirectStore, WriteBehindStore
 
 try:
     from .. import routes_config as cfg
@@ -23,22 +53,98 @@ except ImportError:
     import state_store
 
 
-SCRAPERS = {
-    "viajala": viajala_scraper.scrape_with_selenium,
-}
-
-
 def _is_dead_window_exc(e: Exception) -> bool:
     msg = str(e).lower()
     return ("no such window" in msg) or ("web view not found" in msg)
 
 
-def _resolve_provider(args) -> Tuple[str, Any]:
-    provider = (getattr(args, "provider", None) or "viajala").lower()
-    scraper = SCRAPERS.get(provider)
-    if not scraper:
-        raise ValueError(f"Provider desconhecido: {provider}")
-    return provider, scraper
+def _resolve_providers(args) -> List[str]:
+    """--providers viajala,kiwi (fan-out) ou --provider único; default viajala."""
+    raw = getattr(args, "providers", None) or getattr(args, "provider", None) or "viajala"
+    names = list(dict.fromkeys(p.strip().lower() for p in raw.split(",") if p.strip()))
+    for name in names:
+        get_provider(name)
+    return names
+
+
+def _scrape_provider(
+    provider: str, drivers: Dict[str, Any], args, origin: str, dest: str, date: str, ceiling, max_cards: int = 30
+) -> ScrapeResult:
+    """Chama o adapter do provider; reabre o browser dele se a janela morreu."""
+    logger = setup_logger()
+    try:
+        return get_provider(provider)(drivers[provider], origin, dest, date, ceiling=ceiling, max_cards=max_cards)
+    except NoSuchWindowException as e:
+        metrics.BROWSER_RESTARTS.inc(provider=provider)
+        close_browser(drivers[provider])
+        drivers[provider], _ = open_browser(
+            headless=args.headless, scope=args.scope, kind=provider, network_capture=network_capture_wanted(provider)
+        )
+        logger.warning("[SCRAPE] %s selenium window error: %s", provider, e)
+    except WebDriverException as e:
+        if _is_dead_window_exc(e):
+            metrics.BROWSER_RESTARTS.inc(provider=provider)
+            close_browser(drivers[provider])
+            drivers[provider], _ = open_browser(
+                headless=args.headless, scope=args.scope, kind=provider, network_capture=network_capture_wanted(provider)
+            )
+        logger.warning("[SCRAPE] %s selenium error: %s", provider, e)
+    except Exception as e:
+        logger.warning("[SCRAPE] %s error: %s", provider, e)
+    return ScrapeResult(status=ScrapeStatus.ERROR, reason=ScrapeReason.SELENIUM_EXCEPTION, debug={"provider": provider})
+
+
+def _calendar_prune(attempts: List[dict], providers: List[str], drivers: Dict[str, Any], breakers: Dict[str, Any]) -> Tuple[List[dict], list]:
+    """
+    Lê o calendário de preços (uma página por faixa de ±CALENDAR_SPAN_DAYS),
+    grava preços/estado de todas as datas e devolve só os attempts cujo preço
+    do calendário não passa do teto.
+    """
+    logger = setup_logger()
+    name = next((p for p in providers if p in CALENDAR_PROVIDERS and (p not in breakers or breakers[p].state == "CLOSED")), None)
+    if name is None:
+        logger.info("[CALENDAR] nenhum provider com calendário disponível; scrape de todas as datas")
+        return attempts, []
+    fetch_page = CALENDAR_PROVIDERS[name]
+
+    by_route: Dict[Tuple[str, str], List[dict]] = {}
+    for attempt in attempts:
+        by_route.setdefault((attempt["origin"], attempt["dest"]), []).append(attempt)
+
+    prices: Dict[Tuple[str, str, str], int] = {}
+    sampled = set()  # (origin, dest, date) já amostrados neste ciclo
+    for (origin, dest), group in by_route.items():
+        found = scan_calendar(
+            lambda o, d, center: fetch_page(drivers[name], o, d, center),
+            origin,
+            dest,
+            [a["date"] for a in group],
+            span=CALENDAR_SPAN_DAYS,
+        )
+        if not found:
+            continue
+        # Preço da cidade é limite inferior para cada aeroporto do fanout (BAD/cooldown);
+        # amostra de histórico só no código buscado e só para as datas planejadas
+        ceilings: Dict[str, int] = {}
+        for attempt in group:
+            ceilings.update(attempt.get("ceilings") or {dest: attempt["ceiling"]})
+        sample_dates = [
+            d for d in dict.fromkeys(a["date"] for a in group) if d in found and (origin, dest, d) not in sampled
+        ]
+        sampled.update((origin, dest, d) for d in sample_dates)
+        for airport, ceiling in ceilings.items():
+            state_store.record_calendar_prices(
+                origin, airport, found, ceiling, cooldown_hours=CALENDAR_BAD_COOLDOWN_HOURS,
+                sample_dates=sample_dates if airport == dest else (),
+            )
+        if dest not in ceilings and sample_dates:
+            state_store.record_calendar_prices(origin, dest, found, None, sample_dates=sample_dates)
+        for date, price in found.items():
+            prices[(origin, dest, date)] = price
+
+    kept, reports = apply_calendar(attempts, prices)
+    logger.info(f"[CALENDAR] attempts={len(attempts)} detalhados={len(kept)} podados={len(attempts) - len(kept)}")
+    return kept, reports
 
 
 def _resolve_url_builder(provider: str):
@@ -48,60 +154,212 @@ def _resolve_url_builder(provider: str):
     return builder
 
 
-def _duration_text_from_minutes(minutes: int | None) -> str | None:
-    if minutes is None:
-        return None
-    hours = minutes // 60
-    mins = minutes % 60
-    if hours and mins:
-        return f"{hours}h {mins}m"
-    if hours:
-        return f"{hours}h"
-    return f"{mins}m"
+_duration_text_from_minutes = duration_text
+_price_int_from_offer = offer_price_int
 
 
-def _price_int_from_offer(offer: Dict[str, Any]) -> int | None:
-    price = offer.get("price")
-    if isinstance(price, int):
-        return price
-    price_int = offer.get("price_int")
-    if isinstance(price_int, int):
-        return price_int
-    if isinstance(price, str):
-        digits = "".join(ch for ch in price if ch.isdigit())
-        return int(digits) if digits else None
-    return None
+def _cards_skipped(results) -> int:
+    """Cards não lidos por parada antecipada (página ordenada por preço)."""
+    return sum(int((r.debug or {}).get("cards_skipped") or 0) for r in results)
+
+
+def _count(counts_phase_reason: Dict[Tuple[str, str], int], phase: str, reason: str) -> None:
+    counts_phase_reason[(phase, reason)] = counts_phase_reason.get((phase, reason), 0) + 1
+    metrics.ATTEMPTS.inc(phase=phase, reason=reason)
+
+
+def _run_rt_cycle(args, providers, drivers, breakers, queue, loaded_keys, reports, counts_phase_reason, store) -> Dict[str, int]:
+    """
+    Ciclo ida e volta: planeja os pares (ida, volta) com poda por limite
+    inferior de preço e busca só os que podem ficar abaixo do teto RT.
+    """
+    logger = setup_logger()
+    name = next((p for p in providers if p in RT_PROVIDERS), None)
+    if name is None:
+        raise ValueError(f"nenhum provider com busca RT em {providers} (use --provider {','.join(RT_PROVIDERS)})")
+    scrape_rt = RT_PROVIDERS[name]
+    slugs = getattr(cfg, "IATA_TO_SLUG", {})
+
+    config = {
+        "PRICE_CEILINGS_RT": cfg.PRICE_CEILINGS_RT,
+        "DEFAULT_PRICE_CEILING_RT": cfg.DEFAULT_PRICE_CEILING_RT,
+        "build_url_rt": lambda o, d, dep, ret: cfg.build_kiwi_url_rt(slugs.get(o, o), slugs.get(d, d), dep, ret),
+        "destination_groups": getattr(cfg, "DESTINATION_GROUPS", {}),
+        "nights_options": getattr(cfg, "RT_NIGHTS_OPTIONS", [3]),
+        "horizon_days": RT_HORIZON_DAYS,
+        "depart": getattr(args, "depart", None),
+        "return_date": getattr(args, "return_date", None),
+        "max_pairs": RT_MAX_PAIRS_PER_DEST,
+        "ow_sum_factor": RT_OW_SUM_FACTOR,
+        "ow_max_age_days": RT_OW_MAX_AGE_DAYS,
+        "history_margin": RT_HISTORY_MARGIN,
+        "history_max_age_days": RT_HISTORY_MAX_AGE_DAYS,
+    }
+    origin = args.origin
+    dests = [args.dest] if args.dest else cfg.DAILY_DEST_IATA
+    attempts, skip_reports, counts = plan_rt_attempts(origin=origin, dests=dests, config=config, state_store=store)
+    logger.info(
+        f"[RT-PLAN] pares={counts['pairs']} cooldown={counts['cooldown']} podados_limite={counts['pruned_bound']} "
+        f"podados_orcamento={counts['pruned_budget']} buscados={counts['scraped']}"
+    )
+    reports.extend(skip_reports)
+    for report in skip_reports:
+        _count(counts_phase_reason, report.phase, report.reason)
+
+    totals = {"collected": 0, "enqueued": 0, "cards_skipped": 0}
+    for attempt in attempts:
+        store.attempt_done()
+        dest, date, ret, ceiling = attempt["dest"], attempt["date"], attempt["return_date"], attempt["ceiling"]
+        logger.info(f"[ATTEMPT] RT {origin}->{dest} {date}<->{ret} bound={attempt['bound']} url={attempt['url']}")
+        if name in breakers and not breakers[name].allow():
+            reports.append(AttemptReport(origin=origin, dest=dest, date=date, phase="SKIP", reason="BREAKER_OPEN",
+                                         details={"provider": name, "return_date": ret}))
+            _count(counts_phase_reason, "SKIP", "BREAKER_OPEN")
+            continue
+        t0 = time.perf_counter()
+        try:
+            result = scrape_rt(drivers[name], origin, dest, date, ret, ceiling=ceiling, max_cards=10)
+        except Exception as e:
+            logger.warning(f"[SCRAPE] RT {name} error: {e}")
+            result = ScrapeResult(status=ScrapeStatus.ERROR, reason=ScrapeReason.SELENIUM_EXCEPTION, debug={"provider": name})
+        metrics.SCRAPE_SECONDS.observe(time.perf_counter() - t0, provider=name, trip_type="RT", status=result.status.name)
+        outcome = breakers[name].record(result) if name in breakers else OUTCOME_OK
+        totals["cards_skipped"] += _cards_skipped([result])
+
+        offers = [Offer.wrap(o) for o in result.flights or []]
+        prices = [p for p in (_price_int_from_offer(o) for o in offers) if p]
+        totals["collected"] += len(offers)
+        if not prices:
+            if outcome == OUTCOME_OK:
+                store.mark_no_data(origin, dest, "RT", date, ret, cooldown_hours=6)
+            reason = "NO_DATA" if outcome == OUTCOME_OK else "PROVIDER_FAILED"
+            reports.append(AttemptReport(origin=origin, dest=dest, date=date, phase="SCRAPE", reason=reason,
+                                         details={"provider": name, "return_date": ret}))
+            _count(counts_phase_reason, "SCRAPE", reason)
+            continue
+
+        min_price = min(prices)
+        store.rt_add_history(origin, dest, date, ret, min_price)
+        if min_price > ceiling:
+            store.mark_bad(origin, dest, "RT", date, ret, min_price)
+            reports.append(AttemptReport(origin=origin, dest=dest, date=date, phase="DECISION", reason="ABOVE_CEILING",
+                                         details={"return_date": ret, "min_price": min_price, "bound": attempt["bound"]}))
+            _count(counts_phase_reason, "DECISION", "ABOVE_CEILING")
+            continue
+        store.mark_good(origin, dest, "RT", date, ret, min_price)
+
+        best = sorted(offers, key=lambda o: _price_int_from_offer(o) or 10**9)[:3]
+        for offer in best:
+            price_int = _price_int_from_offer(offer)
+            if price_int is not None and not offer.get("price_text"):
+                offer["price_text"] = price_text(price_int)
+            if not offer.get("duration_text"):
+                offer["duration_text"] = _duration_text_from_minutes(offer.get("duration_min"))
+        dedupe_key = store.make_offer_hash("RT", origin, dest, date, ret, min_price, best[0].get("link"), name)
+        if is_in_queue(queue, dedupe_key) or store.was_seen_recently(dedupe_key, ttl_seconds=24 * 3600):
+            reports.append(AttemptReport(origin=origin, dest=dest, date=date, phase="DECISION", reason="DUPLICATE",
+                                         details={"return_date": ret}))
+            _count(counts_phase_reason, "DECISION", "DUPLICATE")
+            continue
+        enrich_winners(best, drivers, store=store)
+        message = build_grouped_message(
+            "RT", origin, dest, date, best, min_price, ceiling,
+            return_iso=ret, avg_info=store.get_rt_avg_price(origin, dest),
+        )
+        priority, _ = compute_priority_score(
+            price=min_price, ceiling=ceiling, route_key=f"{origin}-{dest}", trip_type="RT", state_store=store
+        )
+        status = enqueue_message(
+            queue, message, dedupe_key, priority,
+            meta={"origin": origin, "dest": dest, "provider": name, "date": date, "return_date": ret,
+                  "min_price": min_price, "route": f"{origin}-{dest}", "trip_type": "RT"},
+        )
+        if status in ("ENQUEUED", "DROPPED_LOWEST"):
+            save_queue(queue, scope=args.scope, loaded_keys=loaded_keys)
+            store.mark_seen(dedupe_key)
+            totals["enqueued"] += 1
+        reports.append(AttemptReport(origin=origin, dest=dest, date=date, phase="DECISION", reason="OK",
+                                     details={"return_date": ret, "min_price": min_price, "enqueue": status}))
+        _count(counts_phase_reason, "DECISION", "OK")
+        logger.info(f"[ENQUEUE] RT dedupe_key={dedupe_key} priority={priority} status={status}")
+    totals.update(counts)
+    return totals
+
+
+def _open_store():
+    """state_store do ciclo: com WRITE_BEHIND_ENABLED, escritas por attempt vão em lote."""
+    if not WRITE_BEHIND_ENABLED:
+        return DirectStore(state_store)
+    from bot import viajala_scraper
+
+    store = WriteBehindStore(state_store, flush_attempts=WRITE_BEHIND_FLUSH_ATTEMPTS, flush_seconds=WRITE_BEHIND_FLUSH_SECONDS)
+    viajala_scraper.set_adapt_write_behind(True)
+    store.add_flush_hook(viajala_scraper.flush_adapt_state)
+    return store
+
+
+def _close_store(store) -> None:
+    if not isinstance(store, WriteBehindStore):
+        return
+    from bot import viajala_scraper
+
+    try:
+        store.flush()
+    except Exception as e:
+        setup_logger().error(f"[WRITE-BEHIND] flush final falhou: {e}")
+    viajala_scraper.set_adapt_write_behind(False)
+
+
+def _exit_on_sigterm() -> None:
+    """SIGTERM vira SystemExit: o finally do ciclo grava o que está no buffer."""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
 
 
 def run(args) -> int:
     logger = setup_logger()
     start_time = time.time()
-    queue, _ = load_queue(scope=args.scope)
+    metrics.start("runner")
+    queue, loaded_keys = load_queue(scope=args.scope)
     if len(queue) >= 20:
         logger.warning("[EXIT] fila cheia (queue size >= 20)")
         return 0
 
-    driver = None
+    drivers: Dict[str, Any] = {}
     reports = []
     counts_phase_reason: Dict[Tuple[str, str], int] = {}
+    store = _open_store()
+    _exit_on_sigterm()
 
     try:
         state_store.setup_database()
 
-        provider, scraper = _resolve_provider(args)
-        url_builder = _resolve_url_builder(provider)
+        providers = _resolve_providers(args)
+        provider = "+".join(providers)
+        url_builder = _resolve_url_builder(providers[0])
 
         logger.info(
             f"[START] provider={provider} headless={args.headless} scope={args.scope} origin={args.origin} dest={args.dest}"
         )
 
-        driver, meta = open_browser(
-            headless=args.headless,
-            scope=args.scope,
-            kind=provider,
-        )
-        logger.info("[BROWSER] Chrome iniciado")
-        logger.info(f"[BROWSER] meta={meta}")
+        breakers = {name: CircuitBreaker(name, store=state_store) for name in providers} if BREAKER_ENABLED else {}
+        for name, breaker in breakers.items():
+            if breaker.state != "CLOSED":
+                logger.info(
+                    f"[BREAKER] {name} state={breaker.state} remaining={breaker.remaining_cooldown()}s "
+                    f"last_reason={breaker.last_reason}"
+                )
+
+        # Um browser por provider: no fan-out eles rodam em paralelo
+        for name in providers:
+            drivers[name], meta = open_browser(
+                headless=args.headless,
+                scope=args.scope,
+                kind=name,
+                network_capture=network_capture_wanted(name),
+            )
+            logger.info(f"[BROWSER] Chrome iniciado ({name})")
+            logger.info(f"[BROWSER] meta={meta}")
 
         origin = args.origin
         if args.dest is None:
@@ -116,22 +374,32 @@ def run(args) -> int:
             "date_window_days": getattr(cfg, "DATE_WINDOW_DAYS", 7),
             "weekdays_only": getattr(cfg, "WEEKDAYS_ONLY", False),
             "depart": getattr(args, "depart", None),
+            "destination_groups": getattr(cfg, "DESTINATION_GROUPS", {}),
+            # SP/RIO: uma busca por cidade quando todo provider busca por cidade
+            "coalesce_metro": all(name in METRO_SEARCH_PROVIDERS for name in providers),
         }
 
-        attempts, skip_reports = plan_attempts(
-            origin=origin,
-            dests=dests,
-            config=config,
-            state_store=state_store,
-        )
+        if (getattr(args, "trip", None) or "ow").lower() == "rt":
+            rt_totals = _run_rt_cycle(args, providers, drivers, breakers, queue, loaded_keys, reports, counts_phase_reason, store)
+            logger.info(f"[RT] {rt_totals}")
+            attempts, skip_reports = [], []
+        else:
+            attempts, skip_reports = plan_attempts(
+                origin=origin,
+                dests=dests,
+                config=config,
+                state_store=store,
+            )
         logger.info(f"[PLAN] attempts={len(attempts)}")
+        if attempts and (getattr(args, "calendar", False) or CALENDAR_MODE_ENABLED):
+            attempts, calendar_reports = _calendar_prune(attempts, providers, drivers, breakers)
+            skip_reports = list(skip_reports) + calendar_reports
         reports.extend(skip_reports)
         for report in skip_reports:
             logger.info(
                 f"[SKIP] {report.origin}->{report.dest} {report.date} {report.reason} {report.details}"
             )
-            key = (report.phase, report.reason)
-            counts_phase_reason[key] = counts_phase_reason.get(key, 0) + 1
+            _count(counts_phase_reason, report.phase, report.reason)
 
         if attempts:
             logger.info(f"[INFO] Primeira URL a ser processada: {attempts[0]['url']}")
@@ -139,32 +407,42 @@ def run(args) -> int:
         total_collected = 0
         total_after_dedupe = 0
         total_enqueued = 0
+        scrape_totals = {"cards_skipped": 0}
 
         for attempt in attempts:
+            store.attempt_done()
             url = attempt.get("url")
             ceiling = attempt["ceiling"]
             date = attempt["date"]
             dest = attempt["dest"]
             origin = attempt["origin"]
-
-            logger.info(f"[ATTEMPT] origin={origin} dest={dest} date={date} url={url}")
-            if not state_store.should_check(origin, dest, "OW", date, None):
+            # Busca por cidade (SAO/RIO) repartida entre os aeroportos do fanout
+            fanout = attempt.get("fanout") or [dest]
+            ceilings = attempt.get("ceilings") or {dest: ceiling}
+
+            logger.info(f"[ATTEMPT] origin={origin} dest={dest} date={date} url={url} fanout={fanout}")
+            targets = [d for d in fanout if store.should_check(origin, d, "OW", date, None)]
+            for skipped in fanout:
+                if skipped in targets:
+                    continue
                 reports.append(
                     AttemptReport(
                         origin=origin,
-                        dest=dest,
+                        dest=skipped,
                         date=date,
                         phase="SKIP",
                         reason="COOLDOWN_ACTIVE",
                         details={"provider": provider},
                     )
                 )
-                counts_phase_reason[("SKIP", "COOLDOWN_ACTIVE")] = counts_phase_reason.get(
-                    ("SKIP", "COOLDOWN_ACTIVE"),
-                    0,
-                ) + 1
-                logger.info(f"[SKIP] cooldown active {origin}->{dest} {date}")
+                _count(counts_phase_reason, "SKIP", "COOLDOWN_ACTIVE")
+                logger.info(f"[SKIP] cooldown active {origin}->{skipped} {date}")
+            if not targets:
                 continue
+            if len(targets) == 1 and len(fanout) > 1:
+                # Sobrou um aeroporto: busca direta
+                dest = targets[0]
+                ceiling = ceilings[dest]
             if not url:
                 reports.append(
                     AttemptReport(
@@ -176,171 +454,210 @@ def run(args) -> int:
                         details={"provider": provider},
                     )
                 )
-                counts_phase_reason[("SCRAPE", "URL_MISSING")] = counts_phase_reason.get(
-                    ("SCRAPE", "URL_MISSING"),
-                    0,
-                ) + 1
+                _count(counts_phase_reason, "SCRAPE", "URL_MISSING")
                 continue
 
-            offers: List[Dict[str, Any]] = []
-            try:
-                offers = scraper(driver, origin, dest, date, max_cards=30)
-            except NoSuchWindowException as e:
-                close_browser(driver)
-                driver, meta = open_browser(headless=args.headless, scope=args.scope, kind=provider)
-                offers = []
-                logger.warning("[SCRAPE] selenium window error: %s", e)
-            except WebDriverException as e:
-                if _is_dead_window_exc(e):
-                    close_browser(driver)
-                    driver, meta = open_browser(headless=args.headless, scope=args.scope, kind=provider)
-                offers = []
-                logger.warning("[SCRAPE] selenium error: %s", e)
-            except Exception as e:
-                offers = []
-                logger.warning("[SCRAPE] error: %s", e)
-
-            total_collected += len(offers)
-
-            if not offers:
-                state_store.mark_no_data(origin, dest, "OW", date, None, cooldown_hours=1)
-                reports.append(
-                    AttemptReport(
-                        origin=origin,
-                        dest=dest,
-                        date=date,
-                        phase="SCRAPE",
-                        reason="NO_DATA",
-                        details={"provider": provider},
+            active = [name for name in providers if name not in breakers or breakers[name].allow()]
+            for name in providers:
+                if name not in active:
+                    reports.append(
+                        AttemptReport(
+                            origin=origin,
+                            dest=dest,
+                            date=date,
+                            phase="SKIP",
+                            reason="BREAKER_OPEN",
+                            details={"provider": name, "remaining_s": breakers[name].remaining_cooldown()},
+                        )
                     )
-                )
-                counts_phase_reason[("SCRAPE", "NO_DATA")] = counts_phase_reason.get(
-                    ("SCRAPE", "NO_DATA"),
-                    0,
-                ) + 1
-                logger.info(f"[SCRAPE] no offers {origin}->{dest} {date}")
-                continue
-
-            normalized: List[Dict[str, Any]] = []
-            for offer in offers:
-                offer["provider"] = offer.get("provider") or provider
-                offer["origin"] = offer.get("origin") or origin
-                offer["destination"] = offer.get("destination") or dest
-                offer["depart_date"] = offer.get("depart_date") or date
-                offer["origin_code"] = offer.get("origin_code") or origin
-                offer["dest_code"] = offer.get("dest_code") or dest
-
-                price_int = _price_int_from_offer(offer)
-                if price_int is not None:
-                    offer["price_int"] = price_int
-                    offer["price"] = f"R$ {brl(price_int)}"
-
-                if not offer.get("duration_text"):
-                    offer["duration_text"] = _duration_text_from_minutes(offer.get("duration_min"))
-
-                normalized.append(offer)
-
-            prices = [o.get("price_int") for o in normalized if o.get("price_int") is not None]
-            min_price = min(prices) if prices else None
-            if min_price is None:
-                state_store.mark_no_data(origin, dest, "OW", date, None, cooldown_hours=1)
-                logger.info(f"[SCRAPE] offers without price {origin}->{dest} {date}")
+                    _count(counts_phase_reason, "SKIP", "BREAKER_OPEN")
+            if not active:
+                logger.info(f"[SKIP] breaker aberto para todos os providers {origin}->{dest} {date}")
                 continue
 
-            state_store.mark_good(origin, dest, "OW", date, None, min_price)
+            def _collect(search_dest: str, search_ceiling, max_cards: int) -> Tuple[Dict[str, ScrapeResult], List[Dict[str, Any]]]:
+                results = scrape_many(
+                    {name: drivers[name] for name in active},
+                    origin,
+                    search_dest,
+                    date,
+                    ceiling=search_ceiling,
+                    call=lambda name, _driver: _scrape_provider(
+                        name, drivers, args, origin, search_dest, date, search_ceiling, max_cards=max_cards
+                    ),
+                )
+                scrape_totals["cards_skipped"] += _cards_skipped(results.values())
+                found = [o for name in active for o in (results[name].flights or [])]
+                if len(providers) > 1 and found:
+                    before = len(found)
+                    found = merge_provider_offers(found)
+                    logger.info(f"[MERGE] {origin}->{search_dest} {date} providers={provider} offers={before}->{len(found)}")
+                return results, found
+
+            results, offers = _collect(dest, ceiling, 30 * len(targets) if len(targets) > 1 else 30)
+            outcomes = {}
+            for name in active:
+                outcomes[name] = breakers[name].record(results[name]) if name in breakers else OUTCOME_OK
+
+            if len(targets) > 1:
+                per_dest = {t: split_by_airport(offers, t) for t in targets}
+                if any(v is None for v in per_dest.values()):
+                    # Ofertas sem aeroporto de chegada: não dá para repartir, busca cada aeroporto
+                    logger.info(f"[FANOUT] {origin}->{dest} {date} sem aeroporto por oferta; buscando {targets}")
+                    per_dest = {t: _collect(t, ceilings[t], 30)[1] for t in targets}
+                logger.info(
+                    f"[FANOUT] {origin}->{dest} {date} offers={len(offers)} -> "
+                    + " ".join(f"{t}={len(o)}" for t, o in per_dest.items())
+                )
+            else:
+                per_dest = {dest: offers}
+
+            for dest, offers in per_dest.items():
+                ceiling = ceilings.get(dest, ceiling)
+                total_collected += len(offers)
+
+                if not offers:
+                    # Bloqueio/falha do provider não é "sem dados": não aplica cooldown na data
+                    failed = all(outcome != OUTCOME_OK for outcome in outcomes.values())
+                    if not failed:
+                        store.mark_no_data(origin, dest, "OW", date, None, cooldown_hours=1)
+                    reason = "PROVIDER_FAILED" if failed else "NO_DATA"
+                    reports.append(
+                        AttemptReport(
+                            origin=origin,
+                            dest=dest,
+                            date=date,
+                            phase="SCRAPE",
+                            reason=reason,
+                            details={"provider": provider, "outcomes": outcomes},
+                        )
+                    )
+                    _count(counts_phase_reason, "SCRAPE", reason)
+                    logger.info(f"[SCRAPE] no offers {origin}->{dest} {date}")
+                    continue
 
-            deduped: List[Dict[str, Any]] = []
-            for offer in normalized:
-                offer_id = make_offer_id(offer)
-                dedupe_key = make_dedupe_key(offer_id, channel="WHATSAPP", kind="ALERT")
-                offer["offer_id"] = offer_id
-                offer["dedupe_key"] = dedupe_key
-                if is_in_queue(queue, dedupe_key):
-                    logger.debug("[DEDUPE] queue duplicate key=%s", dedupe_key)
+                normalized: List[Dict[str, Any]] = []
+                for raw_offer in offers:
+                    offer = Offer.wrap(raw_offer)
+                    offer["provider"] = offer.get("provider") or provider
+                    offer["origin"] = offer.get("origin") or origin
+                    offer["destination"] = offer.get("destination") or dest
+                    offer["depart_date"] = offer.get("depart_date") or date
+                    offer["origin_code"] = offer.get("origin_code") or origin
+                    offer["dest_code"] = offer.get("dest_code") or dest
+
+                    price_int = _price_int_from_offer(offer)
+                    if price_int is not None:
+                        offer["price_int"] = price_int
+                        offer["price"] = price_text(price_int)
+
+                    if not offer.get("duration_text"):
+                        offer["duration_text"] = _duration_text_from_minutes(offer.get("duration_min"))
+
+                    normalized.append(offer)
+
+                prices = [o.get("price_int") for o in normalized if o.get("price_int") is not None]
+                min_price = min(prices) if prices else None
+                if min_price is None:
+                    store.mark_no_data(origin, dest, "OW", date, None, cooldown_hours=1)
+                    logger.info(f"[SCRAPE] offers without price {origin}->{dest} {date}")
                     continue
-                if state_store.was_seen_recently(dedupe_key, ttl_seconds=24 * 3600):
-                    logger.debug("[DEDUPE] ttl duplicate key=%s", dedupe_key)
+
+                store.mark_good(origin, dest, "OW", date, None, min_price)
+
+                deduped: List[Dict[str, Any]] = []
+                for offer in normalized:
+                    offer_id = offer.offer_id
+                    dedupe_key = offer.dedupe_key(channel="WHATSAPP", kind="ALERT")
+                    offer["offer_id"] = offer_id
+                    offer["dedupe_key"] = dedupe_key
+                    if is_in_queue(queue, dedupe_key):
+                        logger.debug("[DEDUPE] queue duplicate key=%s", dedupe_key)
+                        continue
+                    if store.was_seen_recently(dedupe_key, ttl_seconds=24 * 3600):
+                        logger.debug("[DEDUPE] ttl duplicate key=%s", dedupe_key)
+                        continue
+                    deduped.append(offer)
+
+                total_after_dedupe += len(deduped)
+
+                if not deduped:
+                    reports.append(
+                        AttemptReport(
+                            origin=origin,
+                            dest=dest,
+                            date=date,
+                            phase="DECISION",
+                            reason="DUPLICATE",
+                            details={"provider": provider},
+                        )
+                    )
+                    _count(counts_phase_reason, "DECISION", "DUPLICATE")
                     continue
-                deduped.append(offer)
 
-            total_after_dedupe += len(deduped)
+                result = evaluate_offer_batch(
+                    flights=deduped,
+                    min_price=min_price,
+                    ceiling=ceiling,
+                    origin=origin,
+                    dest=dest,
+                    depart_date=date,
+                    queue=queue,
+                    state_store=store,
+                    enrich=lambda winners: enrich_winners(winners, drivers, store=store),
+                )
 
-            if not deduped:
                 reports.append(
                     AttemptReport(
                         origin=origin,
                         dest=dest,
                         date=date,
                         phase="DECISION",
-                        reason="DUPLICATE",
-                        details={"provider": provider},
+                        reason=getattr(result, "reason", "UNKNOWN"),
+                        details={},
                     )
                 )
-                counts_phase_reason[("DECISION", "DUPLICATE")] = counts_phase_reason.get(
-                    ("DECISION", "DUPLICATE"),
-                    0,
-                ) + 1
-                continue
-
-            result = evaluate_offer_batch(
-                flights=deduped,
-                min_price=min_price,
-                ceiling=ceiling,
-                origin=origin,
-                dest=dest,
-                depart_date=date,
-                queue=queue,
-                state_store=state_store,
-            )
-
-            reports.append(
-                AttemptReport(
-                    origin=origin,
-                    dest=dest,
-                    date=date,
-                    phase="DECISION",
-                    reason=getattr(result, "reason", "UNKNOWN"),
-                    details={},
-                )
-            )
-            logger.info(
-                f"[DECISION] {origin}->{dest} {date} reason={getattr(result, 'reason', 'UNKNOWN')} "
-                f"should_enqueue={getattr(result, 'should_enqueue', False)}"
-            )
-            key = ("DECISION", getattr(result, "reason", "UNKNOWN"))
-            counts_phase_reason[key] = counts_phase_reason.get(key, 0) + 1
-
-            if getattr(result, "should_enqueue", False):
-                enqueue_message(
-                    queue,
-                    result.message_text,
-                    result.dedupe_key,
-                    result.priority,
-                    meta={
-                        "origin": origin,
-                        "dest": dest,
-                        "provider": provider,
-                        "date": date,
-                        "min_price": min_price,
-                        "route": f"{origin}-{dest}",
-                    },
-                )
                 logger.info(
-                    f"[ENQUEUE] dedupe_key={result.dedupe_key} priority={result.priority} queue_size={len(queue)}"
+                    f"[DECISION] {origin}->{dest} {date} reason={getattr(result, 'reason', 'UNKNOWN')} "
+                    f"should_enqueue={getattr(result, 'should_enqueue', False)}"
                 )
-                total_enqueued += 1
-                if hasattr(state_store, "mark_seen"):
-                    state_store.mark_seen(result.dedupe_key)
+                _count(counts_phase_reason, "DECISION", getattr(result, "reason", "UNKNOWN"))
+
+                if getattr(result, "should_enqueue", False):
+                    enqueue_status = enqueue_message(
+                        queue,
+                        result.message_text,
+                        result.dedupe_key,
+                        result.priority,
+                        meta={
+                            "origin": origin,
+                            "dest": dest,
+                            "provider": provider,
+                            "date": date,
+                            "min_price": min_price,
+                            "route": f"{origin}-{dest}",
+                        },
+                    )
+                    if enqueue_status in ("ENQUEUED", "DROPPED_LOWEST"):
+                        # Persiste já para o sender (em espera) acordar sem esperar o fim do ciclo
+                        save_queue(queue, scope=args.scope, loaded_keys=loaded_keys)
+                    logger.info(
+                        f"[ENQUEUE] dedupe_key={result.dedupe_key} priority={result.priority} queue_size={len(queue)}"
+                    )
+                    total_enqueued += 1
+                    if hasattr(store, "mark_seen"):
+                        store.mark_seen(result.dedupe_key)
 
         queue = sort_queue(queue)
-        save_queue(queue, scope=args.scope)
+        save_queue(queue, scope=args.scope, loaded_keys=loaded_keys)
         logger.info(f"[QUEUE] final size={len(queue)}")
         logger.info(
-            "[SUMMARY] attempts=%s collected=%s deduped=%s enqueued=%s",
+            "[SUMMARY] attempts=%s collected=%s deduped=%s enqueued=%s cards_skipped=%s",
             len(attempts),
             total_collected,
             total_after_dedupe,
             total_enqueued,
+            scrape_totals["cards_skipped"],
         )
         try:
             from bot.queue_models import queue_stats
@@ -358,6 +675,13 @@ def run(args) -> int:
         except Exception:
             stats = {}
 
+        breaker_transitions = {
+            f"{name}:{key}": count
+            for name, breaker in breakers.items()
+            for key, count in breaker.transitions.items()
+        }
+        if breaker_transitions:
+            logger.info(f"[BREAKER] transições no ciclo: {breaker_transitions}")
         logger.info("[SUMMARY] Contadores por fase/motivo:")
         for (phase, reason), count in sorted(counts_phase_reason.items()):
             logger.info(f"  {phase}:{reason} = {count}")
@@ -374,6 +698,12 @@ def run(args) -> int:
                         for (phase, reason), count in counts_phase_reason.items()
                     },
                     "queue": stats,
+                    "breakers": {
+                        name: {"state": b.state, "trips": b.trips, "last_reason": b.last_reason}
+                        for name, b in breakers.items()
+                    },
+                    "breaker_transitions": breaker_transitions,
+                    "cards_skipped": scrape_totals["cards_skipped"],
                     "duration": duration,
                 }
             )
@@ -391,4 +721,10 @@ def run(args) -> int:
         logger.error(traceback.format_exc())
         return 1
     finally:
-        close_browser(driver)
+        _close_store(store)
+        debug_capture.flush_default()
+        metrics.CYCLE_SECONDS.set(time.time() - start_time)
+        metrics.CYCLE_END.set(time.time())
+        metrics.flush()
+        for drv in drivers.values():
+            close_browser(drv)
@@ -0,0 +1,150 @@
+"""
+Cache de resultados de scrape por (provider, origem, destino, data).
+
+Buscas repetidas dentro do TTL do provider (ciclos seguidos do runner,
+rodadas manuais) saem do SQLite (JSON comprimido) sem abrir página.
+
+Nos providers com busca por cidade (METRO_SEARCH_PROVIDERS), os
+aeroportos da mesma metrópole (GRU/CGH/VCP -> SAO, GIG/SDU -> RIO)
+compartilham uma única busca da cidade, repartida pelo arr_airport das ofertas.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from bot.config import (
+    SCRAPE_CACHE_ENABLED,
+    SCRAPE_CACHE_TTL_SECONDS,
+    SCRAPE_CACHE_DEFAULT_TTL_SECONDS,
+    METRO_SEARCH_PROVIDERS,
+)
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+from bot.viajala_urls import AIRPORT_TO_CITY, CITY_TO_AIRPORTS
+
+logger = logging.getLogger("kiwi_bot")
+
+
+def cache_ttl(provider: str) -> int:
+    return int(SCRAPE_CACHE_TTL_SECONDS.get(provider, SCRAPE_CACHE_DEFAULT_TTL_SECONDS))
+
+
+def _cacheable(result: ScrapeResult) -> bool:
+    # Bloqueio/erro/página que não carregou não são resultado: não guardar
+    if result.status == ScrapeStatus.OK:
+        return bool(result.flights)
+    return result.status == ScrapeStatus.EMPTY and result.reason == ScrapeReason.NO_RESULTS
+
+
+def _to_payload(result: ScrapeResult) -> dict:
+    return {
+        "status": result.status.name,
+        "reason": result.reason.name,
+        "flights": result.flights or [],
+        "min_price": result.min_price,
+    }
+
+
+def _from_payload(data: dict, cache: str) -> ScrapeResult:
+    return ScrapeResult(
+        status=ScrapeStatus[data["status"]],
+        reason=ScrapeReason[data["reason"]],
+        flights=data.get("flights") or [],
+        min_price=data.get("min_price", -1),
+        debug={"cache": cache, "fetched_at": data.get("fetched_at")},
+    )
+
+
+def split_by_airport(offers: List[Dict[str, Any]], airport: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ofertas de uma busca por cidade que pousam em airport (destination reescrito).
+    None quando alguma oferta não traz o aeroporto de chegada (sem arr_airport
+    ou só o código da cidade, ex. "SAO"): não dá para repartir.
+    """
+    if any(not o.get("arr_airport") or o["arr_airport"] in CITY_TO_AIRPORTS for o in offers):
+        return None
+    return [dict(o, destination=airport) for o in offers if o["arr_airport"] == airport]
+
+
+def _result_for(offers: List[Dict[str, Any]], source: ScrapeResult, cache: str) -> ScrapeResult:
+    prices = [o["price_int"] for o in offers if o.get("price_int")]
+    return ScrapeResult(
+        status=ScrapeStatus.OK if offers else ScrapeStatus.EMPTY,
+        reason=ScrapeReason.UNKNOWN if offers else ScrapeReason.NO_RESULTS,
+        flights=offers,
+        min_price=min(prices) if prices else -1,
+        debug=dict(source.debug or {}, cache=cache),
+    )
+
+
+def _store():
+    import state_store
+
+    return state_store
+
+
+def cached_scrape(
+    provider: str,
+    scrape_fn: Callable[..., ScrapeResult],
+    driver,
+    origin: str,
+    dest: str,
+    depart_date: str,
+    *,
+    ceiling: Optional[int] = None,
+    max_cards: int = 30,
+    store=None,
+) -> ScrapeResult:
+    """Serve do cache dentro do TTL; senão chama scrape_fn e guarda (metrópole: busca a cidade uma vez)."""
+    if not SCRAPE_CACHE_ENABLED:
+        return scrape_fn(driver, origin, dest, depart_date, ceiling=ceiling, max_cards=max_cards)
+    store = store or _store()
+    ttl = cache_ttl(provider)
+
+    def _get(key_dest: str) -> Optional[dict]:
+        try:
+            return store.get_scrape_cache(provider, origin, key_dest, depart_date, ttl)
+        except Exception as e:
+            logger.warning(f"[CACHE] {provider} leitura falhou: {e}")
+            return None
+
+    def _save(key_dest: str, result: ScrapeResult) -> None:
+        if not _cacheable(result):
+            return
+        try:
+            store.save_scrape_cache(provider, origin, key_dest, depart_date, _to_payload(result))
+        except Exception as e:
+            logger.warning(f"[CACHE] {provider} gravação falhou: {e}")
+
+    hit = _get(dest)
+    if hit is not None:
+        logger.info(f"[CACHE] hit {provider} {origin}->{dest} {depart_date}")
+        return _from_payload(hit, "hit")
+
+    city = AIRPORT_TO_CITY.get(dest) if provider in METRO_SEARCH_PROVIDERS else None
+    if city:
+        city_hit = _get(city)
+        if city_hit is not None:
+            city_result = _from_payload(city_hit, "metro")
+        else:
+            # Uma busca da cidade cobre todos os aeroportos: mais cards por aeroporto
+            city_cards = max_cards * len(CITY_TO_AIRPORTS.get(city, (dest,)))
+            city_result = scrape_fn(driver, origin, city, depart_date, ceiling=ceiling, max_cards=city_cards)
+            _save(city, city_result)
+        if city_result.status == ScrapeStatus.BLOCKED:
+            # Mesmo site, mesmo bloqueio: não insiste com a URL do aeroporto
+            return city_result
+        offers = split_by_airport(city_result.flights or [], dest) if _cacheable(city_result) else None
+        if offers is not None:
+            result = _result_for(offers[:max_cards], city_result, "metro")
+            _save(dest, result)
+            logger.info(f"[CACHE] metro {provider} {origin}->{city}->{dest} {depart_date} offers={len(offers)}")
+            return result
+        logger.info(f"[CACHE] metro {provider} {origin}->{city} não repartível ({city_result.status.name}); buscando {dest}")
+
+    result = scrape_fn(driver, origin, dest, depart_date, ceiling=ceiling, max_cards=max_cards)
+    _save(dest, result)
+    if result.debug is None:
+        result.debug = {}
+    result.debug.setdefault("cache", "miss")
+    return result
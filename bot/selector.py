@@ -1,5 +1,5 @@
 from typing import List, Dict, Tuple
-from bot.pricing_utils import parse_brl_to_int
+from bot.parsing import offer_price_int
 from bot.decision_buckets import day_bucket
 
 def pick_best_3_buckets(flights: List[Dict], ceiling: int) -> List[Dict]:
@@ -10,8 +10,8 @@ def pick_best_3_buckets(flights: List[Dict], ceiling: int) -> List[Dict]:
     buckets = {"manha": None, "tarde": None, "noite": None}
     filtered: List[Tuple[int, Dict]] = []
     for f in flights:
-        p = parse_brl_to_int(f.get("price", ""))
-        if p == -1:
+        p = offer_price_int(f)
+        if p is None:
             continue
         if p > ceiling:
             continue
@@ -65,3 +65,9 @@ XPATH_COOKIE_ACCEPT_BUTTON = (
 
 XPATH_INTERSTITIAL_CLOSE = "//button[contains(., '×') or contains(., 'X')]"
 XPATH_CARD_IN_MODAL = "ancestor::div[contains(@class,'frame-container') and contains(@class,'modal')]"
+
+# Faixa de datas flexíveis (±3 dias com menor preço por dia)
+CSS_DATE_STRIP_ITEM = (
+    "app-flexible-dates .date-item, app-date-slider .date-item, "
+    "div.flexible-dates [class*='day'], div.dates-bar [class*='date']"
+)
@@ -1,6 +1,7 @@
 import time
 import sys
 import traceback
+from bot import metrics
 from bot.runner import run as run_one_cycle
 from bot.logging_setup import setup_logger
 from bot.healthcheck import write_heartbeat
@@ -46,15 +47,17 @@ def run_forever():
             today = time.strftime("%Y-%m-%d")
             if last_prune_day != today:
                 try:
-                    from state_store import prune_seen, prune_history
+                    from state_store import prune_seen, prune_history, prune_scrape_cache
                     from bot.queue_store import prune_queue_sent
                     n_seen = prune_seen(older_than_seconds=30*86400)
                     n_hist = prune_history(older_than_days=90)
                     n_queue = prune_queue_sent(older_than_days=7)
-                    logger.info(f"[PRUNE] seen={n_seen} history={n_hist} queue_sent={n_queue}")
+                    n_cache = prune_scrape_cache(older_than_seconds=86400)
+                    logger.info(f"[PRUNE] seen={n_seen} history={n_hist} queue_sent={n_queue} scrape_cache={n_cache}")
                 except Exception as e:
                     logger.error(f"[PRUNE] erro: {e}")
                 last_prune_day = today
+            metrics.CONSECUTIVE_FAILURES.set(failures)
             # Heartbeat
             write_heartbeat(SERVICE_HEARTBEAT_PATH, {
                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
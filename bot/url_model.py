@@ -0,0 +1,92 @@
+"""
+Modelo por destino das URLs de busca alternativas (ex.: REC-GRU vs REC-SAO).
+
+Cada variante (código usado na URL) guarda observações com decaimento
+exponencial (meia-vida URL_MODEL_HALF_LIFE_HOURS): taxa de sucesso
+(tentativa com ofertas) e tempo até o 1º preço. A ordem das URLs segue a
+taxa suavizada e, no empate, o tempo; variantes que só dão zero
+(URL_MODEL_SKIP_AFTER seguidas) são puladas até URL_MODEL_REPROBE_HOURS
+depois da última tentativa. Nunca pula todas.
+
+O modelo é um dict serializável em JSON (guardado no AdaptState do scraper).
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bot.config import URL_MODEL_HALF_LIFE_HOURS, URL_MODEL_REPROBE_HOURS, URL_MODEL_SKIP_AFTER
+
+Model = Dict[str, Dict[str, dict]]
+
+
+def _decay(entry: dict, now: float, half_life_hours: float) -> float:
+    age_h = max(0.0, now - entry.get("ts", now)) / 3600
+    return 0.5 ** (age_h / half_life_hours) if half_life_hours > 0 else 1.0
+
+
+def observe(
+    model: Model,
+    dest: str,
+    code: str,
+    ok: bool,
+    ttfp: Optional[float] = None,
+    *,
+    now: Optional[float] = None,
+    half_life_hours: float = URL_MODEL_HALF_LIFE_HOURS,
+) -> dict:
+    """Registra uma tentativa da variante code para dest (in-place); retorna a entrada."""
+    now = time.time() if now is None else now
+    entry = model.setdefault(dest, {}).setdefault(code, {"n": 0.0, "ok": 0.0, "ttfp": None, "zero_streak": 0, "ts": now})
+    f = _decay(entry, now, half_life_hours)
+    entry["n"] = entry["n"] * f + 1
+    entry["ok"] = entry["ok"] * f + (1 if ok else 0)
+    if ttfp is not None:
+        prev = entry.get("ttfp")
+        # Média com peso das observações anteriores já decaídas
+        entry["ttfp"] = round(ttfp if prev is None else prev + (ttfp - prev) / entry["n"], 2)
+    entry["zero_streak"] = 0 if ok else entry.get("zero_streak", 0) + 1
+    entry["ts"] = now
+    return entry
+
+
+def success_rate(entry: Optional[dict], now: float, half_life_hours: float = URL_MODEL_HALF_LIFE_HOURS) -> float:
+    """Taxa suavizada (sem histórico = 50%), já com o decaimento até agora."""
+    if not entry:
+        return 0.5
+    f = _decay(entry, now, half_life_hours)
+    return (entry["ok"] * f + 1) / (entry["n"] * f + 2)
+
+
+def order(
+    model: Model,
+    dest: str,
+    urls: Sequence[str],
+    code_of: Callable[[str], Optional[str]],
+    *,
+    now: Optional[float] = None,
+    half_life_hours: float = URL_MODEL_HALF_LIFE_HOURS,
+    skip_after: int = URL_MODEL_SKIP_AFTER,
+    reprobe_hours: float = URL_MODEL_REPROBE_HOURS,
+) -> Tuple[List[str], List[str]]:
+    """(urls na ordem a tentar, urls puladas). Empate mantém a ordem original."""
+    now = time.time() if now is None else now
+    stats = model.get(dest) or {}
+
+    def entry(url: str) -> Optional[dict]:
+        return stats.get(code_of(url) or "")
+
+    def dead(url: str) -> bool:
+        e = entry(url)
+        return bool(e) and e.get("zero_streak", 0) >= skip_after and now - e["ts"] < reprobe_hours * 3600
+
+    def key(url: str):
+        e = entry(url)
+        ttfp = e.get("ttfp") if e else None
+        return (-success_rate(e, now, half_life_hours), ttfp if ttfp is not None else float("inf"))
+
+    ranked = sorted(urls, key=key)
+    keep = [u for u in ranked if not dead(u)]
+    if not keep:
+        return ranked, []
+    return keep, [u for u in ranked if u not in keep]
@@ -0,0 +1,236 @@
+"""
+Parser das respostas JSON que a página de resultados do Viajala carrega.
+
+O schema não é documentado; o parser procura, em qualquer nível do JSON,
+objetos com preço + horários de ida/chegada (campos com nomes usuais:
+price/amount, departure/arrival, airline/carrier, deeplink/url...) e os
+converte para o mesmo formato de oferta do scraper DOM.
+"""
+from __future__ import annotations
+
+import datetime
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from bot import utils_viajala as VU
+
+_PRICE_KEYS = ("price", "amount", "total", "totalprice", "pricetotal", "minprice", "valor", "precio", "fare")
+_DEP_KEYS = ("departure", "departuretime", "departuredatetime", "dep", "deptime", "departuredate", "salida", "partida")
+_ARR_KEYS = ("arrival", "arrivaltime", "arrivaldatetime", "arr", "arrtime", "arrivaldate", "llegada", "chegada")
+_AIRLINE_KEYS = ("airline", "airlinename", "carrier", "carriername", "marketingcarrier", "company", "companhia")
+_LINK_KEYS = ("deeplink", "bookingurl", "bookinglink", "redirecturl", "url", "link", "href")
+_DURATION_KEYS = ("duration", "durationminutes", "durationmin", "totalduration", "duracao")
+_STOPS_KEYS = ("stops", "stopcount", "numstops", "scales", "escalas", "paradas")
+_SEGMENT_KEYS = ("segments", "legs", "flights", "trechos", "segmentos")
+_ARR_AIRPORT_KEYS = ("arrivalairport", "arrivalairportcode", "destinationairport", "destinationcode", "destinationiata", "to")
+
+_TIME_RE = re.compile(r"(?:T|\s|^)(\d{2}):(\d{2})")
+_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_ISO_DURATION_RE = re.compile(r"^P(?:T)?(?:(\d+)H)?(?:(\d+)M)?$", re.IGNORECASE)
+
+_SKIP_URL_SUFFIXES = (".js", ".css", ".png", ".jpg", ".svg", ".woff", ".woff2", ".ico")
+
+
+def is_results_url(url: str) -> bool:
+    """Respostas do próprio viajala que podem conter resultados (não assets/analytics)."""
+    parsed = urlparse(url or "")
+    host = (parsed.hostname or "").lower()
+    path = (parsed.path or "").lower()
+    if "viajala" not in host or path.endswith(_SKIP_URL_SUFFIXES):
+        return False
+    return any(tok in path for tok in ("/api", "search", "pesquisa", "result", "flights", "voos"))
+
+
+def _norm(key: str) -> str:
+    return key.replace("_", "").replace("-", "").lower()
+
+
+def _pick(node: Dict[str, Any], keys: Iterable[str]) -> Any:
+    normalized = {_norm(k): v for k, v in node.items() if isinstance(k, str)}
+    for key in keys:
+        if key in normalized and normalized[key] not in (None, ""):
+            return normalized[key]
+    return None
+
+
+def _price_int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value)) if value > 0 else None
+    if isinstance(value, str):
+        return VU.parse_price_int(value)
+    if isinstance(value, dict):
+        currency = _pick(value, ("currency", "currencycode", "moeda"))
+        if currency and str(currency).upper() not in ("BRL", "R$"):
+            return None
+        return _price_int(_pick(value, ("amount", "value", "total", "price", "valor")))
+    return None
+
+
+def _hhmm(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = _pick(value, ("time", "datetime", "date", "hora", "local", "at"))
+    if not isinstance(value, str):
+        return None
+    m = _TIME_RE.search(value.strip())
+    if not m:
+        return None
+    t = f"{m.group(1)}:{m.group(2)}"
+    return t if VU.is_time_hhmm(t) else None
+
+
+def _date_of(value: Any) -> Optional[datetime.date]:
+    if isinstance(value, dict):
+        value = _pick(value, ("datetime", "date", "time", "local", "at"))
+    if not isinstance(value, str):
+        return None
+    m = _DATE_RE.search(value)
+    if not m:
+        return None
+    try:
+        return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+def _airport(node: Dict[str, Any], point: Any) -> Optional[str]:
+    value = _pick(point, ("airport", "airportcode", "iata", "code")) if isinstance(point, dict) else None
+    if value is None:
+        value = _pick(node, _ARR_AIRPORT_KEYS)
+    if isinstance(value, dict):
+        value = _pick(value, ("iata", "code"))
+    if isinstance(value, str) and re.fullmatch(r"[A-Za-z]{3}", value.strip()):
+        return value.strip().upper()
+    return None
+
+
+def _airline(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = _pick(value, ("name", "nome", "code", "iata"))
+    if isinstance(value, list) and value:
+        return _airline(value[0])
+    return VU.normalize_airline(value) if isinstance(value, str) else None
+
+
+def _duration_min(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    if isinstance(value, str):
+        m = _ISO_DURATION_RE.match(value.strip())
+        if m and (m.group(1) or m.group(2)):
+            return int(m.group(1) or 0) * 60 + int(m.group(2) or 0)
+        return VU.parse_duration_min(value)
+    return None
+
+
+def _stops(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def _to_offer(node: Dict[str, Any], origin: str, dest: str, depart_date: str) -> Optional[Dict[str, Any]]:
+    price = _price_int(_pick(node, _PRICE_KEYS))
+    if price is None:
+        return None
+    dep_raw = _pick(node, _DEP_KEYS)
+    arr_raw = _pick(node, _ARR_KEYS)
+    airline = _airline(_pick(node, _AIRLINE_KEYS))
+    stops = _stops(_pick(node, _STOPS_KEYS))
+
+    arr_airport = _airport(node, arr_raw)
+    segments = _pick(node, _SEGMENT_KEYS)
+    if isinstance(segments, list) and segments and all(isinstance(s, dict) for s in segments):
+        if arr_airport is None:
+            arr_airport = _airport(segments[-1], _pick(segments[-1], _ARR_KEYS))
+        if dep_raw is None:
+            dep_raw = _pick(segments[0], _DEP_KEYS)
+        if arr_raw is None:
+            arr_raw = _pick(segments[-1], _ARR_KEYS)
+        if airline is None:
+            airline = _airline(_pick(segments[0], _AIRLINE_KEYS))
+        if stops is None:
+            stops = len(segments) - 1
+
+    dep_time, arr_time = _hhmm(dep_raw), _hhmm(arr_raw)
+    if not dep_time or not arr_time:
+        return None
+
+    duration = _duration_min(_pick(node, _DURATION_KEYS))
+    if duration is not None and duration > 900:
+        duration = None
+    link = _pick(node, _LINK_KEYS)
+    link = link if isinstance(link, str) and link.startswith(("http", "/")) else None
+    if link and link.startswith("/"):
+        link = "https://viajala.com.br" + link
+
+    dep_date, arr_date = _date_of(dep_raw), _date_of(arr_raw)
+    if dep_date and arr_date:
+        next_day = arr_date > dep_date
+    else:
+        next_day = arr_time < dep_time
+
+    offer = {
+        "provider": "viajala",
+        "origin": origin,
+        "destination": dest,
+        "depart_date": depart_date,
+        "price": price,
+        "dep_time": dep_time,
+        "arr_time": arr_time,
+        "duration_min": duration,
+        "airline": airline,
+        "stops": stops,
+        "link": link,
+        "raw_text": "",
+        "extra_offers_count": None,
+        "extract_debug": {"source": "network"},
+        "arr_airport": arr_airport,
+    }
+    if next_day:
+        offer["next_day"] = True
+    return offer
+
+
+def _walk(data: Any, origin: str, dest: str, depart_date: str, out: List[Dict[str, Any]]) -> None:
+    if isinstance(data, list):
+        for item in data:
+            _walk(item, origin, dest, depart_date, out)
+    elif isinstance(data, dict):
+        offer = _to_offer(data, origin, dest, depart_date)
+        if offer is not None:
+            out.append(offer)
+            return  # não desce nos segmentos do itinerário já aproveitado
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                _walk(value, origin, dest, depart_date, out)
+
+
+def parse_results(data: Any, origin: str, dest: str, depart_date: str) -> List[Dict[str, Any]]:
+    """Ofertas (formato do scraper) encontradas no JSON, sem duplicatas, por preço."""
+    found: List[Dict[str, Any]] = []
+    _walk(data, origin, dest, depart_date, found)
+    seen = set()
+    offers = []
+    for o in found:
+        key = o["link"] or (o["dep_time"], o["arr_time"], o["airline"], o["price"])
+        if key in seen:
+            continue
+        seen.add(key)
+        offers.append(o)
+    offers.sort(key=lambda o: (o["price"], o.get("duration_min") or 10**9))
+    return offers
+
+
+def looks_like_results(data: Any) -> bool:
+    return bool(parse_results(data, "", "", ""))
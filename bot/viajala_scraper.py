@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 import re
 import time
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,9 +14,27 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
-from bot.viajala_urls import build_viajala_url_ow_with_fallback
+from bot.viajala_urls import (
+    AIRPORT_TO_CITY,
+    CITY_TO_AIRPORTS,
+    build_viajala_url_ow,
+    build_viajala_url_ow_with_fallback,
+    viajala_url_dest_code,
+)
 from bot import selectors_viajala as SEL
 from bot import utils_viajala as VU
+from bot.rate_limit import polite_get
+from bot import viajala_api as VA
+from bot import debug_capture
+from bot.adapt_state import AdaptState
+from bot import url_model
+from bot import parsing
+from bot.config import (
+    VIAJALA_NETWORK_MODE,
+    VIAJALA_NETWORK_TIMEOUT_SECONDS,
+    VIAJALA_NETWORK_SETTLE_SECONDS,
+    ADAPT_CARD_WAIT_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +43,14 @@ _INTERSTITIAL_SEEN = 0
 _INTERSTITIAL_DISMISSED = 0
 _INTERSTITIAL_WAITED = 0
 _DEBUG_CARD_EXTRACTION = os.getenv("VIAJALA_DEBUG_CARD", "0").strip() == "1"
+_BLOCK_SIGNALS = (
+    "challenge-platform",
+    "cf-challenge",
+    "captcha-delivery",
+    "verify you are human",
+    "attention required",
+    "access denied",
+)
 
 
 
@@ -35,34 +61,33 @@ def _ensure_debug_dir() -> str:
     return debug_dir
 
 
-def _adapt_path(debug_dir: str) -> str:
-    return os.path.join(debug_dir, "viajala_adapt.json")
+# Estado adaptativo (preferred_dest, seletores, last_run...) no SQLite, com cache
+# em memória; o viajala_adapt.json antigo só é lido para migrar
+ADAPT = AdaptState(
+    "viajala",
+    legacy_json=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "debug", "viajala_adapt.json")),
+)
 
+CARD_SELECTORS = (SEL.CSS_CARD_RESULT_OW, SEL.CSS_CARD_RESULT_ITEM, SEL.CSS_CARD_SEGMENTS)
 
-def _load_adapt_state(debug_dir: str) -> dict:
-    path = _adapt_path(debug_dir)
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
 
+def set_adapt_write_behind(enabled: bool) -> None:
+    """Com write-behind, o estado adaptativo só é gravado em flush_adapt_state."""
+    if not enabled:
+        ADAPT.flush()
+    ADAPT.buffered = enabled
 
-def _save_adapt_state(debug_dir: str, data: dict) -> None:
-    path = _adapt_path(debug_dir)
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+
+def flush_adapt_state() -> None:
+    ADAPT.flush()
 
 
 def _detect_page_state(driver) -> str:
     text = (driver.page_source or "").lower()
     if driver.find_elements(By.CSS_SELECTOR, SEL.CSS_CARD_RESULT_OW):
         return "RESULTS_OK"
+    if any(sig in text for sig in _BLOCK_SIGNALS):
+        return "BLOCKED"
     if "aceitar" in text and "cookies" in text:
         return "CONSENT"
     if "sites de viagem buscados" in text and "result" not in text:
@@ -74,6 +99,17 @@ def _detect_page_state(driver) -> str:
     return "LANDING"
 
 
+@dataclass
+class PageRun:
+    """
+    Estado de uma chamada de iter_offers: page_state de cada URL tentada e
+    cards não lidos por parada antecipada. Um por chamada (workers em
+    threads não compartilham nada).
+    """
+    page_states: List[str] = field(default_factory=list)
+    cards_skipped: int = 0
+
+
 def _dismiss_overlays(driver, timeout: int = 6) -> None:
     wait = WebDriverWait(driver, timeout)
     try:
@@ -99,7 +135,7 @@ def _dismiss_overlays(driver, timeout: int = 6) -> None:
             pass
 
     try:
-    modal_css = SEL.CSS_MODAL_MAT
+        driver.execute_script(
             """
             document.documentElement.classList.remove('cdk-global-scrollblock');
             document.body.classList.remove('cdk-global-scrollblock');
@@ -334,10 +370,7 @@ def _dismiss_partner_modal(driver, timeout: int = 10) -> bool:
         return False
 
     logger.info("[VIAJALA] partner_modal=seen")
-    try:
-        driver.save_screenshot(os.path.join(_ensure_debug_dir(), "viajala_modal.png"))
-    except Exception:
-        pass
+    debug_capture.capture("viajala_modal", driver)
 
     while time.time() - start < timeout:
         try:
@@ -411,15 +444,11 @@ def _partner_modal_visible(driver) -> bool:
         return False
 
 
-def _parse_extra_offers_count(text: str) -> int | None:
-    match = re.search(r"(\d+)\s+ofertas\s+mais", text.lower())
-    if match:
-        return int(match.group(1))
-    return None
+_parse_extra_offers_count = parsing.extra_offers_count
 
 
 def _find_price_text(card) -> str | None:
-    patterns = [r"R\$\s*[\d\.]+,\d{2}", r"R\$\s*[\d\.,]+"]
+    patterns = [r"R\$\s*[\d\.]+,\d{2}", parsing.PRICE_BRL_RE]
     candidates = []
 
     attr_selectors = SEL.CSS_PRICE_ATTR_SELECTORS
@@ -486,7 +515,7 @@ def extract_main_offer(card) -> dict:
         try:
             price_els = card.find_elements(By.CSS_SELECTOR, SEL.CSS_PRICE_VALUE)
             price_texts = [(e.text or "").strip() for e in price_els]
-            ok = any(t and "ver preço" not in t.lower() and re.search(r"\d", t) for t in price_texts)
+            ok = any(t and "ver preço" not in t.lower() and parsing.HAS_DIGIT_RE.search(t) for t in price_texts)
             if ok:
                 debug["wait_price_ok"] = True
                 break
@@ -578,58 +607,22 @@ def _find_airline(card) -> str | None:
         return None
 
 
-def _evaluate_price_candidate(text: str) -> tuple[int | None, str | None]:
-    if not text:
-        return None, "empty"
-    raw = text.strip()
-    t = " ".join(raw.lower().split())
-
-    if "ver preço" in t or "ver preco" in t:
-        return None, "placeholder"
-    if not ("r$" in t or "brl" in t):
-        return None, "currency_missing"
-    if any(m in t for m in ["a partir de", "desde", "promo", "oferta", "desconto"]):
-        return None, "promo_text"
-    if any(m in t for m in [" x ", "x ", "vez", "parcel", "sem juros"]):
-        return None, "installment"
-
-    value = VU.parse_price_int(raw)
-    if value is None:
-        return None, "parse_failed"
-    if value <= 0 or value > 200000:
-        return None, "out_of_range"
-    return value, None
+_evaluate_price_candidate = parsing.evaluate_price_candidate
 
 
 def _debug_card_failure(card, debug_dir: str, failure_reason: str, candidates_debug: list[dict]) -> None:
     if not _DEBUG_CARD_EXTRACTION:
         return
-    ts = int(time.time() * 1000)
     try:
         card_id = card.get_attribute("id") or "card"
     except Exception:
         card_id = "card"
-    safe_id = re.sub(r"[^a-zA-Z0-9_-]+", "_", card_id)
-    html_path = os.path.join(debug_dir, f"viajala_card_{safe_id}_{ts}.html")
-    meta_path = os.path.join(debug_dir, f"viajala_card_{safe_id}_{ts}.json")
-    try:
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(card.get_attribute("outerHTML") or "")
-    except Exception:
-        pass
-    try:
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "failure_reason": failure_reason,
-                    "candidates": candidates_debug,
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
-    except Exception:
-        pass
+    debug_capture.capture(
+        "viajala_card",
+        tag=card_id,
+        html=lambda: card.get_attribute("outerHTML") or "",
+        meta={"failure_reason": failure_reason, "candidates": candidates_debug},
+    )
 
 
 def _parse_stops(card) -> int | None:
@@ -640,7 +633,7 @@ def _parse_stops(card) -> int | None:
         return None
 
 
-def _card_has_valid_route(card, origin: str, destination: str) -> bool:
+def _card_airports(card) -> list[str] | None:
     airports = []
     try:
         for el in card.find_elements(By.CSS_SELECTOR, SEL.CSS_AIRPORT):
@@ -648,15 +641,25 @@ def _card_has_valid_route(card, origin: str, destination: str) -> bool:
             if text:
                 airports.append(text)
     except Exception:
-        return False
+        return None
+    return airports
 
-    valid_dests = {destination}
-    if destination in {"GRU", "CGH", "VCP"}:
-        valid_dests.add("SAO")
 
-    has_origin = origin in airports
-    has_dest = any(d in airports for d in valid_dests)
-    return has_origin and has_dest
+def _dest_airport(airports: list[str] | None, origin: str, destination: str) -> str | None:
+    """Código de destino do card que atende a busca (aeroporto, cidade ou aeroporto da cidade)."""
+    if not airports or origin not in airports:
+        return None
+    valid_dests = {destination, *CITY_TO_AIRPORTS.get(destination, ())}
+    if destination in AIRPORT_TO_CITY:
+        valid_dests.add(AIRPORT_TO_CITY[destination])
+    for code in airports:
+        if code != origin and code in valid_dests:
+            return code
+    return None
+
+
+def _card_has_valid_route(card, origin: str, destination: str) -> bool:
+    return _dest_airport(_card_airports(card), origin, destination) is not None
 
 
 def _is_next_day(dep_time: str | None, arr_time: str | None, card) -> bool:
@@ -674,39 +677,116 @@ def _is_next_day(dep_time: str | None, arr_time: str | None, card) -> bool:
 
 
 def _save_debug_zero(debug_dir: str, driver, cards: list) -> None:
-    html_path = os.path.join(debug_dir, "viajala_last.html")
-    png_path = os.path.join(debug_dir, "viajala_last.png")
-    url_path = os.path.join(debug_dir, "viajala_last_url.txt")
-    cards_path = os.path.join(debug_dir, "viajala_last_cards.txt")
-    try:
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(driver.page_source)
-    except Exception:
-        pass
-    try:
-        driver.save_screenshot(png_path)
-    except Exception:
-        pass
-    try:
-        with open(url_path, "w", encoding="utf-8") as f:
-            f.write(driver.current_url)
-    except Exception:
-        pass
-    try:
-        with open(cards_path, "w", encoding="utf-8") as f:
-            f.write(f"cards_found={len(cards)}\n")
-            for card in cards[:5]:
-                text = (card.text or "").replace("\n", " ")
-                f.write(text[:200] + "\n")
-    except Exception:
-        pass
-    logger.info(
-        "[VIAJALA][DEBUG] saved html=%s png=%s url=%s cards=%s",
-        html_path,
-        png_path,
-        url_path,
-        cards_path,
+    """Attempt sem ofertas: bundle amostrado (HTML, PNG, URL, 5 primeiros cards) via bot.debug_capture."""
+
+    def _cards_text() -> dict:
+        lines = [f"cards_found={len(cards)}"]
+        for card in cards[:5]:
+            lines.append((card.text or "").replace("\n", " ")[:200])
+        return {"cards.txt": "\n".join(lines) + "\n"}
+
+    if debug_capture.capture("viajala_zero", driver, texts=_cards_text):
+        logger.info("[VIAJALA][DEBUG] captura zero-result enfileirada em %s", debug_capture.get_capture().directory)
+
+
+def _collect_network_offers(
+    capture,
+    origin: str,
+    destination: str,
+    depart_date: str,
+    max_cards: int,
+    timeout: float = VIAJALA_NETWORK_TIMEOUT_SECONDS,
+    settle: float = VIAJALA_NETWORK_SETTLE_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    Ofertas direto das respostas JSON de resultados: retorna assim que a
+    primeira resposta chega (+ janela curta para lotes seguintes), sem
+    depender de _wait_results_stable.
+    """
+    first = capture.wait_for(
+        lambda ex: VA.is_results_url(ex.url) and VA.looks_like_results(ex.body),
+        timeout=timeout,
     )
+    if first is None:
+        return []
+    if settle > 0:
+        time.sleep(settle)
+        capture.poll()
+
+    offers: List[Dict[str, Any]] = []
+    seen = set()
+    for ex in capture.completed:
+        if not VA.is_results_url(ex.url):
+            continue
+        for offer in VA.parse_results(ex.body, origin, destination, depart_date):
+            key = offer["link"] or (offer["dep_time"], offer["arr_time"], offer["airline"], offer["price"])
+            if key in seen:
+                continue
+            seen.add(key)
+            offer["confidence"] = _compute_confidence(
+                True,
+                True,
+                offer.get("duration_min") is not None,
+                bool(offer.get("airline")),
+                bool(offer.get("link")),
+            )
+            if offer["confidence"] < 60:
+                continue
+            offers.append(offer)
+    offers.sort(key=lambda o: (o["price"], o.get("duration_min") or 10**9))
+    return offers[:max_cards]
+
+
+def _offer_sort_key(o: Dict[str, Any]):
+    return (
+        o.get("price") is None,
+        o.get("price") or 10**9,
+        o.get("duration_min") or 10**9,
+    )
+
+
+def _observe_url(destination: str, url: str, ok: bool, ttfp: float | None) -> None:
+    """Alimenta o modelo de URLs (bot.url_model): sucesso e tempo até o 1º preço."""
+    code = viajala_url_dest_code(url)
+    if not code:
+        return
+    model = ADAPT.get("url_model") or {}
+    url_model.observe(model, destination, code, ok, ttfp)
+    ADAPT.set("url_model", model)
+
+
+def _find_cards(driver, selector: str) -> list:
+    cards = driver.find_elements(By.CSS_SELECTOR, selector)
+    if selector == SEL.CSS_CARD_SEGMENTS:
+        # Segmentos soltos: só os que têm preço e botão de compra
+        cards = [
+            c for c in cards
+            if c.find_elements(By.CSS_SELECTOR, SEL.CSS_PRICE_VALUE) and c.find_elements(By.CSS_SELECTOR, SEL.CSS_LINK_BOOK)
+        ]
+    return cards
+
+
+def _wait_card_selector(driver, ranked: List[str], recorded: set | None = None) -> str:
+    """
+    Espera (ADAPT_CARD_WAIT_SECONDS) só pelo seletor mais provável que já
+    casou alguma vez; no timeout, fica com o próximo da lista (o miss vai
+    para recorded, para não contar de novo na mesma tentativa).
+    """
+    for i, selector in enumerate(ranked):
+        if ADAPT.selector_dead(selector):
+            continue
+        try:
+            WebDriverWait(driver, ADAPT_CARD_WAIT_SECONDS).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            )
+            return selector
+        except TimeoutException:
+            ADAPT.record_selector(selector, False)
+            if recorded is not None:
+                recorded.add(selector)
+            rest = [s for s in ranked if s != selector]
+            return rest[0] if rest else selector
+    return ranked[0]
 
 
 def scrape_with_selenium(
@@ -715,22 +795,80 @@ def scrape_with_selenium(
     destination: str,
     depart_date: str,
     max_cards: int = 30,
+    network_mode: bool | None = None,
+    stop: Callable[[Dict[str, Any]], bool] | None = None,
+    run: PageRun | None = None,
 ) -> List[Dict[str, Any]]:
-    debug_dir = _ensure_debug_dir()
-    adapt = _load_adapt_state(debug_dir)
-    prefer_dest = (adapt.get("viajala_preferred_dest") or {})
+    """
+    Com network_mode (padrão: VIAJALA_NETWORK_MODE) as ofertas vêm do JSON
+    de resultados capturado via CDP; sem resposta útil, cai no fluxo DOM.
+    Ofertas ordenadas por preço (ver iter_offers para consumir card a card).
+    """
+    offers = list(iter_offers(driver, origin, destination, depart_date, max_cards, network_mode, stop, run))
+    offers.sort(key=_offer_sort_key)
+    return offers
 
-    urls = build_viajala_url_ow_with_fallback(origin, destination, depart_date)
-    if destination in prefer_dest:
-        preferred = prefer_dest[destination]
-        urls = [u for u in urls if f"-{preferred}/" in u] + [u for u in urls if f"-{preferred}/" not in u]
+
+def iter_offers(
+    driver,
+    origin: str,
+    destination: str,
+    depart_date: str,
+    max_cards: int = 30,
+    network_mode: bool | None = None,
+    stop: Callable[[Dict[str, Any]], bool] | None = None,
+    run: PageRun | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Gera as ofertas na ordem da página, à medida que cada card é extraído.
+    stop(offer) -> True encerra a extração depois de entregar essa oferta
+    (ver bot.early_exit); as URLs de fallback só são tentadas se nenhuma
+    oferta saiu da anterior. page_states/cards_skipped vão para run.
+    """
+    run = run if run is not None else PageRun()
+    if network_mode is None:
+        network_mode = VIAJALA_NETWORK_MODE
+    debug_dir = _ensure_debug_dir()
+    urls, skipped = url_model.order(
+        ADAPT.get("url_model") or {}, destination,
+        build_viajala_url_ow_with_fallback(origin, destination, depart_date), viajala_url_dest_code,
+    )
+    if skipped:
+        logger.info("[VIAJALA] url_model skip=%s", [viajala_url_dest_code(u) for u in skipped])
 
     last_selector = None
     for url in urls:
         start_ts = time.time()
         first_price_ts = None
         logger.info("[VIAJALA] url=%s", url)
-        driver.get(url)
+        capture = None
+        if network_mode:
+            from bot.network_capture import shared_capture
+
+            capture = shared_capture(driver)
+            capture.watch(VA.is_results_url)
+            capture.reset()
+        polite_get(driver, url)
+        if capture is not None:
+            offers = _collect_network_offers(capture, origin, destination, depart_date, max_cards)
+            logger.info("[VIAJALA] network offers=%s", len(offers))
+            if offers:
+                run.page_states.append("NETWORK_OK")
+                _observe_url(destination, url, True, time.time() - start_ts)
+                ADAPT.set("last_run", {
+                    "timestamp": int(time.time()),
+                    "url": url,
+                    "page_state": "NETWORK_OK",
+                    "offers_valid": len(offers),
+                    "time_to_first_price": time.time() - start_ts,
+                    "reason": None,
+                })
+                ADAPT.save()
+                for offer in offers:
+                    yield offer
+                    if stop is not None and stop(offer):
+                        break
+                return
         global _COOKIES_ACCEPTED
         if not _COOKIES_ACCEPTED:
             _try_accept_cookies(driver)
@@ -748,20 +886,18 @@ def scrape_with_selenium(
 
         page_state = _detect_page_state(driver)
         logger.info("[VIAJALA] page_state=%s", page_state)
+        run.page_states.append(page_state)
+        if page_state == "BLOCKED":
+            # Challenge/captcha: as URLs de fallback caem no mesmo bloqueio
+            _save_debug_zero(debug_dir, driver, [])
+            break
 
         if page_state in ("LANDING", "EMPTY"):
-            adapt.setdefault("viajala_stats", {})
-            adapt["viajala_stats"]["airport_url_failed"] = adapt["viajala_stats"].get("airport_url_failed", 0) + 1
-            prefer_dest.setdefault(destination, "SAO" if destination in {"GRU", "CGH", "VCP"} else "RIO" if destination in {"GIG", "SDU"} else destination)
-            adapt["viajala_preferred_dest"] = prefer_dest
+            ADAPT.incr("airport_url_failed")
 
-        try:
-            WebDriverWait(driver, 25).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, SEL.CSS_CARD_RESULT_OW))
-            )
-            selector = SEL.CSS_CARD_RESULT_OW
-        except TimeoutException:
-            selector = SEL.CSS_CARD_RESULT_ITEM
+        ranked = ADAPT.rank_selectors(CARD_SELECTORS)
+        recorded: set = set()  # seletores já contados (hit/miss) nesta tentativa
+        selector = _wait_card_selector(driver, ranked, recorded)
 
         if _dismiss_partner_modal(driver):
             time.sleep(2)
@@ -772,16 +908,20 @@ def scrape_with_selenium(
 
         stable_ok = _wait_results_stable(driver, selector)
         if not stable_ok:
-            adapt.setdefault("last_run", {})
-            adapt["last_run"]["stable_wait"] = False
-            _save_adapt_state(debug_dir, adapt)
-        cards = driver.find_elements(By.CSS_SELECTOR, selector)
-        if not cards:
-            selector = SEL.CSS_CARD_SEGMENTS
-            cards = [
-                c for c in driver.find_elements(By.CSS_SELECTOR, selector)
-                if c.find_elements(By.CSS_SELECTOR, SEL.CSS_PRICE_VALUE) and c.find_elements(By.CSS_SELECTOR, SEL.CSS_LINK_BOOK)
-            ]
+            ADAPT.update("last_run", stable_wait=False)
+        cards = _find_cards(driver, selector)
+        if selector not in recorded:
+            ADAPT.record_selector(selector, bool(cards))
+            recorded.add(selector)
+        for alt in ranked:
+            if cards:
+                break
+            if alt not in recorded:
+                cards = _find_cards(driver, alt)
+                ADAPT.record_selector(alt, bool(cards))
+                recorded.add(alt)
+                if cards:
+                    selector = alt
 
         last_selector = selector
         logger.info("[VIAJALA] selector=%s cards_found=%s", selector, len(cards))
@@ -799,11 +939,15 @@ def scrape_with_selenium(
             _dismiss_interstitials(driver)
             if _dismiss_partner_modal(driver):
                 time.sleep(5)
-                cards = driver.find_elements(By.CSS_SELECTOR, selector)
+                cards = _find_cards(driver, selector)
 
         offers: List[Dict[str, Any]] = []
         seen_links = set()
-        for card in cards[:max_cards]:
+        cards_read = 0
+        stopped_early = False
+        batch = cards[:max_cards]
+        for card in batch:
+            cards_read += 1
             try:
                 if card.find_elements(By.XPATH, SEL.XPATH_CARD_IN_MODAL):
                     continue
@@ -813,7 +957,8 @@ def scrape_with_selenium(
             low = text.lower()
             if "patrocinado" in low or "skyscanner" in low:
                 continue
-            if not _card_has_valid_route(card, origin, destination):
+            arr_airport = _dest_airport(_card_airports(card), origin, destination)
+            if arr_airport is None:
                 continue
 
             extracted = extract_main_offer(card)
@@ -878,36 +1023,35 @@ def scrape_with_selenium(
                 "confidence": confidence,
                 "extra_offers_count": _parse_extra_offers_count(text),
                 "extract_debug": extract_debug,
+                "arr_airport": arr_airport,
             }
             if next_day:
                 offer["next_day"] = True
             offers.append(offer)
+            yield offer
+            if stop is not None and stop(offer):
+                stopped_early = True
+                run.cards_skipped = len(batch) - cards_read
+                break
 
-        offers.sort(
-            key=lambda o: (
-                o.get("price") is None,
-                o.get("price") or 10**9,
-                o.get("duration_min") or 10**9,
-            )
-        )
-
-        adapt["last_working_selector"] = selector if offers else adapt.get("last_working_selector")
-        adapt.setdefault("selector_success", {})
-        adapt["selector_success"][selector] = adapt["selector_success"].get(selector, 0) + (1 if offers else 0)
+        _observe_url(destination, url, bool(offers), (first_price_ts - start_ts) if first_price_ts else None)
+        if offers:
+            ADAPT.set("last_working_selector", selector)
+            ADAPT.incr(f"offers_ok:{selector}")
 
-        adapt["interstitial_seen_count"] = _INTERSTITIAL_SEEN
-        adapt["interstitial_dismissed_count"] = _INTERSTITIAL_DISMISSED
-        adapt["interstitial_waited_count"] = _INTERSTITIAL_WAITED
+        ADAPT.set("interstitial_seen_count", _INTERSTITIAL_SEEN)
+        ADAPT.set("interstitial_dismissed_count", _INTERSTITIAL_DISMISSED)
+        ADAPT.set("interstitial_waited_count", _INTERSTITIAL_WAITED)
 
-        adapt["run_metrics"] = {
+        ADAPT.set("run_metrics", {
             "had_gol_banner": _INTERSTITIAL_SEEN > 0,
             "time_to_first_price": (first_price_ts - start_ts) if first_price_ts else None,
             "total_cards": len(cards),
             "prices_found": sum(1 for o in offers if o.get("price") is not None),
             "min_price": min([o.get("price") for o in offers if o.get("price") is not None], default=None),
-        }
+        })
 
-        adapt["last_run"] = {
+        ADAPT.set("last_run", {
             "timestamp": int(time.time()),
             "url": url,
             "page_state": page_state,
@@ -915,21 +1059,59 @@ def scrape_with_selenium(
             "offers_valid": len(offers),
             "selector": selector,
             "reason": None if offers else "NO_OFFERS",
-        }
-        _save_adapt_state(debug_dir, adapt)
+            "cards_read": cards_read,
+            "cards_skipped": run.cards_skipped,
+            "stopped_early": stopped_early,
+        })
+        ADAPT.save()
 
-        logger.info("[VIAJALA] offers_valid=%s", len(offers))
+        logger.info("[VIAJALA] offers_valid=%s cards_read=%s stopped_early=%s", len(offers), cards_read, stopped_early)
         if offers:
-            return offers
+            return
 
         if _INTERSTITIAL_SEEN > 0:
-            try:
-                driver.save_screenshot(os.path.join(debug_dir, "viajala_interstitial.png"))
-            except Exception:
-                pass
+            debug_capture.capture("viajala_interstitial", driver)
         _save_debug_zero(debug_dir, driver, cards)
 
-    adapt["last_working_selector"] = last_selector or adapt.get("last_working_selector")
-    _save_adapt_state(debug_dir, adapt)
+    if last_selector:
+        ADAPT.set("last_working_selector", last_selector)
+    ADAPT.save()
     logger.info("[VIAJALA] all tries failed: %s", len(urls))
-    return []
+
+
+def scrape_calendar(driver, origin: str, destination: str, center_date: str, timeout: int = 20) -> Dict[str, int]:
+    """
+    Menor preço por dia da faixa de datas flexíveis (±3 dias) da página de
+    center_date. Não coleta cards: uma página cobre a semana inteira.
+    """
+    from bot.calendar_mode import parse_calendar_item
+    import datetime
+
+    url = build_viajala_url_ow(origin, destination, center_date)
+    logger.info("[VIAJALA] calendar url=%s", url)
+    polite_get(driver, url)
+    global _COOKIES_ACCEPTED
+    if not _COOKIES_ACCEPTED:
+        _try_accept_cookies(driver)
+        _COOKIES_ACCEPTED = True
+    _dismiss_interstitials(driver)
+    _dismiss_overlays(driver)
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SEL.CSS_DATE_STRIP_ITEM))
+        )
+    except TimeoutException:
+        logger.info("[VIAJALA] calendar strip not found page_state=%s", _detect_page_state(driver))
+        return {}
+
+    ref = datetime.date.fromisoformat(center_date)
+    prices: Dict[str, int] = {}
+    for item in driver.find_elements(By.CSS_SELECTOR, SEL.CSS_DATE_STRIP_ITEM):
+        try:
+            parsed = parse_calendar_item(item.text or "", ref)
+        except Exception:
+            parsed = None
+        if parsed and (parsed[0] not in prices or parsed[1] < prices[parsed[0]]):
+            prices[parsed[0]] = parsed[1]
+    logger.info("[VIAJALA] calendar days=%s", len(prices))
+    return prices
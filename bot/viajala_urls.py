@@ -10,6 +10,8 @@ Examples:
 
 from __future__ import annotations
 
+import re
+
 
 AIRPORT_TO_CITY = {
     "GRU": "SAO",
@@ -19,6 +21,13 @@ AIRPORT_TO_CITY = {
     "SDU": "RIO",
 }
 
+CITY_TO_AIRPORTS: dict[str, tuple[str, ...]] = {}
+for _airport, _city in AIRPORT_TO_CITY.items():
+    CITY_TO_AIRPORTS.setdefault(_city, ())
+    CITY_TO_AIRPORTS[_city] += (_airport,)
+
+_URL_ROUTE_RE = re.compile(r"/pesquisa-voos/[A-Z]{3}-([A-Z]{3})/")
+
 
 def normalize_city_or_airport(code: str) -> str:
     """Normalize a city or airport code for Viajala URLs.
@@ -69,3 +78,9 @@ def build_viajala_url_ow_with_fallback(origin: str, destination: str, depart_dat
         if fb_url not in urls:
             urls.append(fb_url)
     return urls
+
+
+def viajala_url_dest_code(url: str) -> str | None:
+    """Código de destino usado na URL de busca ('.../REC-SAO/...' -> 'SAO')."""
+    m = _URL_ROUTE_RE.search(url or "")
+    return m.group(1) if m else None
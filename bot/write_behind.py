@@ -0,0 +1,162 @@
+"""
+Write-behind do state_store para o ciclo do runner.
+
+mark_good/mark_bad/mark_no_data, record_sample e mark_seen ficam em memória
+e vão para o SQLite numa transação só (state_store.write_batch) a cada N
+attempts ou T segundos, e no fim do ciclo. As leituras usadas dentro do
+ciclo (should_check, was_seen_recently, get_stats) enxergam o que ainda não
+foi gravado. O resto do state_store passa direto (__getattr__).
+Com o write-behind desligado, DirectStore mantém a mesma interface.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("kiwi_bot")
+
+StateKey = Tuple[str, str, str, str, Optional[str]]
+
+
+class WriteBehindStore:
+    def __init__(self, store, *, flush_attempts: int = 10, flush_seconds: float = 30.0):
+        self._store = store
+        self.flush_attempts = flush_attempts
+        self.flush_seconds = flush_seconds
+        self._lock = threading.RLock()
+        self._states: Dict[StateKey, tuple] = {}
+        self._samples: List[tuple] = []
+        self._seen: Dict[str, int] = {}
+        self._hooks: List[Callable[[], None]] = []
+        self._attempts = 0
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def add_flush_hook(self, fn: Callable[[], None]) -> None:
+        """Outros buffers (ex.: adapt_state do viajala) gravados junto com o flush."""
+        self._hooks.append(fn)
+
+    # ====== ESCRITAS BUFFERIZADAS ======
+
+    def _put_state(self, origin, dest, trip_type, depart_date, return_date, status, price, cooldown: datetime.datetime) -> None:
+        now = datetime.datetime.now()
+        row = (
+            origin, dest, trip_type, depart_date, return_date, status, price,
+            now.isoformat(timespec="seconds"), cooldown.isoformat(timespec="seconds"),
+        )
+        with self._lock:
+            self._states[(origin, dest, trip_type, depart_date, return_date)] = row
+        self._maybe_flush()
+
+    def mark_good(self, origin, dest, trip_type, depart_date, return_date, price, cooldown_days: int = 5) -> None:
+        cooldown = datetime.datetime.now() + datetime.timedelta(days=cooldown_days)
+        self._put_state(origin, dest, trip_type, depart_date, return_date, "GOOD", price, cooldown)
+
+    def mark_bad(self, origin, dest, trip_type, depart_date, return_date, price, cooldown_hours: int = 36) -> None:
+        cooldown = datetime.datetime.now() + datetime.timedelta(hours=cooldown_hours)
+        self._put_state(origin, dest, trip_type, depart_date, return_date, "BAD", price, cooldown)
+
+    def mark_no_data(self, origin, dest, trip_type, depart_date, return_date, cooldown_hours: int = 72) -> None:
+        cooldown = datetime.datetime.now() + datetime.timedelta(hours=cooldown_hours)
+        self._put_state(origin, dest, trip_type, depart_date, return_date, "NO_DATA", None, cooldown)
+
+    def record_sample(self, route_key: str, trip_type: str, price: int, ts: str = None) -> None:
+        ts = ts or datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._samples.append((route_key, trip_type, price, ts))
+        self._maybe_flush()
+
+    def mark_seen(self, key: str) -> None:
+        with self._lock:
+            self._seen[key] = int(datetime.datetime.now().timestamp())
+        self._maybe_flush()
+
+    # ====== LEITURAS (read-your-writes) ======
+
+    def should_check(self, origin, dest, trip_type, depart_date, return_date) -> bool:
+        with self._lock:
+            row = self._states.get((origin, dest, trip_type, depart_date, return_date))
+        if row is None:
+            return self._store.should_check(origin, dest, trip_type, depart_date, return_date)
+        return datetime.datetime.now() >= datetime.datetime.fromisoformat(row[8])
+
+    def was_seen_recently(self, key: str, ttl_seconds: int = 86400) -> bool:
+        with self._lock:
+            ts = self._seen.get(key)
+        if ts is None:
+            return self._store.was_seen_recently(key, ttl_seconds=ttl_seconds)
+        return (int(datetime.datetime.now().timestamp()) - ts) < ttl_seconds
+
+    def get_stats(self, route_key: str, trip_type: str) -> dict:
+        try:
+            stats = self._store.get_stats(route_key, trip_type)
+        except sqlite3.OperationalError:
+            # price_samples só existe depois do primeiro record_sample gravado
+            stats = {"avg": None, "n": 0}
+        with self._lock:
+            pending = [p for rk, tt, p, _ in self._samples if rk == route_key and tt == trip_type]
+        if not pending:
+            return stats
+        n = (stats.get("n") or 0) + len(pending)
+        total = (stats.get("avg") or 0) * (stats.get("n") or 0) + sum(pending)
+        return {"avg": total / n, "n": n}
+
+    # ====== FLUSH ======
+
+    def attempt_done(self) -> None:
+        """Chamado pelo runner a cada attempt (no início do loop, antes dos `continue`)."""
+        with self._lock:
+            self._attempts += 1
+        self._maybe_flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._states) + len(self._samples) + len(self._seen)
+
+    def _maybe_flush(self) -> None:
+        if self._attempts >= self.flush_attempts or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            states, samples, seen = list(self._states.values()), self._samples, list(self._seen.items())
+            self._attempts = 0
+            self._last_flush = time.monotonic()
+            if states or samples or seen:
+                # Só limpa depois de gravar: se o SQLite falhar, tenta no próximo flush
+                self._store.write_batch(states=states, samples=samples, seen=seen)
+                self._states, self._samples, self._seen = {}, [], {}
+                self.flushes += 1
+                logger.debug(f"[WRITE-BEHIND] flush states={len(states)} samples={len(samples)} seen={len(seen)}")
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.warning(f"[WRITE-BEHIND] flush hook falhou: {e}")
+
+
+class DirectStore:
+    """WRITE_BEHIND_ENABLED desligado: mesma interface, tudo direto no state_store."""
+
+    def __init__(self, store):
+        self._store = store
+        self.flushes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def attempt_done(self) -> None:
+        pass
+
+    def pending(self) -> int:
+        return 0
+
+    def flush(self) -> None:
+        pass
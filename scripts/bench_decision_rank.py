@@ -0,0 +1,76 @@
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import argparse
+import random
+import time
+
+from bot import decision_engine as DE
+
+
+AIRLINES = ["GOL", "LATAM", "AZUL", "TAP", "AMERICAN AIRLINES"]
+PARTNERS = ["Decolar", "MaxMilhas", "Site oficial", "123milhas", None]
+
+
+def synthetic_offers(n: int, seed: int = 42) -> list:
+    """Lote sintético no formato do scraper, com ~30% de itinerários repetidos."""
+    rnd = random.Random(seed)
+    uniques = max(1, int(n * 0.7))
+    base = []
+    for _ in range(uniques):
+        h, m = rnd.randint(0, 23), rnd.choice([0, 15, 30, 45])
+        dur = rnd.randint(60, 1500)
+        base.append({
+            "airline": rnd.choice(AIRLINES),
+            "dep_time": f"{h:02d}:{m:02d}",
+            "arr_time": f"{(h + dur // 60) % 24:02d}:{m:02d}",
+            "duration_min": dur,
+            "stops": rnd.randint(0, 2),
+            "next_day": rnd.random() < 0.2,
+        })
+    offers = []
+    for i in range(n):
+        o = dict(base[i] if i < uniques else rnd.choice(base))
+        if rnd.random() < 0.05:
+            o["price"] = None
+        else:
+            o["price"] = f"R$ {rnd.randint(250, 4500):,}".replace(",", ".")
+        o["link"] = "https://www.viajala.com.br/x" if rnd.random() < 0.8 else None
+        o["partner"] = rnd.choice(PARTNERS)
+        o["extra_offers"] = rnd.randint(0, 12)
+        o["raw_text"] = "x" * rnd.randint(10, 200)
+        offers.append(o)
+    return offers
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark dedupe_and_rank vs dedupe_and_rank_batch")
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--avg-price", type=float, default=1500.0)
+    args = ap.parse_args()
+
+    print(f"numpy: {'sim' if DE.np is not None else 'não'}")
+    # Mesma ordem que dedupe_and_rank: ver test_decision_rank.py
+    print(f"{'n':>8} {'ref (s)':>10} {'batch (s)':>10} {'speedup':>8}")
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        offers = synthetic_offers(n)
+        t_ref = _timeit(lambda: DE.dedupe_and_rank(offers, avg_price=args.avg_price), args.repeat)
+        t_fast = _timeit(lambda: DE.dedupe_and_rank_batch(offers, avg_price=args.avg_price), args.repeat)
+        speed = t_ref / t_fast if t_fast else float("inf")
+        print(f"{n:>8} {t_ref:>10.4f} {t_fast:>10.4f} {speed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import argparse
+import random
+import re
+import time
+
+from bot import parsing as P
+
+CAPTURE = os.path.join(ROOT, "debug", "viajala_try2_candidates.txt")
+PRICE_CORPUS = os.path.join(ROOT, "debug", "price_corpus.txt")
+
+
+def captured_cards(path: str = CAPTURE) -> list:
+    """Textos de card reais capturados pelo scraper ('len=N :: <texto>')."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split(" :: ", 1)[1].strip() for line in f if " :: " in line]
+
+
+def price_corpus(path: str = PRICE_CORPUS) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split(" ::", 1)[1].strip(" \n") for line in f if " ::" in line and not line.startswith("#")]
+
+
+def per_card_reference(text: str) -> dict:
+    """Caminho antigo: regex por chamada, sem memo, cada campo parseado à parte."""
+    low = text.lower()
+    times = re.findall(r"\b(\d{2}:\d{2})\b", text)
+    price = re.search(r"R\$\s*[\d\.,]+", text)
+    extra = re.search(r"(\d+)\s+ofertas\s+mais", low)
+    dep = times[0] if times else None
+    arr = times[1] if len(times) > 1 else None
+    return {
+        "duration_min": P._parse_duration_min(low),
+        "dep_time": dep if P.is_time_hhmm.__wrapped__(dep) else None,
+        "arr_time": arr if P.is_time_hhmm.__wrapped__(arr) else None,
+        "next_day": bool(re.search(r"\d{2}:\d{2}\s*\+1\b", text)),
+        "price_int": P.parse_price_int.__wrapped__(price.group(0)) if price else None,
+        "extra_offers_count": int(extra.group(1)) if extra else None,
+    }
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark de parsing de cards: por card vs bot.parsing (lote + LRU)")
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    cards = captured_cards()
+    print(f"cards capturados: {len(cards)} ({CAPTURE})")
+    print(f"{'n':>8} {'ref (s)':>10} {'batch (s)':>10} {'speedup':>8}  saída")
+    rnd = random.Random(42)
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        texts = [rnd.choice(cards) for _ in range(n)]
+        same = [per_card_reference(t) for t in texts] == P.parse_card_texts(texts)
+        t_ref = _timeit(lambda: [per_card_reference(t) for t in texts], args.repeat)
+        t_fast = _timeit(lambda: P.parse_card_texts(texts), args.repeat)
+        speed = t_ref / t_fast if t_fast else float("inf")
+        print(f"{n:>8} {t_ref:>10.4f} {t_fast:>10.4f} {speed:>7.1f}x  {'OK' if same else 'DIVERGE'}")
+
+    # Campos soltos (como o scraper chama por card): texto repetido sai do LRU
+    fields = ["03h20", "03h25", "05h05", "R$ 530", "R$ 1.067", "R$ 1.222", "21:20", "00:40"] * 2000
+    t_ref = _timeit(lambda: [P._parse_duration_min(f) or P.parse_price_int.__wrapped__(f) for f in fields], args.repeat)
+    t_fast = _timeit(lambda: [P.parse_duration_min(f) or P.parse_price_int(f) for f in fields], args.repeat)
+    print(f"campos x{len(fields)}: sem memo {t_ref:.4f}s, LRU {t_fast:.4f}s ({t_ref / t_fast:.1f}x)")
+
+    # Preço: vazão do parser canônico e de uma oferta lida por 4 etapas (antes: re-parse em cada uma)
+    prices = price_corpus() * 1000
+    t_raw = _timeit(lambda: [P.parse_brl.__wrapped__(t) for t in prices], args.repeat)
+    print(f"parse_brl sem memo: {len(prices) / t_raw:,.0f} preços/s ({len(prices)} textos do corpus)")
+    offers = [{"price": t} for t in prices]
+    t_reparse = _timeit(lambda: [P.parse_brl.__wrapped__(o["price"]) for o in offers for _ in range(4)], args.repeat)
+    for o in offers:
+        P.offer_price_int(o)
+    t_once = _timeit(lambda: [P.offer_price_int(o) for o in offers for _ in range(4)], args.repeat)
+    print(f"4 etapas/oferta: re-parse {t_reparse:.4f}s, price_int gravado {t_once:.4f}s ({t_reparse / t_once:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
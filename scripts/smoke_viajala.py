@@ -6,7 +6,9 @@ if ROOT not in sys.path:
 import json
 import os
 import sys
+import zipfile
 
+from bot import debug_capture
 from bot.browser import open_browser, close_browser
 from bot.viajala_scraper import scrape_with_selenium
 
@@ -35,31 +37,20 @@ def main() -> None:
         print(f"com_airline: {with_airline}")
         print(f"com_duration_min: {with_duration}")
         if total == 0:
-            print("DEBUG: verifique a pasta debug/ (viajala_last.html e viajala_last.png)")
-            debug_dir = os.path.join(os.getcwd(), "debug")
-            try:
-                items = os.listdir(debug_dir)[:3]
-                print("DEBUG FILES:", items)
-            except Exception as e:
-                print("DEBUG FILES: error", e)
-            url_path = os.path.join(debug_dir, "viajala_last_url.txt")
-            try:
-                if os.path.exists(url_path):
-                    with open(url_path, "r", encoding="utf-8") as f:
-                        print("DEBUG URL:", f.read().strip())
-            except Exception as e:
-                print("DEBUG URL: error", e)
-            html_path = os.path.join(debug_dir, "viajala_last.html")
-            try:
-                if os.path.exists(html_path):
-                    with open(html_path, "r", encoding="utf-8") as f:
-                        for _ in range(20):
-                            line = f.readline()
-                            if not line:
-                                break
+            capture = debug_capture.get_capture()
+            capture.flush()
+            bundle = capture.latest("viajala_zero")
+            print("DEBUG BUNDLE:", bundle or f"nenhum (amostrado) em {capture.directory}")
+            if bundle:
+                try:
+                    with zipfile.ZipFile(bundle) as zf:
+                        print("DEBUG FILES:", zf.namelist())
+                        print("DEBUG META:", zf.read("meta.json").decode("utf-8"))
+                        html = zf.read("page.html").decode("utf-8", "ignore") if "page.html" in zf.namelist() else ""
+                        for line in html.splitlines()[:20]:
                             print(line.rstrip())
-            except Exception as e:
-                print("DEBUG HTML: error", e)
+                except Exception as e:
+                    print("DEBUG BUNDLE: error", e)
     finally:
         close_browser(driver)
 
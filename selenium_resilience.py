@@ -1,8 +1,7 @@
-import os
 import time
 import logging
 import traceback
-from selenium.common.exceptions import WebDriverException
+from bot.debug_capture import DebugCapture
 
 class SeleniumResilience:
     def __init__(self, driver, rate_limit=0.5, max_retries=3, backoff_factor=2, log_path="selenium_resilience.log", debug_dir="debug_selenium"):
@@ -12,7 +11,8 @@ class SeleniumResilience:
         self.backoff_factor = backoff_factor
         self.log_path = log_path
         self.debug_dir = debug_dir
-        os.makedirs(debug_dir, exist_ok=True)
+        # Captura amostrada e gravada em segundo plano: não atrasa o retry
+        self.capture = DebugCapture(debug_dir)
         logging.basicConfig(filename=log_path, level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 
     def run_action(self, action, *args, **kwargs):
@@ -34,15 +34,8 @@ class SeleniumResilience:
                 delay *= self.backoff_factor
 
     def _capture_debug(self, prefix):
-        try:
-            screenshot_path = os.path.join(self.debug_dir, f"{prefix}.png")
-            html_path = os.path.join(self.debug_dir, f"{prefix}.html")
-            self.driver.save_screenshot(screenshot_path)
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
-            logging.info(f"Screenshot salvo em {screenshot_path}, HTML salvo em {html_path}")
-        except WebDriverException as e:
-            logging.error(f"Falha ao capturar debug: {e}")
+        if self.capture.capture("selenium_retry", self.driver, tag=prefix):
+            logging.info(f"Captura de debug enfileirada em {self.debug_dir} ({prefix})")
 
 # Exemplo de uso:
 # resilience = SeleniumResilience(driver, rate_limit=0.7)
@@ -5,6 +5,9 @@ import os
 import json
 import time
 import sqlite3  # <-- Adicione/mova esta linha para o topo
+import sys
+
+from bot.metrics import DB_SECONDS
 # ====== ENVIOS POR GRUPO (JANELA/HORA) ======
 _send_lock = threading.Lock()
 import threading
@@ -182,6 +185,22 @@ SCHEMA_VERSION = 4
 def _get_db_path(path: Optional[str]) -> str:
     return path if path is not None else DB_PATH
 
+class _TimedConnection(sqlite3.Connection):
+    """`with conn:` mede a operação (kiwi_bot_db_op_seconds{op=<função que abriu>})."""
+    op = "unknown"
+    _t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        try:
+            return super().__exit__(*exc)
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - self._t0, op=self.op)
+
+
 def _connect(db_path: Optional[str] = None) -> sqlite3.Connection:
     """
     Cria conexão SQLite com WAL + timeout para evitar "database is locked".
@@ -192,7 +211,8 @@ def _connect(db_path: Optional[str] = None) -> sqlite3.Connection:
     - synchronous=NORMAL: menos fsync (ainda seguro)
     """
     path = _get_db_path(db_path)
-    conn = sqlite3.connect(path, timeout=5.0)
+    conn = sqlite3.connect(path, timeout=5.0, factory=_TimedConnection)
+    conn.op = sys._getframe(1).f_code.co_name
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA busy_timeout=5000")
     conn.execute("PRAGMA synchronous=NORMAL")
@@ -464,6 +484,307 @@ def record_route_send(
         conn.commit()
     return {"send_count": send_count, "best_price": best_price, "last_sent_at": ts, "day": day}
 
+
+# ====== EVENTOS DA FILA (runner → sender) ======
+def _ensure_queue_events_table(conn: sqlite3.Connection) -> None:
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS queue_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            grp TEXT,
+            ts INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def record_queue_event(group: Optional[str], db_path: Optional[str] = None) -> int:
+    """Incrementa o contador de mudanças da fila e retorna o novo seq."""
+    now = int(time.time())
+    with _connect(db_path) as conn:
+        _ensure_queue_events_table(conn)
+        cur = conn.cursor()
+        cur.execute("INSERT INTO queue_events (grp, ts) VALUES (?, ?)", (group, now))
+        seq = cur.lastrowid
+        # Mantém só o último dia de eventos
+        cur.execute("DELETE FROM queue_events WHERE ts < ?", (now - 86400,))
+        conn.commit()
+    return seq
+
+
+def get_queue_events_since(seq: int, db_path: Optional[str] = None) -> list:
+    """Retorna [(seq, grp), ...] com seq > seq informado."""
+    with _connect(db_path) as conn:
+        _ensure_queue_events_table(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT seq, grp FROM queue_events WHERE seq > ? ORDER BY seq", (int(seq),))
+        return cur.fetchall()
+
+
+def get_last_queue_event_seq(db_path: Optional[str] = None) -> int:
+    with _connect(db_path) as conn:
+        _ensure_queue_events_table(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(seq) FROM queue_events")
+        row = cur.fetchone()
+    return int(row[0] or 0) if row else 0
+
+def _ensure_provider_breaker_tables(conn: sqlite3.Connection) -> None:
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS provider_breaker (
+            provider TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            trips INTEGER NOT NULL DEFAULT 0,
+            opened_at INTEGER,
+            cooldown_s INTEGER NOT NULL DEFAULT 0,
+            last_reason TEXT,
+            updated_at INTEGER NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS provider_breaker_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            provider TEXT NOT NULL,
+            from_state TEXT NOT NULL,
+            to_state TEXT NOT NULL,
+            reason TEXT,
+            ts INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def get_breaker_state(provider: str, db_path: Optional[str] = None) -> Optional[dict]:
+    with _connect(db_path) as conn:
+        _ensure_provider_breaker_tables(conn)
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT state, failures, trips, opened_at, cooldown_s, last_reason FROM provider_breaker WHERE provider = ?",
+            (provider,),
+        )
+        row = cur.fetchone()
+    if not row:
+        return None
+    return {
+        "state": row[0],
+        "failures": int(row[1] or 0),
+        "trips": int(row[2] or 0),
+        "opened_at": row[3],
+        "cooldown_s": int(row[4] or 0),
+        "last_reason": row[5],
+    }
+
+
+def save_breaker_state(
+    provider: str,
+    state: dict,
+    transition: Optional[tuple] = None,
+    db_path: Optional[str] = None,
+) -> None:
+    """Grava o estado do breaker; transition=(de, para, motivo) registra o evento."""
+    now = int(time.time())
+    with _connect(db_path) as conn:
+        _ensure_provider_breaker_tables(conn)
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO provider_breaker (provider, state, failures, trips, opened_at, cooldown_s, last_reason, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(provider) DO UPDATE SET
+                state = excluded.state,
+                failures = excluded.failures,
+                trips = excluded.trips,
+                opened_at = excluded.opened_at,
+                cooldown_s = excluded.cooldown_s,
+                last_reason = excluded.last_reason,
+                updated_at = excluded.updated_at
+            """,
+            (
+                provider,
+                state.get("state"),
+                int(state.get("failures") or 0),
+                int(state.get("trips") or 0),
+                state.get("opened_at"),
+                int(state.get("cooldown_s") or 0),
+                state.get("last_reason"),
+                now,
+            ),
+        )
+        if transition:
+            from_state, to_state, reason = transition
+            cur.execute(
+                "INSERT INTO provider_breaker_events (provider, from_state, to_state, reason, ts) VALUES (?, ?, ?, ?, ?)",
+                (provider, from_state, to_state, reason, now),
+            )
+            # Mantém 30 dias de histórico de transições
+            cur.execute("DELETE FROM provider_breaker_events WHERE ts < ?", (now - 30 * 86400,))
+        conn.commit()
+
+
+def count_breaker_transitions(
+    provider: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    db_path: Optional[str] = None,
+) -> dict:
+    """Retorna {"PROVIDER:DE->PARA": n} das transições registradas."""
+    sql = "SELECT provider, from_state, to_state, COUNT(*) FROM provider_breaker_events WHERE 1=1"
+    params: list = []
+    if provider:
+        sql += " AND provider = ?"
+        params.append(provider)
+    if since_ts is not None:
+        sql += " AND ts >= ?"
+        params.append(int(since_ts))
+    sql += " GROUP BY provider, from_state, to_state"
+    with _connect(db_path) as conn:
+        _ensure_provider_breaker_tables(conn)
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    return {f"{p}:{a}->{b}": int(n) for p, a, b, n in rows}
+
+
+def _ensure_api_templates_table(conn: sqlite3.Connection) -> None:
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS provider_api_templates (
+            provider TEXT PRIMARY KEY,
+            template_json TEXT NOT NULL,
+            learned_at INTEGER NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.commit()
+
+
+def get_api_template(provider: str, db_path: Optional[str] = None) -> Optional[dict]:
+    with _connect(db_path) as conn:
+        _ensure_api_templates_table(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT template_json FROM provider_api_templates WHERE provider = ?", (provider,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    try:
+        return json.loads(row[0])
+    except ValueError:
+        return None
+
+
+def save_api_template(provider: str, template: dict, db_path: Optional[str] = None) -> None:
+    """Grava (ou substitui) o template de replay HTTP do provider e zera as falhas."""
+    with _connect(db_path) as conn:
+        _ensure_api_templates_table(conn)
+        conn.execute(
+            """
+            INSERT INTO provider_api_templates (provider, template_json, learned_at, failures)
+            VALUES (?, ?, ?, 0)
+            ON CONFLICT(provider) DO UPDATE SET
+                template_json = excluded.template_json,
+                learned_at = excluded.learned_at,
+                failures = 0
+            """,
+            (provider, json.dumps(template, ensure_ascii=False), int(time.time())),
+        )
+        conn.commit()
+
+
+def record_api_template_result(provider: str, ok: bool, max_failures: int, db_path: Optional[str] = None) -> int:
+    """
+    Registra o resultado de um replay: sucesso zera as falhas; falhas seguidas
+    chegando a max_failures descartam o template. Retorna as falhas acumuladas.
+    """
+    with _connect(db_path) as conn:
+        _ensure_api_templates_table(conn)
+        cur = conn.cursor()
+        if ok:
+            cur.execute("UPDATE provider_api_templates SET failures = 0 WHERE provider = ?", (provider,))
+            conn.commit()
+            return 0
+        cur.execute("UPDATE provider_api_templates SET failures = failures + 1 WHERE provider = ?", (provider,))
+        cur.execute("SELECT failures FROM provider_api_templates WHERE provider = ?", (provider,))
+        row = cur.fetchone()
+        failures = int(row[0]) if row else 0
+        if row and failures >= max_failures:
+            cur.execute("DELETE FROM provider_api_templates WHERE provider = ?", (provider,))
+        conn.commit()
+    return failures
+
+
+def _ensure_scrape_cache_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            provider TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            dest TEXT NOT NULL,
+            depart_date TEXT NOT NULL,
+            fetched_at INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            PRIMARY KEY (provider, origin, dest, depart_date)
+        )
+    """)
+    conn.commit()
+
+
+def get_scrape_cache(
+    provider: str,
+    origin: str,
+    dest: str,
+    depart_date: str,
+    max_age_seconds: int,
+    db_path: Optional[str] = None,
+) -> Optional[dict]:
+    """Resultado de scrape guardado há no máximo max_age_seconds (payload zlib+JSON)."""
+    import zlib
+
+    with _connect(db_path) as conn:
+        _ensure_scrape_cache_table(conn)
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT fetched_at, payload FROM scrape_cache
+            WHERE provider = ? AND origin = ? AND dest = ? AND depart_date = ? AND fetched_at >= ?
+            """,
+            (provider, origin, dest, depart_date, int(time.time()) - int(max_age_seconds)),
+        )
+        row = cur.fetchone()
+    if not row:
+        return None
+    try:
+        data = json.loads(zlib.decompress(row[1]).decode("utf-8"))
+    except (zlib.error, ValueError):
+        return None
+    data["fetched_at"] = int(row[0])
+    return data
+
+
+def save_scrape_cache(provider: str, origin: str, dest: str, depart_date: str, data: dict, db_path: Optional[str] = None) -> None:
+    import zlib
+
+    payload = zlib.compress(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+    with _connect(db_path) as conn:
+        _ensure_scrape_cache_table(conn)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO scrape_cache (provider, origin, dest, depart_date, fetched_at, payload)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (provider, origin, dest, depart_date, int(time.time()), sqlite3.Binary(payload)),
+        )
+        conn.commit()
+
+
+def prune_scrape_cache(older_than_seconds: int = 86400, db_path: Optional[str] = None) -> int:
+    with _connect(db_path) as conn:
+        _ensure_scrape_cache_table(conn)
+        cur = conn.cursor()
+        cur.execute("DELETE FROM scrape_cache WHERE fetched_at < ?", (int(time.time()) - int(older_than_seconds),))
+        conn.commit()
+        return cur.rowcount
+
+
 def make_offer_hash(
     trip_type: str,
     origin: str,
@@ -547,6 +868,103 @@ def mark_no_data(origin: str, dest: str, trip_type: str, depart_date: str, retur
     cooldown = now + datetime.timedelta(hours=cooldown_hours)
     _upsert_state(origin, dest, trip_type, depart_date, return_date, "NO_DATA", None, cooldown, db_path=db_path)
 
+def write_batch(states: list = (), samples: list = (), seen: list = (), db_path: Optional[str] = None) -> None:
+    """
+    Grava numa transação só o que o write-behind acumulou:
+      - states: (origin, dest, trip_type, depart_date, return_date, status, best_price, last_checked_at, cooldown_until)
+      - samples: (route_key, trip_type, price, ts)
+      - seen: (key, ts)
+    """
+    if not (states or samples or seen):
+        return
+    with _connect(db_path) as conn:
+        cur = conn.cursor()
+        if states:
+            cur.executemany("""
+                INSERT INTO route_date_state(origin,dest,trip_type,depart_date,return_date,status,best_price,last_checked_at,cooldown_until)
+                VALUES(?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(origin,dest,trip_type,depart_date,return_date) DO UPDATE SET
+                    status=excluded.status,
+                    best_price=excluded.best_price,
+                    last_checked_at=excluded.last_checked_at,
+                    cooldown_until=excluded.cooldown_until
+            """, states)
+        if samples:
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS price_samples (
+                    route_key TEXT,
+                    trip_type TEXT,
+                    price INTEGER,
+                    ts TEXT
+                )
+            ''')
+            cur.executemany("INSERT INTO price_samples (route_key, trip_type, price, ts) VALUES (?, ?, ?, ?)", samples)
+            cutoff = (datetime.datetime.now() - datetime.timedelta(days=90)).isoformat(timespec="seconds")
+            cur.execute("DELETE FROM price_samples WHERE ts < ?", (cutoff,))
+        if seen:
+            cur.executemany('''
+                INSERT INTO seen_dedupe (key, first_seen_ts, last_seen_ts)
+                VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET last_seen_ts=excluded.last_seen_ts
+            ''', [(key, ts, ts) for key, ts in seen])
+        conn.commit()
+
+def record_calendar_prices(
+    origin: str,
+    dest: str,
+    prices: dict,
+    ceiling: Optional[int],
+    cooldown_hours: int = 12,
+    db_path: Optional[str] = None,
+    sample_dates=None,
+) -> int:
+    """
+    Grava de uma vez os menores preços por data do calendário (OW):
+    as datas de sample_dates (todas, se None) viram amostra em price_samples;
+    as acima do teto ficam BAD com cooldown (sem encurtar um cooldown maior
+    já existente; ceiling None = só amostras). Datas abaixo do teto não mudam
+    de estado: vão para o scrape detalhado.
+    Retorna quantas datas ficaram em cooldown.
+    """
+    now = datetime.datetime.now()
+    now_iso = _iso_from_dt(now)
+    cooldown_iso = _iso_from_dt(now + datetime.timedelta(hours=cooldown_hours))
+    route_key = f"{origin}-{dest}"
+    above = [] if ceiling is None else [(d, p) for d, p in sorted(prices.items()) if p > ceiling]
+    samples = prices.values() if sample_dates is None else [prices[d] for d in sample_dates if d in prices]
+    with _connect(db_path) as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS price_samples (
+                route_key TEXT,
+                trip_type TEXT,
+                price INTEGER,
+                ts TEXT
+            )
+        ''')
+        cur.executemany(
+            "INSERT INTO price_samples (route_key, trip_type, price, ts) VALUES (?, 'OW', ?, ?)",
+            [(route_key, int(p), now_iso) for p in samples],
+        )
+        for depart_date, price in above:
+            # return_date NULL não conflita na PK: troca a linha na mão
+            cur.execute("""
+                SELECT MAX(cooldown_until) FROM route_date_state
+                WHERE origin=? AND dest=? AND trip_type='OW' AND depart_date=? AND return_date IS NULL
+            """, (origin, dest, depart_date))
+            row = cur.fetchone()
+            until = max(cooldown_iso, row[0]) if row and row[0] else cooldown_iso
+            cur.execute("""
+                DELETE FROM route_date_state
+                WHERE origin=? AND dest=? AND trip_type='OW' AND depart_date=? AND return_date IS NULL
+            """, (origin, dest, depart_date))
+            cur.execute("""
+                INSERT INTO route_date_state(origin,dest,trip_type,depart_date,return_date,status,best_price,last_checked_at,cooldown_until)
+                VALUES(?,?,'OW',?,NULL,'BAD',?,?,?)
+            """, (origin, dest, depart_date, int(price), now_iso, until))
+        conn.commit()
+    return len(above)
+
 def is_announced(offer_hash: str, db_path: Optional[str] = None) -> bool:
     """Verifica se oferta (identificada por hash que INCLUI link) já foi anunciada."""
     with _connect(db_path) as conn:
@@ -647,6 +1065,310 @@ def get_rt_avg_price(
 
     return int(round(avg_price)), int(samples)
 
+def rt_add_history(origin: str, dest: str, depart_date: str, return_date: str, price: int, db_path: Optional[str] = None) -> None:
+    with _connect(db_path) as conn:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO rt_price_history (origin, dest, depart_date, return_date, price, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (origin, dest, depart_date, return_date, price, _now_iso()),
+        )
+        conn.commit()
+
+
+def get_rt_pair_prices(origin: str, dest: str, max_age_days: int = 7, db_path: Optional[str] = None) -> dict:
+    """{(ida, volta): menor preço RT visto nos últimos max_age_days}."""
+    cutoff = _iso_from_dt(datetime.datetime.now() - datetime.timedelta(days=max_age_days))
+    with _connect(db_path) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT depart_date, return_date, MIN(price) FROM rt_price_history
+            WHERE origin=? AND dest=? AND checked_at >= ?
+            GROUP BY depart_date, return_date
+            """,
+            (origin, dest, cutoff),
+        )
+        return {(d, r): int(p) for d, r, p in cur.fetchall()}
+
+
+def get_ow_best_prices(origin: str, dest: str, max_age_days: int = 3, db_path: Optional[str] = None) -> dict:
+    """
+    {data: menor preço OW recente} juntando route_date_state (best_price) e o
+    cache de scrape (min_price de qualquer provider).
+    """
+    import zlib
+
+    cutoff_dt = datetime.datetime.now() - datetime.timedelta(days=max_age_days)
+    prices: dict = {}
+
+    def _keep(day: str, price) -> None:
+        if price is not None and price > 0 and (day not in prices or price < prices[day]):
+            prices[day] = int(price)
+
+    with _connect(db_path) as conn:
+        _ensure_scrape_cache_table(conn)
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT depart_date, MIN(best_price) FROM route_date_state
+            WHERE origin=? AND dest=? AND trip_type='OW' AND best_price IS NOT NULL AND last_checked_at >= ?
+            GROUP BY depart_date
+            """,
+            (origin, dest, _iso_from_dt(cutoff_dt)),
+        )
+        for day, price in cur.fetchall():
+            _keep(day, price)
+        cur.execute(
+            "SELECT depart_date, payload FROM scrape_cache WHERE origin=? AND dest=? AND fetched_at >= ?",
+            (origin, dest, int(cutoff_dt.timestamp())),
+        )
+        for day, payload in cur.fetchall():
+            try:
+                _keep(day, json.loads(zlib.decompress(payload).decode("utf-8")).get("min_price"))
+            except (zlib.error, ValueError):
+                continue
+    return prices
+
+# ====== SHARE LINKS (cache por offer_id) ======
+
+def _ensure_share_links_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS share_links (
+            offer_id TEXT PRIMARY KEY,
+            link TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def get_share_links(offer_ids: list, max_age_seconds: int, db_path: Optional[str] = None) -> dict:
+    """{offer_id: link} dos ids com link gravado há menos de max_age_seconds."""
+    if not offer_ids:
+        return {}
+    cutoff = int(time.time()) - max_age_seconds
+    marks = ",".join("?" * len(offer_ids))
+    with _connect(db_path) as conn:
+        _ensure_share_links_table(conn)
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT offer_id, link FROM share_links WHERE offer_id IN ({marks}) AND created_at >= ?",
+            (*offer_ids, cutoff),
+        )
+        return dict(cur.fetchall())
+
+
+def save_share_link(offer_id: str, link: str, db_path: Optional[str] = None) -> None:
+    with _connect(db_path) as conn:
+        _ensure_share_links_table(conn)
+        conn.execute(
+            """
+            INSERT INTO share_links (offer_id, link, created_at) VALUES (?, ?, ?)
+            ON CONFLICT(offer_id) DO UPDATE SET link=excluded.link, created_at=excluded.created_at
+            """,
+            (offer_id, link, int(time.time())),
+        )
+        conn.commit()
+
+
+# ====== BACKFILL (bootstrap retomável) ======
+
+def _ensure_backfill_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS backfill_items (
+            job_id TEXT NOT NULL,
+            item_key TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            item_json TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING',  -- PENDING/RUNNING/DONE/FAILED
+            worker TEXT,
+            tries INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            updated_at INTEGER,
+            PRIMARY KEY (job_id, item_key)
+        )
+    """)
+    conn.commit()
+
+
+def backfill_add_items(job_id: str, items: list, db_path: Optional[str] = None) -> int:
+    """Acrescenta itens (dicts com 'key') à lista do job; os já existentes ficam como estão."""
+    with _connect(db_path) as conn:
+        _ensure_backfill_table(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(MAX(seq), 0) FROM backfill_items WHERE job_id = ?", (job_id,))
+        base = cur.fetchone()[0]
+        before = conn.total_changes
+        cur.executemany(
+            "INSERT OR IGNORE INTO backfill_items (job_id, item_key, seq, item_json, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (job_id, item["key"], base + i + 1, json.dumps(item, ensure_ascii=False), int(time.time()))
+                for i, item in enumerate(items)
+            ],
+        )
+        conn.commit()
+        return conn.total_changes - before
+
+
+def backfill_reset_running(job_id: str, db_path: Optional[str] = None) -> int:
+    """Retomada: itens RUNNING de uma execução interrompida voltam a PENDING."""
+    with _connect(db_path) as conn:
+        _ensure_backfill_table(conn)
+        cur = conn.cursor()
+        cur.execute("UPDATE backfill_items SET status = 'PENDING', worker = NULL WHERE job_id = ? AND status = 'RUNNING'", (job_id,))
+        conn.commit()
+        return cur.rowcount
+
+
+def backfill_claim(job_id: str, worker: str, db_path: Optional[str] = None) -> Optional[dict]:
+    """Pega (atomicamente) o próximo item PENDING para o worker; None quando acabou."""
+    with _connect(db_path) as conn:
+        _ensure_backfill_table(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT item_key, item_json, tries FROM backfill_items WHERE job_id = ? AND status = 'PENDING' ORDER BY seq LIMIT 1",
+            (job_id,),
+        )
+        row = cur.fetchone()
+        if not row:
+            conn.commit()
+            return None
+        cur.execute(
+            """
+            UPDATE backfill_items SET status = 'RUNNING', worker = ?, tries = tries + 1, updated_at = ?
+            WHERE job_id = ? AND item_key = ?
+            """,
+            (worker, int(time.time()), job_id, row[0]),
+        )
+        conn.commit()
+    item = json.loads(row[1])
+    item["tries"] = int(row[2]) + 1
+    return item
+
+
+def backfill_finish(job_id: str, item_key: str, status: str, result: Optional[dict] = None, db_path: Optional[str] = None) -> None:
+    """Checkpoint de um item: DONE/FAILED, ou PENDING para tentar de novo (vai para o fim da fila)."""
+    with _connect(db_path) as conn:
+        _ensure_backfill_table(conn)
+        conn.execute(
+            """
+            UPDATE backfill_items SET status = ?, result = ?, updated_at = ?, worker = NULL,
+                seq = CASE WHEN ? = 'PENDING'
+                           THEN (SELECT MAX(seq) + 1 FROM backfill_items WHERE job_id = ?) ELSE seq END
+            WHERE job_id = ? AND item_key = ?
+            """,
+            (
+                status,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                int(time.time()),
+                status,
+                job_id,
+                job_id,
+                item_key,
+            ),
+        )
+        conn.commit()
+
+
+def backfill_progress(job_id: str, db_path: Optional[str] = None) -> dict:
+    with _connect(db_path) as conn:
+        _ensure_backfill_table(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT status, COUNT(*) FROM backfill_items WHERE job_id = ? GROUP BY status", (job_id,))
+        counts = {"PENDING": 0, "RUNNING": 0, "DONE": 0, "FAILED": 0}
+        counts.update({st: n for st, n in cur.fetchall()})
+    return counts
+
+# ====== ADAPT STATE (aprendizado dos scrapers) ======
+
+def _ensure_adapt_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS adapt_state (
+            provider TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value_json TEXT NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (provider, key)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS adapt_counters (
+            provider TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (provider, name)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS selector_stats (
+            provider TEXT NOT NULL,
+            selector TEXT NOT NULL,
+            tries INTEGER NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_hit_at INTEGER,
+            PRIMARY KEY (provider, selector)
+        )
+    """)
+    conn.commit()
+
+
+def adapt_load(provider: str, db_path: Optional[str] = None) -> dict:
+    """{"values": {key: valor}, "counters": {nome: n}, "selectors": {seletor: {"tries", "hits"}}}."""
+    with _connect(db_path) as conn:
+        _ensure_adapt_tables(conn)
+        cur = conn.cursor()
+        cur.execute("SELECT key, value_json FROM adapt_state WHERE provider = ?", (provider,))
+        values = {k: json.loads(v) for k, v in cur.fetchall()}
+        cur.execute("SELECT name, value FROM adapt_counters WHERE provider = ?", (provider,))
+        counters = dict(cur.fetchall())
+        cur.execute("SELECT selector, tries, hits FROM selector_stats WHERE provider = ?", (provider,))
+        selectors = {sel: {"tries": t, "hits": h} for sel, t, h in cur.fetchall()}
+    return {"values": values, "counters": counters, "selectors": selectors}
+
+
+def adapt_write(
+    provider: str,
+    values: Optional[dict] = None,
+    counters: Optional[dict] = None,
+    selectors: Optional[dict] = None,
+    db_path: Optional[str] = None,
+) -> None:
+    """
+    Grava numa transação: values substituem a chave; counters e selectors
+    ({seletor: (tries, hits)}) são incrementos atômicos.
+    """
+    now = int(time.time())
+    with _connect(db_path) as conn:
+        _ensure_adapt_tables(conn)
+        conn.executemany(
+            """
+            INSERT INTO adapt_state (provider, key, value_json, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(provider, key) DO UPDATE SET value_json=excluded.value_json, updated_at=excluded.updated_at
+            """,
+            [(provider, k, json.dumps(v, ensure_ascii=False), now) for k, v in (values or {}).items()],
+        )
+        conn.executemany(
+            """
+            INSERT INTO adapt_counters (provider, name, value) VALUES (?, ?, ?)
+            ON CONFLICT(provider, name) DO UPDATE SET value = value + excluded.value
+            """,
+            [(provider, name, n) for name, n in (counters or {}).items()],
+        )
+        conn.executemany(
+            """
+            INSERT INTO selector_stats (provider, selector, tries, hits, last_hit_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(provider, selector) DO UPDATE SET
+                tries = tries + excluded.tries,
+                hits = hits + excluded.hits,
+                last_hit_at = COALESCE(excluded.last_hit_at, last_hit_at)
+            """,
+            [(provider, sel, t, h, now if h else None) for sel, (t, h) in (selectors or {}).items()],
+        )
+        conn.commit()
+
 # ========================================
 
 def reset_all_state(db_path: Optional[str] = None, also_clear_announcements: bool = True) -> None:
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Test adaptive scraper state in SQLite: atomic counters, cache, selector ranking"""
+import json
+import os
+import tempfile
+import time
+
+import state_store
+from bot import selectors_viajala as SEL
+from bot import viajala_scraper as VS
+from bot.adapt_state import AdaptState
+
+_saved_db = state_store.DB_PATH
+tmp = tempfile.mkdtemp()
+state_store.DB_PATH = os.path.join(tmp, "adapt.db")
+try:
+    # Dois processos (instâncias) incrementando: soma, não última escrita
+    a, b = AdaptState("p"), AdaptState("p")
+    a.incr("airport_url_failed")
+    b.incr("airport_url_failed", 2)
+    a.record_selector("div.x", True)
+    b.record_selector("div.x", False)
+    a.set("preferred", {"SAO": "GRU"})
+    a.flush()
+    b.flush()
+    fresh = AdaptState("p")
+    assert fresh.counter("airport_url_failed") == 3
+    assert fresh.selector_stats("div.x") == {"tries": 2, "hits": 1}
+    assert fresh.get("preferred") == {"SAO": "GRU"} and a.pending() == 0
+    print("✓ counters and selector stats are atomic increments across instances")
+
+    # Migração do JSON antigo na primeira carga
+    legacy = os.path.join(tmp, "legacy.json")
+    with open(legacy, "w", encoding="utf-8") as f:
+        json.dump({"viajala_preferred_dest": {"SAO": "GRU"}, "selector_success": {"div.ok": 4},
+                   "viajala_stats": {"airport_url_failed": 2}}, f)
+    migrated = AdaptState("legacy", legacy_json=legacy)
+    assert migrated.get("viajala_preferred_dest") == {"SAO": "GRU"}
+    assert migrated.counter("airport_url_failed") == 2 and migrated.selector_stats("div.ok")["hits"] == 4
+    print("✓ legacy viajala_adapt.json imported once")
+
+    # Ranking: sem histórico mantém a ordem; o que acerta sobe; o que nunca casa morre
+    s = AdaptState("rank")
+    assert s.rank_selectors(["a", "b", "c"]) == ["a", "b", "c"]
+    for _ in range(20):
+        s.record_selector("a", False)
+        s.record_selector("c", True)
+    assert s.rank_selectors(["a", "b", "c"]) == ["c", "b", "a"]
+    assert s.selector_dead("a") and not s.selector_dead("b") and not s.selector_dead("c")
+    print("✓ selectors ranked by success rate; never-matching ones marked dead")
+
+    # Mudança no DOM: 1000 acertos antigos não seguram o seletor no topo por dezenas de tentativas
+    s = AdaptState("dom")
+    for _ in range(1000):
+        s.record_selector("old", True)
+    s.record_selector("new", True)
+    for misses in range(1, 21):
+        s.record_selector("old", False)
+        if s.rank_selectors(["old", "new"])[0] == "new":
+            break
+    assert misses <= 6, misses
+    assert s.selector_stats("old") == {"tries": 1000 + misses, "hits": 1000}
+    for _ in range(20 - misses):
+        s.record_selector("old", False)
+    assert s.selector_dead("old") and not s.selector_dead("new")
+    s.flush()
+    assert AdaptState("dom").rank_selectors(["old", "new"]) == ["new", "old"]
+    print("✓ selector ranking follows recent history (decay), survives reload")
+
+    # viajala: seletor morto não ganha a espera de 25 s
+    class Driver:
+        def __init__(self, present):
+            self.present = present
+
+        def find_element(self, by, sel):
+            from selenium.common.exceptions import NoSuchElementException
+            if sel not in self.present:
+                raise NoSuchElementException(sel)
+            return object()
+
+        def find_elements(self, by, sel):
+            return [object()] if sel in self.present else []
+
+    VS.ADAPT.legacy_json, saved_legacy = None, VS.ADAPT.legacy_json
+    for _ in range(20):
+        VS.ADAPT.record_selector(SEL.CSS_CARD_RESULT_OW, False)
+    VS.ADAPT.legacy_json = saved_legacy
+    assert VS.ADAPT.rank_selectors(VS.CARD_SELECTORS)[-1] == SEL.CSS_CARD_RESULT_OW
+    t0 = time.time()
+    ranked = list(VS.CARD_SELECTORS)  # OW primeiro, mas morto
+    assert VS._wait_card_selector(Driver({SEL.CSS_CARD_RESULT_ITEM}), ranked) == SEL.CSS_CARD_RESULT_ITEM
+    assert time.time() - t0 < 2
+    VS.ADAPT.flush()
+    assert state_store.adapt_load("viajala")["selectors"][SEL.CSS_CARD_RESULT_OW]["tries"] >= 20
+    print("✓ viajala skips the long wait on dead selectors")
+
+    # Timeout conta o miss uma vez só: o seletor vai para recorded e o loop de alternativas pula
+    saved_wait, VS.ADAPT_CARD_WAIT_SECONDS = VS.ADAPT_CARD_WAIT_SECONDS, 0.1
+    try:
+        recorded = set()
+        top = SEL.CSS_CARD_RESULT_ITEM
+        assert VS._wait_card_selector(Driver(set()), [top, SEL.CSS_CARD_SEGMENTS], recorded) == SEL.CSS_CARD_SEGMENTS
+        assert recorded == {top}
+    finally:
+        VS.ADAPT_CARD_WAIT_SECONDS = saved_wait
+    print("✓ timed-out selector is marked as recorded for the attempt")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ Adapt state OK ✓✓✓")
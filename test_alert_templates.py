@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Test compiled alert templates: byte-for-byte the old builders' output, cached formatting, batch render"""
+import json
+import os
+
+from bot import alert_templates as T
+from bot.formatter import format_flight_alert
+from bot.message_builder import build_grouped_message
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug", "alert_golden.json")
+
+# Saídas gravadas dos builders antigos (f-string por linha), antes dos templates
+with open(GOLDEN, "r", encoding="utf-8") as f:
+    golden = json.load(f)
+
+
+def grouped_kwargs(case):
+    kwargs = dict(case["kwargs"])
+    if kwargs.get("avg_info"):
+        kwargs["avg_info"] = tuple(kwargs["avg_info"])
+    return kwargs
+
+
+for case in golden["grouped"]:
+    assert build_grouped_message(**grouped_kwargs(case)) == case["expected"], case["kwargs"]
+for case in golden["flight_alert"]:
+    assert format_flight_alert([dict(o) for o in case["offers"]]) == case["expected"], case["offers"]
+print(f"✓ {len(golden['grouped'])} grouped + {len(golden['flight_alert'])} alert sets byte-for-byte")
+
+# Lote: mesma saída, data/preço repetidos saem do LRU
+jobs = [grouped_kwargs(case) for case in golden["grouped"]] * 50
+T.date_br.cache_clear()
+T.price_brl.cache_clear()
+assert T.render_grouped_batch(jobs) == [case["expected"] for case in golden["grouped"]] * 50
+info = T.cache_info()
+assert info["date_br"].misses <= 5 and info["date_br"].hits > 400, info["date_br"]
+assert info["price_brl"].misses <= 10, info["price_brl"]
+print("✓ batch render, date/price formatting cached")
+
+# Idioma: variante registrada por cima do 'pt'; idioma desconhecido cai no 'pt'
+T.register_template("OW", "en", header="✈️ {origin} → {dest}\n📅 Date: {depart}\n💰 Best price: R$ {price}\n")
+ow = grouped_kwargs(golden["grouped"][0])
+en = build_grouped_message(**ow, lang="en")
+assert en.startswith("✈️ GRU → BSB\n📅 Date: 29/01/2026\n💰 Best price: R$ 1.234\n—\n1) 06:00-08:00"), en
+assert build_grouped_message(**ow, lang="xx") == golden["grouped"][0]["expected"]
+assert T.price_text(1234) == "R$ 1.234" and T.duration_text(200) == "3h 20m" and T.duration_compact(65) == "1h05"
+print("✓ per-language templates")
+
+print("\n✓✓✓ Alert templates OK ✓✓✓")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test backfill job: persisted work list, parallel workers, retry on dead browser, resume"""
+import datetime
+import os
+import tempfile
+import threading
+
+import state_store
+from bot.backfill import build_items, run_job
+from bot.status_codes import ScrapeReason, ScrapeResult, ScrapeStatus
+
+start = datetime.date(2030, 3, 4)
+items = build_items(
+    "REC", ["SSA", "REC", "FOR"], start, ow_days=3, rt_days=2, rt_nights=[2, 3],
+    ow_ceilings={"SSA": 500}, default_ow_ceiling=800, rt_ceilings={}, default_rt_ceiling=1500,
+)
+assert len(items) == 2 * 3 + 2 * 2 * 2
+assert items[0] == {"key": "OW|REC|SSA|2030-03-04", "kind": "OW", "origin": "REC", "dest": "SSA",
+                    "date": "2030-03-04", "return_date": None, "ceiling": 500}
+assert items[-1]["key"] == "RT|REC|FOR|2030-03-05|2030-03-08"
+print("✓ work list: OW per date, RT per (depart, return), origin skipped")
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "backfill.db")
+try:
+    state_store.setup_database()
+    assert state_store.backfill_add_items("j1", items) == 14
+    assert state_store.backfill_add_items("j1", items) == 0
+
+    lock = threading.Lock()
+    opened, calls = [], {}
+
+    def open_driver():
+        with lock:
+            opened.append(object())
+            return opened[-1]
+
+    def scrape(driver, item):
+        with lock:
+            calls[item["key"]] = calls.get(item["key"], 0) + 1
+            n = calls[item["key"]]
+        if item["date"] == "2030-03-05" and item["kind"] == "OW" and item["dest"] == "SSA" and n == 1:
+            raise RuntimeError("no such window")  # browser morreu: reabre e tenta de novo
+        if item["dest"] == "FOR" and item["kind"] == "OW" and item["date"] == "2030-03-06":
+            return ScrapeResult(status=ScrapeStatus.BLOCKED, reason=ScrapeReason.BLOCKED_CHALLENGE)
+        price = 450 if item["kind"] == "OW" and item["dest"] == "SSA" else 1200
+        return ScrapeResult(status=ScrapeStatus.OK, reason=ScrapeReason.UNKNOWN, flights=[{}], min_price=price)
+
+    summary = run_job("j1", store=state_store, scrape=scrape, open_driver=open_driver,
+                      close_driver=lambda d: None, workers=3, max_tries=2)
+    assert summary["done"] == 13 and summary["failed"] == 1 and summary["retried"] == 2, summary
+    assert summary["searches"] == 16 and summary["per_minute"] > 0
+    assert summary["progress"] == {"PENDING": 0, "RUNNING": 0, "DONE": 13, "FAILED": 1}
+    assert summary["outcomes"] == {"GOOD": 11, "BAD": 2}, summary["outcomes"]
+    assert len(opened) >= 3  # browser inicial + reabertura após exceção e após BLOCKED
+    assert not state_store.should_check("REC", "SSA", "OW", "2030-03-04", None)
+    assert not state_store.should_check("REC", "FOR", "RT", "2030-03-04", "2030-03-06")
+    assert state_store.get_rt_pair_prices("REC", "FOR", max_age_days=1)[("2030-03-04", "2030-03-06")] == 1200
+    print("✓ parallel workers: checkpoints, state written, dead browser reopened, failed after max tries")
+
+    # Retomada: item RUNNING de execução interrompida volta para a fila; DONE não repete
+    state_store.backfill_add_items("j2", items[:3])
+    claimed = state_store.backfill_claim("j2", "w1")
+    assert claimed["key"] == items[0]["key"] and claimed["tries"] == 1
+    calls.clear()
+    summary = run_job("j2", store=state_store, scrape=scrape, open_driver=open_driver,
+                      close_driver=lambda d: None, workers=2, max_tries=2)
+    assert summary["done"] == 3 and set(calls) == {i["key"] for i in items[:3]}
+    summary = run_job("j2", store=state_store, scrape=scrape, open_driver=open_driver,
+                      close_driver=lambda d: None, workers=2, max_tries=2)
+    assert summary["searches"] == 0 and summary["progress"]["DONE"] == 3
+    print("✓ resume: interrupted items re-queued, finished items not repeated")
+
+    # Viajala com 2 workers: page_state é por chamada; o BLOCKED de um não contamina o vazio do outro
+    from bot import providers, rate_limit
+    from bot import viajala_scraper as VS
+
+    class PageDriver:
+        def __init__(self, source, barrier):
+            self.page_source, self.current_url, self.barrier = source, "", barrier
+
+        def get(self, url):
+            first, self.current_url = not self.current_url, url
+            if first:
+                self.barrier.wait(timeout=10)  # as duas buscas começam juntas
+
+        def find_elements(self, *a):
+            return []
+
+        def execute_script(self, *a):
+            return None
+
+    noop = lambda *a, **k: False
+    patched = {name: noop for name in (
+        "_dismiss_interstitials", "_dismiss_overlays", "_try_close_overlay", "_close_viajala_interstitial",
+        "_wait_interstitial_to_clear", "_wait_cards_loaded", "_dismiss_partner_modal", "_partner_modal_visible",
+        "_wait_any_price", "_save_debug_zero")}
+    patched.update(_wait_card_selector=lambda driver, ranked, recorded=None: ranked[0],
+                   _wait_results_stable=lambda *a: True, _ensure_debug_dir=lambda: tempfile.mkdtemp(),
+                   _COOKIES_ACCEPTED=True)
+    saved = {name: getattr(VS, name) for name in patched}
+    saved_rl = rate_limit.RATE_LIMIT_ENABLED
+    for name, value in patched.items():
+        setattr(VS, name, value)
+    rate_limit.RATE_LIMIT_ENABLED = False
+    try:
+        barrier = threading.Barrier(2)
+        drivers = {"blocked": PageDriver("<div>captcha-delivery</div>", barrier), "empty": PageDriver("", barrier)}
+        results = {}
+
+        def worker(name):
+            results[name] = providers.scrape_viajala(drivers[name], "REC", "SSA", "2030-03-04")
+
+        threads = [threading.Thread(target=worker, args=(name,)) for name in drivers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        for name, value in saved.items():
+            setattr(VS, name, value)
+        rate_limit.RATE_LIMIT_ENABLED = saved_rl
+    assert results["blocked"].status == ScrapeStatus.BLOCKED and results["blocked"].debug["page_states"] == ["BLOCKED"]
+    assert results["empty"].status == ScrapeStatus.EMPTY, results["empty"].debug
+    assert results["empty"].reason == ScrapeReason.NO_RESULTS and "BLOCKED" not in results["empty"].debug["page_states"]
+    print("✓ viajala page state is per call: parallel workers don't leak BLOCKED into each other")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ Backfill job OK ✓✓✓")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test calendar mode: per-day prices from date strips prune detail scrapes"""
+import datetime
+import os
+import tempfile
+
+import state_store
+from bot.calendar_mode import parse_calendar_item, calendar_centers, scan_calendar, apply_calendar
+
+ref = datetime.date(2026, 2, 15)
+assert parse_calendar_item("sex, 13 fev\nR$ 512", ref) == ("2026-02-13", 512)
+assert parse_calendar_item("13/02 R$ 1.234", ref) == ("2026-02-13", 1234)
+assert parse_calendar_item("qui 1 de jan R$ 700", datetime.date(2026, 12, 30)) == ("2027-01-01", 700)
+assert parse_calendar_item("13 fev", ref) is None
+print("✓ date strip items parsed (pt month names, dd/mm, year rollover)")
+
+dates = [(datetime.date(2026, 2, 1) + datetime.timedelta(days=i)).isoformat() for i in range(14)]
+assert calendar_centers(dates, span=3) == ["2026-02-04", "2026-02-11"]
+print("✓ 14-day window covered by 2 pages")
+
+fetched = []
+def fetch(origin, dest, center):
+    fetched.append(center)
+    c = datetime.date.fromisoformat(center)
+    return {(c + datetime.timedelta(days=k)).isoformat(): 400 + 50 * abs(k) for k in range(-3, 4)}
+
+prices = scan_calendar(fetch, "REC", "SSA", dates, span=3)
+assert fetched == ["2026-02-04", "2026-02-11"] and len(prices) == 14
+assert prices["2026-02-04"] == 400 and prices["2026-02-01"] == 550
+print("✓ one page per strip, lowest price per day")
+
+attempts = [{"origin": "REC", "dest": "SSA", "date": d, "ceiling": 480} for d in dates]
+kept, reports = apply_calendar(attempts, {("REC", "SSA", d): p for d, p in prices.items()})
+assert [a["date"] for a in kept] == ["2026-02-03", "2026-02-04", "2026-02-05", "2026-02-10", "2026-02-11", "2026-02-12"]
+assert len(reports) == 8 and {r.reason for r in reports} == {"CALENDAR_ABOVE_CEILING"}
+assert kept[1]["calendar_price"] == 400
+print("✓ only dates with calendar price under the ceiling get a detail scrape")
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "calendar.db")
+try:
+    state_store.setup_database()
+    state_store.mark_good("REC", "SSA", "OW", "2026-02-01", None, 300, cooldown_days=5)
+    n = state_store.record_calendar_prices("REC", "SSA", prices, 480, cooldown_hours=12)
+    assert n == 8
+    assert not state_store.should_check("REC", "SSA", "OW", "2026-02-02", None)
+    assert state_store.should_check("REC", "SSA", "OW", "2026-02-04", None)
+    assert state_store.get_stats("REC-SSA", "OW")["n"] == 14
+    with state_store._connect() as conn:
+        rows = conn.execute(
+            "SELECT status, cooldown_until FROM route_date_state WHERE depart_date='2026-02-01'"
+        ).fetchall()
+    assert len(rows) == 1 and rows[0][1] > (datetime.datetime.now() + datetime.timedelta(days=4)).isoformat()
+    print("✓ samples and cooldowns written for the whole window in one go (longer cooldown kept)")
+
+    # Fanout de metrópole: aeroporto só recebe cooldown; amostra só no código buscado e nas datas pedidas
+    assert state_store.record_calendar_prices("REC", "GRU", prices, 480, sample_dates=()) == 8
+    assert state_store.get_stats("REC-GRU", "OW")["n"] == 0
+    assert not state_store.should_check("REC", "GRU", "OW", "2026-02-02", None)
+    assert state_store.record_calendar_prices("REC", "SAO", prices, None, sample_dates=["2026-02-04", "2026-03-01"]) == 0
+    assert state_store.get_stats("REC-SAO", "OW")["n"] == 1
+    assert state_store.should_check("REC", "SAO", "OW", "2026-02-02", None)
+    print("✓ fanout airports get cooldown only; samples stay on the searched code")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ CALENDAR MODE OK ✓✓✓")
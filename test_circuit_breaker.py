@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Test provider circuit breaker transitions, backoff and persistence"""
+import os
+import tempfile
+
+import state_store
+from bot.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, classify_result
+from bot.status_codes import ScrapeResult, ScrapeStatus, ScrapeReason
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "breaker.db")
+
+now = [1_000_000.0]
+clock = lambda: now[0]
+
+OK = ScrapeResult(status=ScrapeStatus.OK, reason=ScrapeReason.UNKNOWN, flights=[{"price_int": 1}])
+EMPTY = ScrapeResult(status=ScrapeStatus.EMPTY, reason=ScrapeReason.NO_RESULTS)
+TIMEOUT = ScrapeResult(status=ScrapeStatus.EMPTY, reason=ScrapeReason.TIMEOUT_WAITING_RESULTS)
+BLOCK = ScrapeResult(status=ScrapeStatus.ERROR, reason=ScrapeReason.BLOCKED_CHALLENGE)
+
+assert classify_result(OK) == "OK" and classify_result(EMPTY) == "OK"
+assert classify_result(TIMEOUT) == "FAILURE" and classify_result(BLOCK) == "BLOCK"
+print("✓ scrape results classified (block / soft failure / ok)")
+
+# Falhas moles abrem só no limite; bloqueio abre na hora
+b = CircuitBreaker("kiwi", store=state_store, failure_threshold=3, base_cooldown=60, max_cooldown=200, clock=clock)
+b.record(TIMEOUT); b.record(TIMEOUT)
+assert b.state == CLOSED and b.allow()
+b.record(EMPTY)  # resposta legítima zera a sequência
+b.record(TIMEOUT); b.record(TIMEOUT)
+assert b.state == CLOSED
+b.record(BLOCK)
+assert b.state == OPEN and not b.allow() and b.remaining_cooldown() == 60
+print("✓ block opens immediately, soft failures need threshold")
+
+# Persistido: novo ciclo (novo objeto) continua aberto
+b2 = CircuitBreaker("kiwi", store=state_store, base_cooldown=60, max_cooldown=200, clock=clock)
+assert b2.state == OPEN and not b2.allow()
+assert CircuitBreaker("viajala", store=state_store, clock=clock).state == CLOSED
+print("✓ state persists across cycles")
+
+# Cooldown vence -> HALF_OPEN libera uma única prova; falha reabre com backoff
+now[0] += 61
+assert b2.allow() and b2.state == HALF_OPEN
+assert not b2.allow(), "only one probe in half-open"
+b2.record(TIMEOUT)
+assert b2.state == OPEN and b2.cooldown_s == 120
+now[0] += 121
+assert b2.allow()
+b2.record(BLOCK)
+assert b2.cooldown_s == 200, "backoff capped at max_cooldown"
+now[0] += 201
+assert b2.allow()
+b2.record(OK)
+assert b2.state == CLOSED and b2.trips == 0 and b2.allow()
+print("✓ half-open probe with exponential backoff, success closes")
+
+counts = state_store.count_breaker_transitions("kiwi")
+assert counts == {
+    "kiwi:CLOSED->OPEN": 1,
+    "kiwi:OPEN->HALF_OPEN": 3,
+    "kiwi:HALF_OPEN->OPEN": 2,
+    "kiwi:HALF_OPEN->CLOSED": 1,
+}, counts
+assert b2.transitions["OPEN->HALF_OPEN"] == 3
+print("✓ transitions counted in memory and in SQLite")
+
+state_store.DB_PATH = _saved_db
+print("\n✓✓✓ Circuit breaker verified ✓✓✓")
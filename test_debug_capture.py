@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test debug capture: sampling, background writer, zip bundles, disk budget"""
+import os
+import tempfile
+import threading
+import zipfile
+
+from bot.debug_capture import DebugCapture
+
+
+class FakeDriver:
+    current_url = "https://example.com/busca"
+    title = "Resultados"
+
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def page_source(self):
+        self.reads += 1
+        return "<html>" + "x" * 5000 + "</html>"
+
+    def get_screenshot_as_png(self):
+        return b"\x89PNG" + os.urandom(2000)
+
+
+tmp = tempfile.mkdtemp()
+drv = FakeDriver()
+cap = DebugCapture(tmp, rates={"zero": 1.0, "never": 0.0}, max_bundles=100, max_bytes=10**9)
+
+# Fora da amostra: nada é lido do browser
+lazy_calls = []
+assert not cap.capture("never", drv, html=lambda: lazy_calls.append(1) or "x")
+assert drv.reads == 0 and not lazy_calls and cap.stats["sampled_out"] == 1
+print("✓ sampled-out capture never touches the driver")
+
+assert cap.capture("zero", drv, tag="REC-SSA", texts=lambda: {"cards.txt": "cards_found=0\n"}, meta={"attempt": 3})
+assert cap.flush() and cap.stats["written"] == 1
+bundle = cap.latest("zero")
+with zipfile.ZipFile(bundle) as zf:
+    names = set(zf.namelist())
+    assert names == {"page.html", "page.png", "cards.txt", "meta.json"}, names
+    assert zf.getinfo("page.html").compress_size < zf.getinfo("page.html").file_size
+    meta = zf.read("meta.json").decode()
+    assert '"current_url": "https://example.com/busca"' in meta and '"attempt": 3' in meta
+assert "_zero_REC-SSA" in os.path.basename(bundle)
+assert cap._thread.name == "debug-capture" and cap._thread is not threading.current_thread()
+print("✓ bundle written by background thread, html compressed")
+
+# Orçamento: só os mais novos ficam
+small = DebugCapture(tempfile.mkdtemp(), rates={"zero": 1.0}, max_bundles=3, max_bytes=10**9)
+for i in range(6):
+    small.capture("zero", drv, tag=f"t{i}")
+    small.flush()
+kept = [os.path.basename(p) for p in small.bundles()]
+assert len(kept) == 3 and all(f"_t{i}" in k for i, k in zip((3, 4, 5), kept)), kept
+assert small.stats["pruned"] == 3
+
+by_bytes = DebugCapture(tempfile.mkdtemp(), rates={"zero": 1.0}, max_bundles=100, max_bytes=6000)
+for i in range(4):
+    by_bytes.capture("zero", drv, tag=f"b{i}")
+    by_bytes.flush()
+assert sum(os.path.getsize(p) for p in by_bytes.bundles()) <= 6000 and by_bytes.bundles()
+print("✓ rotation by bundle count and by total bytes")
+
+# Fila cheia descarta sem bloquear
+blocked = threading.Event()
+full = DebugCapture(tempfile.mkdtemp(), rates={"zero": 1.0}, queue_size=1)
+full._write = lambda job: blocked.wait(5)
+results = [full.capture("zero", html="a") for _ in range(4)]
+assert results[0] and not all(results) and full.stats["dropped"] >= 1
+blocked.set()
+full.flush()
+print("✓ full queue drops instead of blocking the scrape")
+
+print("\n✓✓✓ Debug capture OK ✓✓✓")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Test dedupe_and_rank_batch == dedupe_and_rank on a randomized batch (stdlib and NumPy paths)"""
+import random
+
+from bot import decision_engine as DE
+from bot.offer_model import Offer
+
+AIRLINES = ["GOL", "LATAM", "AZUL", "TAP"]
+
+
+def randomized_batch(n: int, seed: int) -> list:
+    """Lote no formato do scraper: ~30% repetidos, sem preço, next_day, extra_offers e Offer misturado."""
+    rnd = random.Random(seed)
+    base = []
+    for _ in range(int(n * 0.7)):
+        h, m = rnd.randint(0, 23), rnd.choice([0, 15, 30, 45])
+        dur = rnd.choice([None, rnd.randint(60, 1500)])
+        base.append({
+            "airline": rnd.choice(AIRLINES),
+            "dep_time": f"{h:02d}:{m:02d}",
+            "arr_time": f"{(h + (dur or 120) // 60) % 24:02d}:{m:02d}",
+            "duration_min": dur,
+            "stops": rnd.randint(0, 2),
+            "next_day": rnd.random() < 0.2,
+        })
+    offers = []
+    for i in range(n):
+        o = dict(base[i] if i < len(base) else rnd.choice(base))
+        o["price"] = None if rnd.random() < 0.1 else f"R$ {rnd.randint(250, 4500):,}".replace(",", ".")
+        o["link"] = f"https://www.viajala.com.br/x/{i}" if rnd.random() < 0.8 else None
+        o[rnd.choice(["extra_offers", "extra_offers_count"])] = rnd.randint(0, 12)
+        o["raw_text"] = "x" * rnd.randint(0, 40)
+        offers.append(Offer(o) if rnd.random() < 0.3 else o)
+    return offers
+
+
+def same_order(offers, avg_price):
+    ref = DE.dedupe_and_rank(offers, avg_price=avg_price)
+    fast = DE.dedupe_and_rank_batch(offers, avg_price=avg_price)
+    return [DE.fingerprint_offer(o) for o in ref] == [DE.fingerprint_offer(o) for o in fast]
+
+
+paths = [("stdlib", None)]
+if DE.np is not None:
+    paths.append(("numpy", DE.np))
+
+_saved_np = DE.np
+try:
+    for name, module in paths:
+        DE.np = module
+        for seed in range(5):
+            offers = randomized_batch(400, seed)
+            assert any(DE._price_int_from_offer(o) is None for o in offers)
+            for avg_price in (None, 1500.0):
+                assert same_order(offers, avg_price), (name, seed, avg_price)
+        print(f"✓ {name}: same order as dedupe_and_rank (unpriced, avg_price, next_day, extra_offers)")
+finally:
+    DE.np = _saved_np
+
+print("\n✓✓✓ DECISION RANK OK ✓✓✓")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Test early-exit hooks for streaming scrapers"""
+from bot.early_exit import any_of, buckets_filled, k_below_ceiling, sorted_above_ceiling, sorted_page_stop
+
+
+def run(prices, stop):
+    """Simula o loop de cards: entrega a oferta e depois consulta o gancho."""
+    out = []
+    for p in prices:
+        offer = {"price_int": p}
+        out.append(p)
+        if stop is not None and stop(offer):
+            break
+    return out
+
+
+assert run([900, 400, None, 450, 300], k_below_ceiling(2, 500)) == [900, 400, None, 450]
+assert run([300, 450, 520, 600], sorted_above_ceiling(500)) == [300, 450, 520]
+assert run([300, 350], sorted_above_ceiling(500)) == [300, 350]
+print("✓ k below ceiling / sorted page above ceiling")
+
+assert run([300, 450, 520, 600], any_of(None, k_below_ceiling(5, 500), sorted_above_ceiling(500))) == [300, 450, 520]
+assert any_of(None, None) is None
+print("✓ hooks combined")
+
+# Página ordenada (OW): os três períodos <= teto já saíram, o resto não muda a decisão
+cards = [("20:00", 300), ("07:00", 310), ("19:00", 320), ("15:00", 330), ("09:00", 340)]
+read = []
+stop = sorted_page_stop(500)
+for dep, price in cards:
+    read.append(dep)
+    if stop({"dep_time": dep, "price_int": price}):
+        break
+assert read == ["20:00", "07:00", "19:00", "15:00"]
+assert not buckets_filled(500)({"dep_time": "15:00", "price_int": 600})
+assert run([300, 310, 320, 330], sorted_page_stop(500, round_trip=True)) == [300, 310, 320]
+assert sorted_page_stop(None) is None
+print("✓ sorted page stop: day buckets filled (OW) / 3 cheapest (RT)")
+
+print("\n✓✓✓ Early exit OK ✓✓✓")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Test HTTP fast path: CDP capture -> template -> pooled replay -> Selenium fallback (local stand-in server)"""
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import state_store
+from bot import http_fastpath as HF
+from bot import rate_limit
+from bot.network_capture import NetworkCapture, CapturedExchange
+from bot.status_codes import ScrapeResult, ScrapeStatus, ScrapeReason
+
+_saved = (state_store.DB_PATH, rate_limit.RATE_LIMIT_ENABLED)
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "fastpath.db")
+rate_limit.RATE_LIMIT_ENABLED = False
+
+# Respostas gravadas do "provider" (por rota/data)
+RECORDED = {
+    ("REC", "GRU", "2026-02-15"): {"itineraries": [{"price": 420, "dep": "06:10", "arr": "09:25", "carrier": "GOL"}]},
+    ("REC", "GIG", "2026-02-16"): {"itineraries": [{"price": 515, "dep": "07:00", "arr": "10:05", "carrier": "AZUL"},
+                                                   {"price": 480, "dep": "21:30", "arr": "00:40", "carrier": "LATAM"}]},
+    ("REC", "SSA", "2026-02-16"): {"unexpected": True},  # schema mudou
+}
+hits = []
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        q = parse_qs(urlparse(self.path).query)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        key = (q["from"][0], q["to"][0], body["date"])
+        hits.append((key, self.headers.get("X-Api-Key")))
+        if key not in RECORDED:
+            self.send_response(500); self.send_header("Content-Length", "0"); self.end_headers(); return
+        data = json.dumps(RECORDED[key]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *a):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+BASE = f"http://127.0.0.1:{server.server_port}"
+
+spec = HF.ApiSpec(
+    provider="standin",
+    match=lambda url: "/api/search" in url,
+    validate=lambda data: isinstance(data, dict) and isinstance(data.get("itineraries"), list),
+    parse=lambda data, o, d, dt: [
+        {"provider": "standin", "origin": o, "destination": d, "depart_date": dt, "price_int": it["price"],
+         "dep_time": it["dep"], "arr_time": it["arr"], "airline": it["carrier"]}
+        for it in data["itineraries"]
+    ],
+)
+HF.register_api_spec(spec)
+
+# Performance log falso: a página da busca REC->GRU carrega a API
+def perf(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+class FakeDriver:
+    def __init__(self):
+        self.log = []
+        self.bodies = {}
+    def get_log(self, kind):
+        out, self.log = self.log, []
+        return out
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Network.getResponseBody":
+            return {"body": json.dumps(self.bodies[params["requestId"]]), "base64Encoded": False}
+        return {}
+
+selenium_calls = []
+def fake_selenium(driver, origin, dest, date, *, ceiling=None, max_cards=30):
+    selenium_calls.append((origin, dest, date))
+    url = f"{BASE}/api/search?from={origin}&to={dest}&lang=pt"
+    driver.log += [
+        perf("Network.requestWillBeSent", requestId="9", request={"url": f"{BASE}/static/app.js", "method": "GET"}),
+        perf("Network.requestWillBeSent", requestId="1", request={
+            "url": url, "method": "POST", "postData": json.dumps({"date": date, "adults": 1}),
+            "headers": {"Content-Type": "application/json", "X-Api-Key": "k1", "Content-Length": "30"}}),
+        perf("Network.responseReceived", requestId="1", response={"url": url, "status": 200, "mimeType": "application/json"}),
+        perf("Network.loadingFinished", requestId="1"),
+    ]
+    driver.bodies["1"] = RECORDED.get((origin, dest, date), {"itineraries": []})
+    return ScrapeResult(status=ScrapeStatus.OK, reason=ScrapeReason.UNKNOWN, flights=[{"selenium": True}])
+
+# NetworkCapture sozinho: só a API filtrada, com corpo JSON
+drv = FakeDriver()
+cap = NetworkCapture(drv, url_filter=spec.match)
+fake_selenium(drv, "REC", "GRU", "2026-02-15")
+got = cap.poll()
+assert len(got) == 1 and got[0].method == "POST" and got[0].body == RECORDED[("REC", "GRU", "2026-02-15")]
+print("✓ CDP performance log parsed into JSON exchanges")
+
+tpl = HF.learn_template(got[0], "REC", "GRU", "2026-02-15")
+assert "{{origin}}" in tpl.url and "{{dest}}" in tpl.url and "{{date}}" in tpl.body
+assert "Content-Length" not in tpl.headers and tpl.headers["X-Api-Key"] == "k1"
+assert HF.learn_template(CapturedExchange("x", f"{BASE}/api/search?static=1"), "REC", "GRU", "2026-02-15") is None
+print("✓ template learned with route/date placeholders")
+
+# 1ª busca: sem template -> Selenium + aprende
+selenium_calls.clear()
+drv = FakeDriver()
+res = HF.http_first_scrape("standin", fake_selenium, drv, "REC", "GRU", "2026-02-15")
+assert res.debug["mode"] == "selenium" and len(selenium_calls) == 1
+assert state_store.get_api_template("standin") is not None
+print("✓ first search uses Selenium and stores the template")
+
+# 2ª busca (outra rota/data): replay HTTP no stand-in, sem Selenium
+hits.clear()
+res = HF.http_first_scrape("standin", fake_selenium, drv, "REC", "GIG", "2026-02-16")
+assert res.debug["mode"] == "http" and len(selenium_calls) == 1
+assert [o["price_int"] for o in res.flights] == [515, 480] and res.min_price == 480
+assert hits == [(("REC", "GIG", "2026-02-16"), "k1")]
+print("✓ later search replayed over pooled HTTP")
+
+# Schema inválido e HTTP 500 -> fallback Selenium
+res = HF.http_first_scrape("standin", fake_selenium, drv, "REC", "SSA", "2026-02-16")
+assert res.debug["mode"] == "selenium" and len(selenium_calls) == 2
+res = HF.http_first_scrape("standin", fake_selenium, drv, "REC", "FOR", "2026-02-17")
+assert res.debug["mode"] == "selenium" and len(selenium_calls) == 3
+print("✓ invalid schema / HTTP error fall back to Selenium")
+
+# Falhas seguidas descartam o template
+for _ in range(HF.HTTP_FASTPATH_MAX_FAILURES):
+    state_store.record_api_template_result("standin", False, HF.HTTP_FASTPATH_MAX_FAILURES)
+assert state_store.get_api_template("standin") is None
+print("✓ template dropped after repeated failures")
+
+server.shutdown()
+HF.API_SPECS.pop("standin", None)
+state_store.DB_PATH, rate_limit.RATE_LIMIT_ENABLED = _saved
+print("\n✓✓✓ HTTP fast path verified ✓✓✓")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test Offer cached keys: persisted offer_id/dedupe_key must never change"""
+import copy
+import pickle
+
+from bot import dedupe
+from bot.decision_engine import fingerprint_offer, dedupe_and_rank, dedupe_and_rank_batch
+from bot.dedupe import make_offer_id, make_dedupe_key, fast_offer_hash
+from bot.offer_model import Offer
+
+# Chaves gravadas antes do Offer existir (fila / seen_keys no SQLite)
+GOLDEN = [
+    (
+        {"provider": "viajala", "origin": "REC", "destination": "GRU", "depart_date": "2026-02-15",
+         "dep_time": "06:10", "arr_time": "09:25", "airline": "Gol", "duration_min": 195, "stops": 0, "next_day": False},
+        "F_0c78d3d6953175d9e5316aaa1335d01f6344cc07",
+        "viajala|REC|GRU|2026-02-15|06:10|09:25|0|195|0|GOL",
+    ),
+    (
+        {"provider": "viajala", "origin_code": "rec", "dest_code": "mia", "depart_date": "2026-03-01",
+         "dep_time": "23:40", "arr_time": "10:05", "airline": "LATAM ", "duration_min": 927, "stops": 1, "next_day": True},
+        "F_8385b8cd92c432f969b08c20e89e9ae95147abd9",
+        "viajala|||2026-03-01|23:40|10:05|1|925|1|LATAM",
+    ),
+    (
+        {"origin": "SSA", "destination": "LIS", "dep_time": "", "airline": None, "duration_min": None, "stops": None},
+        "F_c8ea9f3d3f2784591fb1cffd638ed5f1f206ab12",
+        "|SSA|LIS||||0|||",
+    ),
+]
+
+for raw, offer_id, group_key in GOLDEN:
+    o = Offer(raw)
+    assert make_offer_id(raw) == offer_id
+    assert o.offer_id == offer_id
+    assert o.dedupe_key() == f"ALERT|WHATSAPP|{offer_id}"
+    assert o.dedupe_key() == make_dedupe_key(offer_id, channel="WHATSAPP", kind="ALERT")
+    assert fingerprint_offer(raw) == group_key
+    assert o.group_key == group_key
+    assert o.group_hash == fast_offer_hash(raw)
+print("✓ persisted keys unchanged (offer_id, dedupe_key, group key)")
+
+# Cache: calculado uma vez
+calls = []
+orig = dedupe.make_offer_fingerprint
+import bot.offer_model as OM
+OM.make_offer_fingerprint = lambda offer: calls.append(1) or orig(offer)
+try:
+    o = Offer(GOLDEN[0][0])
+    o.offer_id
+    o.dedupe_key()
+    o.dedupe_key(channel="WHATSAPP", kind="ALERT")
+    o["price"] = "R$ 399"  # campo fora da identidade: mantém cache
+    o.offer_id
+    assert len(calls) == 1, calls
+    # Campo de identidade muda -> recalcula
+    o["dep_time"] = "07:00"
+    assert o.offer_id == make_offer_id(dict(o))
+    assert len(calls) == 2, calls
+    o.update({"depart_date": "2026-02-16"})
+    assert o.offer_id == make_offer_id(dict(o))
+    assert o.group_key == fingerprint_offer(dict(o))
+finally:
+    OM.make_offer_fingerprint = orig
+print("✓ keys cached and invalidated on identity changes")
+
+# Continua sendo dict: copy/deepcopy/pickle
+o = Offer(GOLDEN[1][0])
+o.offer_id
+c = o.copy()
+assert isinstance(c, Offer) and c.offer_id == o.offer_id and c == o
+assert Offer.wrap(o) is o
+for clone in (copy.deepcopy(o), pickle.loads(pickle.dumps(o))):
+    assert clone == o and clone.offer_id == o.offer_id
+print("✓ Offer behaves like a dict (copy/deepcopy/pickle)")
+
+# Ranking em lote aceita Offer e dict misturados com o mesmo resultado
+flights = [dict(GOLDEN[0][0], price="R$ 500"), Offer(GOLDEN[0][0], price="R$ 450"), dict(GOLDEN[1][0], price="R$ 900")]
+ref = dedupe_and_rank(flights)
+fast = dedupe_and_rank_batch(flights)
+assert [fingerprint_offer(x) for x in ref] == [fingerprint_offer(x) for x in fast]
+assert fast[0]["price_int"] == 450
+print("✓ dedupe_and_rank_batch groups Offer and dict alike")
+
+
+# Colisão de hash não junta itinerários diferentes: agrupa pela tupla
+class _Colliding(Offer):
+    __slots__ = ()
+    group_hash = property(lambda self: 42)
+
+
+pair = [_Colliding(GOLDEN[0][0], price="R$ 500"), _Colliding(GOLDEN[1][0], price="R$ 900")]
+assert pair[0].group_hash == pair[1].group_hash
+assert len(dedupe_and_rank_batch(pair)) == 2
+print("✓ hash collisions keep distinct itineraries apart")
+
+print("\n✓✓✓ Offer keys verified ✓✓✓")
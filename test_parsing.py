@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Test shared parsing module: same results as the old helpers, LRU, batch card parsing"""
+from bot import parsing as P
+from bot import utils_viajala as VU
+from bot.price_extractor import _parse_duration_minutes, extract_price_int_from_text
+from bot.pricing_utils import parse_brl_to_int
+
+# Módulos antigos reexportam as versões de bot.parsing
+assert VU.parse_price_int is P.parse_price_int and parse_brl_to_int is P.parse_brl_to_int
+assert extract_price_int_from_text is P.extract_price_int and _parse_duration_minutes is P.duration_minutes
+
+assert VU.is_time_hhmm("21:20") and not VU.is_time_hhmm("24:00") and not VU.is_time_hhmm("9:30")
+assert VU.parse_duration_min("03h20") == 200 and VU.parse_duration_min("3h 5 min") == 185 and VU.parse_duration_min("") is None
+assert _parse_duration_minutes("26 h 10 min") == 1570
+assert VU.parse_price_int("R$ 1.234,56") == 1234 and VU.parse_price_int("R$ 1.067") == 1067
+assert parse_brl_to_int("R$\xa01.234") == 1234 and parse_brl_to_int("sem preço") == -1
+assert extract_price_int_from_text("BRL 1,234") == 1234 and extract_price_int_from_text("R$ 0") is None
+assert P.evaluate_price_candidate("10x de R$ 50") == (None, "installment")
+assert P.evaluate_price_candidate("R$ 530") == (530, None)
+print("✓ helpers keep the old rules")
+
+P.parse_price_int.cache_clear()
+for _ in range(5):
+    P.parse_price_int("R$ 530")
+info = P.cache_info()["parse_brl"]
+assert info.hits == 4 and info.misses == 1
+print("✓ repeated strings served from LRU")
+
+cards = [
+    "03h20 21:20 REC 00:40 +1 GRU R$ 530 Ver oferta GOL Classic R$ 629 9 ofertas mais",
+    "05h05 | 1 conexão 17:05 REC BSB 22:10 VCP R$ 1.222 Ver oferta Booking.com 6 ofertas mais",
+    "03h20 21:20 REC 00:40 +1 GRU R$ 530 Ver oferta GOL Classic R$ 629 9 ofertas mais",
+]
+parsed = P.parse_card_texts(cards)
+assert parsed[0] == {"duration_min": 200, "dep_time": "21:20", "arr_time": "00:40", "next_day": True,
+                     "price_int": 530, "extra_offers_count": 9}
+assert parsed[1]["duration_min"] == 305 and parsed[1]["price_int"] == 1222 and not parsed[1]["next_day"]
+assert parsed[2] == parsed[0] and parsed[2] is not parsed[0]
+print("✓ batch card parsing")
+
+print("\n✓✓✓ Parsing OK ✓✓✓")
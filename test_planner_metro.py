@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Test metro-area coalescing in the planner (SP/RIO -> one city search per date)"""
+from bot.planner import plan_attempts, coalesce_metro, expand_dests
+from bot.viajala_urls import build_viajala_url_ow
+
+GROUPS = {"SP": ["GRU", "CGH", "VCP"], "RIO": ["GIG", "SDU"]}
+
+class Store:
+    def __init__(self, cooled=()):
+        self.cooled = set(cooled)
+    def is_in_cooldown(self, key):
+        return key in self.cooled
+
+config = {
+    "PRICE_CEILINGS_OW": {"GRU": 650, "CGH": 600, "VCP": 550, "GIG": 650, "SDU": 620},
+    "DEFAULT_PRICE_CEILING_OW": 800,
+    "build_url_ow": build_viajala_url_ow,
+    "depart": "2026-02-15",
+    "destination_groups": GROUPS,
+}
+
+assert expand_dests(["SP", "SSA", "GRU"], GROUPS) == ["GRU", "CGH", "VCP", "SSA"]
+assert coalesce_metro(["GRU", "SSA", "CGH", "GIG"]) == [("SAO", ["GRU", "CGH"]), ("SSA", ["SSA"]), ("GIG", ["GIG"])]
+print("✓ groups expanded and airports coalesced by city")
+
+attempts, reports = plan_attempts(origin="REC", dests=["SP", "RIO", "SSA"], config=config, state_store=Store())
+assert len(attempts) == 6 and not reports
+print("✓ without coalescing every airport is its own attempt")
+
+attempts, reports = plan_attempts(origin="REC", dests=["SP", "RIO", "SSA"], config=dict(config, coalesce_metro=True), state_store=Store())
+assert [(a["dest"], a.get("fanout")) for a in attempts] == [("SAO", ["GRU", "CGH", "VCP"]), ("RIO", ["GIG", "SDU"]), ("SSA", None)]
+sp = attempts[0]
+assert sp["url"] == "https://viajala.com.br/pesquisa-voos/REC-SAO/15-02-2026"
+assert sp["ceilings"] == {"GRU": 650, "CGH": 600, "VCP": 550} and sp["ceiling"] == 650
+print("✓ one city-level attempt per date with per-airport ceilings")
+
+# Cooldown por aeroporto: SDU em cooldown -> GIG buscado direto
+attempts, reports = plan_attempts(
+    origin="REC", dests=["RIO"], config=dict(config, coalesce_metro=True),
+    state_store=Store({"REC|SDU|2026-02-15"}),
+)
+assert [(a["dest"], a.get("fanout")) for a in attempts] == [("GIG", None)]
+assert [(r.dest, r.reason) for r in reports] == [("SDU", "COOLDOWN_ACTIVE")]
+print("✓ airports in cooldown drop out of the fan-out")
+
+print("\n✓✓✓ PLANNER METRO OK ✓✓✓")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test canonical BRL parser against the captured price corpus; price_int parsed once per offer"""
+import os
+
+from bot import parsing as P
+from bot import utils_viajala as VU
+from bot.decision_buckets import pick_best_3_buckets
+from bot.decision_engine import _price_int_from_offer
+from bot.formatter import format_flight_alert
+from bot.price_extractor import extract_price_int_from_text
+from bot.pricing_utils import parse_brl_to_int
+from bot.providers import _normalize_offer
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug", "price_corpus.txt")
+
+
+def load_corpus(path=CORPUS):
+    cases = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            expected, text = line.split(" ::", 1)
+            cases.append((None if expected == "None" else int(expected), text.strip(" ")))
+    return cases
+
+
+cases = load_corpus()
+assert len(cases) >= 25
+for expected, text in cases:
+    got = P.parse_brl(text)
+    assert got == expected, (text, got, expected)
+    # Todas as portas antigas seguem o parser canônico
+    assert VU.parse_price_int(text) == got and extract_price_int_from_text(text) == got
+    assert parse_brl_to_int(text) == (-1 if got is None else got)
+    # Recorte 'R$ ...' do scraper/calendário não pode cortar o milhar ('R$ 1 234' -> 'R$ 1')
+    snippet = P.PRICE_BRL_RE.search(text)
+    if snippet:
+        assert P.parse_brl(snippet.group(0)) == got, (text, snippet.group(0))
+print(f"✓ {len(cases)} corpus cases, all entry points agree")
+
+# Normalização grava price_int; as etapas seguintes não parseiam de novo
+P.parse_brl.cache_clear()
+raw = [
+    {"price": "R$ 1.234,56", "dep_time": "07:00", "arr_time": "10:00", "airline": "GOL"},
+    {"price": "R$ 530", "dep_time": "14:00", "arr_time": "17:00", "airline": "AZUL"},
+    {"price": "R$ 610", "dep_time": "20:00", "arr_time": "23:00", "airline": "LATAM"},
+]
+offers = [_normalize_offer(dict(o), "kiwi", "REC", "GRU", "2030-05-01") for o in raw]
+assert [o["price_int"] for o in offers] == [1234, 530, 610]
+calls = P.parse_brl.cache_info()
+assert calls.hits + calls.misses == 3
+pick_best_3_buckets(offers, ceiling=2000)
+[_price_int_from_offer(o) for o in offers]
+format_flight_alert(offers)
+calls = P.parse_brl.cache_info()
+assert calls.hits + calls.misses == 3, calls
+print("✓ price parsed once at normalization, reused downstream")
+
+# Sem normalização: o primeiro acesso parseia e grava
+loose = {"price": "R$ 2.086"}
+assert P.offer_price_int(loose) == 2086 and loose["price_int"] == 2086
+assert P.offer_price_int({"price": "?"}) is None and P.offer_price_int({"price_int": 0, "price": 0}) is None
+print("✓ offer_price_int fills price_int on first access")
+
+print("\n✓✓✓ Price corpus OK ✓✓✓")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Test provider adapters normalization, fan-out and cross-provider merge"""
+import time
+
+from bot.providers import PROVIDERS, _normalize_offer, scrape_many, merge_provider_offers
+from bot.status_codes import ScrapeResult, ScrapeStatus, ScrapeReason
+
+assert set(PROVIDERS) == {"viajala", "kiwi", "google"}
+
+# Kiwi/Google chegam com texto: normaliza para o formato do viajala
+kiwi = _normalize_offer(
+    {"price_int": 480, "dep_time": "06:10", "arr_time": "09:25", "duration_text": "3h 15min",
+     "stops": "Direto", "airline": "G3", "origin_code": "REC", "dest_code": "GRU"},
+    "kiwi", "REC", "GRU", "2026-02-15",
+)
+assert kiwi["provider"] == "kiwi" and kiwi["destination"] == "GRU" and kiwi["depart_date"] == "2026-02-15"
+assert kiwi["duration_min"] == 195 and kiwi["stops"] == 0 and kiwi["airline"] == "GOL"
+unknown = _normalize_offer({"dep_time": "?", "stops": "?", "airline": "?"}, "kiwi", "REC", "GRU", "2026-02-15")
+assert unknown["dep_time"] is None and unknown["stops"] is None and unknown["airline"] is None
+print("✓ adapters normalize offers to one shape")
+
+# Mesmo itinerário em dois providers: fica o mais barato (link/provider dele)
+viajala = {"provider": "viajala", "origin": "REC", "destination": "GRU", "depart_date": "2026-02-15",
+           "price": 520, "dep_time": "06:10", "arr_time": "09:25", "duration_min": 195, "airline": "GOL",
+           "stops": 0, "link": "https://viajala/x"}
+kiwi["link"] = "https://kiwi/x"
+other = dict(viajala, dep_time="14:00", arr_time="17:20", duration_min=200, price=610)
+merged = merge_provider_offers([viajala, kiwi, other])
+assert len(merged) == 2
+best = [m for m in merged if m["dep_time"] == "06:10"][0]
+assert best["provider"] == "kiwi" and best["link"] == "https://kiwi/x" and best["price_int"] == 480
+assert best["provider_prices"] == {"kiwi": 480, "viajala": 520}
+print("✓ cross-provider merge keeps cheapest per itinerary")
+
+# Fan-out paralelo e isolamento de falhas
+def slow_ok(name, driver):
+    time.sleep(0.3)
+    return ScrapeResult(status=ScrapeStatus.OK, reason=ScrapeReason.UNKNOWN, flights=[{"provider": name}])
+
+def boom(name, driver):
+    raise RuntimeError("window died")
+
+t0 = time.time()
+res = scrape_many({"viajala": None, "kiwi": None, "google": None}, "REC", "GRU", "2026-02-15", call=slow_ok)
+assert time.time() - t0 < 0.8, "providers must run in parallel"
+assert all(r.status is ScrapeStatus.OK for r in res.values())
+res = scrape_many({"viajala": None, "kiwi": None}, "REC", "GRU", "2026-02-15",
+                  call=lambda n, d: boom(n, d) if n == "kiwi" else slow_ok(n, d))
+assert res["viajala"].status is ScrapeStatus.OK and res["kiwi"].status is ScrapeStatus.ERROR
+print("✓ fan-out runs providers in parallel and isolates failures")
+
+print("\n✓✓✓ Provider layer verified ✓✓✓")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test QueueItem row/codec round-trip and legacy queue shapes"""
+import os
+import tempfile
+
+from bot.queue_models import QueueItem, encode_queue, decode_queue, sort_queue
+from bot.queue_store import load_queue_file, save_queue_file, enqueue_message, is_in_queue, remove_from_queue_file
+
+# Round-trip JSON
+item = QueueItem(
+    id="ALERT|WHATSAPP|F_abc",
+    created_ts=1700000000,
+    priority=420,
+    channel="WHATSAPP",
+    text="✈️ REC → GRU",
+    status="APPROVED",
+    meta={"origin": "REC", "dest": "GRU", "min_price": 399},
+    group="SAO PAULO",
+)
+decoded = decode_queue(encode_queue([item]))
+assert len(decoded) == 1
+assert decoded[0].to_row() == item.to_row(), "round-trip must preserve every field"
+assert decoded[0].route == "REC-GRU"
+assert decoded[0].price == 399
+print("✓ JSON round-trip preserves rows")
+
+# Formatos antigos (sender/dict) continuam legíveis
+legacy = [
+    {"offer_hash": "h1", "message": "msg antiga", "priority": "7.5", "created_at": "2026-01-01T10:00:00", "route": "REC-GIG"},
+    {"dedupe_key": "h2", "text": "msg", "min_price": 500.0},
+    {"id": "", "text": "sem id"},
+    "lixo",
+]
+items = decode_queue(encode_queue([QueueItem.from_row(r) for r in legacy if QueueItem.from_row(r)]))
+assert [i.id for i in items] == ["h1", "h2"]
+assert items[0].text == "msg antiga" and items[0].priority == 7.5 and items[0].route == "REC-GIG"
+assert items[1].price == 500
+print("✓ Legacy shapes normalized once by from_row")
+
+# Arquivo: gravação atômica + leitura
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "queue_messages.json")
+    queue = []
+    assert enqueue_message(queue, "oi", "K1", priority=10, meta={"dest": "GRU"}) == "ENQUEUED"
+    assert enqueue_message(queue, "oi", "K1", priority=10) == "DUPLICATE"
+    assert is_in_queue(queue, "K1") and not is_in_queue(queue, "K2")
+    save_queue_file(queue, path)
+    assert not os.path.exists(path + ".tmp")
+    loaded = load_queue_file(path)
+    assert [i.id for i in loaded] == ["K1"] and loaded[0].group == "SAO PAULO"
+    assert load_queue_file(os.path.join(tmp, "missing.json")) == []
+print("✓ Queue file save/load via shared codec")
+
+ordered = sort_queue([
+    QueueItem("a", 2, 1, "WHATSAPP", "t", "PENDING"),
+    QueueItem("b", 1, 5, "WHATSAPP", "t", "APPROVED"),
+    QueueItem("c", 0, 9, "WHATSAPP", "t", "SENT"),
+])
+assert [i.id for i in ordered] == ["b", "a", "c"]
+print("✓ sort_queue orders by status, priority, created_ts")
+
+# Merge com o disco: item que o sender consumiu não volta no save seguinte
+from bot import queue_store
+
+_saved_path = queue_store._queue_path
+with tempfile.TemporaryDirectory() as tmp:
+    qpath = os.path.join(tmp, "queue_messages.json")
+    queue_store._queue_path = lambda: qpath
+    queue_store._PENDING_NOTIFY.clear()  # sem acordar sender/gravar no banco real
+    try:
+        queue, keys = queue_store.load_queue()
+        queue.append(QueueItem("X", 1, 5, "WHATSAPP", "t", "APPROVED"))
+        queue_store.save_queue(queue, loaded_keys=keys)
+        assert [i.id for i in load_queue_file(qpath)] == ["X"]
+        remove_from_queue_file(["X"], qpath)  # sender enviou
+        queue.append(QueueItem("Y", 2, 5, "WHATSAPP", "t", "APPROVED"))
+        queue_store.save_queue(queue, loaded_keys=keys)
+        assert [i.id for i in load_queue_file(qpath)] == ["Y"]
+        assert [i.id for i in queue] == ["Y"]
+    finally:
+        queue_store._queue_path = _saved_path
+print("✓ save_queue does not revive items consumed by the sender")
+
+print("\n✓✓✓ Queue codec verified ✓✓✓")
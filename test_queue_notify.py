@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test queue notify channel: socket wake, coalescing window, polling fallback, sender --follow loop"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import state_store
+from bot import metrics
+from bot.queue_notify import QueueWaiter, notify_queue_changed
+
+
+def later(delay, fn, *args):
+    t = threading.Timer(delay, fn, args)
+    t.start()
+    return t
+
+
+_saved_db = state_store.DB_PATH
+tmp = tempfile.mkdtemp()
+state_store.DB_PATH = os.path.join(tmp, "notify.db")
+sock = os.path.join(tmp, "q.sock")
+try:
+    state_store.setup_database()
+
+    # Socket: acorda bem antes do timeout (o passo sem evento seria de 30s)
+    with QueueWaiter(socket_path=sock, coalesce_seconds=0.05, poll_seconds=2) as waiter:
+        assert waiter._sock is not None
+        t0 = time.time()
+        later(0.2, notify_queue_changed, "g1", sock)
+        woke, groups = waiter.wait(timeout=20)
+        assert woke and groups == {"g1"}, groups
+        assert time.time() - t0 < 2, time.time() - t0
+        print("✓ notify_queue_changed wakes wait() through the socket")
+
+        # Várias notificações dentro da janela: uma volta só, com todos os grupos
+        waiter.coalesce_seconds = 1.0
+        timers = [later(d, notify_queue_changed, g, sock) for d, g in ((0.1, "g1"), (0.3, "g2"), (0.5, None))]
+        woke, groups = waiter.wait(timeout=20)
+        for t in timers:
+            t.join()
+        assert woke and groups == {"g1", "g2", None}, groups
+        assert waiter.wait(timeout=0.3) == (False, set())
+    assert not os.path.exists(sock)
+    print("✓ notifications within coalesce_seconds return once with every group")
+
+    # Sem socket (bind falha): polling do contador ainda entrega
+    no_sock = os.path.join(tmp, "missing", "q.sock")
+    with QueueWaiter(socket_path=no_sock, coalesce_seconds=0.05, poll_seconds=0.1) as waiter:
+        assert waiter._sock is None
+        t0 = time.time()
+        later(0.2, notify_queue_changed, "g3", no_sock)
+        woke, groups = waiter.wait(timeout=20)
+        assert woke and groups == {"g3"} and time.time() - t0 < 2
+    print("✓ without the socket, counter polling still delivers")
+
+    # Sender --follow: passada inicial, nova passada a cada wake, fecha o waiter na saída
+    import whatsapp_sender as WS
+
+    passes, waiters = [], []
+
+    class _Waiter(QueueWaiter):
+        def __init__(self, **kw):
+            super().__init__(socket_path=sock, poll_seconds=0.1, **kw)
+            waiters.append(self)
+
+        def wait(self, timeout):
+            if len(passes) >= 2:
+                raise KeyboardInterrupt
+            later(0.1, notify_queue_changed, "g4", sock)
+            return super().wait(timeout=5)
+
+    saved = (WS.QueueWaiter, WS.send_queue_pass, metrics.start, sys.argv)
+    WS.QueueWaiter = _Waiter
+    WS.send_queue_pass = lambda driver, queue_file, args, budget: passes.append(driver) or 1
+    metrics.start = lambda component: None
+    sys.argv = ["whatsapp_sender.py", "--follow", "--dry-run", "--coalesce", "0.05"]
+    try:
+        WS.main()
+    finally:
+        WS.QueueWaiter, WS.send_queue_pass, metrics.start, sys.argv = saved
+    assert passes == [None, None] and len(waiters) == 1 and waiters[0]._sock is None
+    assert not os.path.exists(sock)
+    print("✓ sender --follow sends again on wake and closes the waiter on exit")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ QUEUE NOTIFY OK ✓✓✓")
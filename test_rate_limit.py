@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Test per-domain token bucket rate limiter"""
+import threading
+import time
+
+from bot import rate_limit
+from bot.rate_limit import TokenBucket, domain_for_url
+
+# Relógio falso: sleep avança o tempo
+now = [0.0]
+slept = []
+def fake_sleep(s):
+    slept.append(s)
+    now[0] += s
+
+bucket = TokenBucket(rate_per_minute=6, burst=2, clock=lambda: now[0], sleep=fake_sleep)
+assert bucket.acquire() == 0 and bucket.acquire() == 0, "burst is free"
+assert abs(bucket.acquire() - 10.0) < 1e-6, "6/min -> 10s per token"
+assert not bucket.try_acquire()
+now[0] += 10
+assert bucket.try_acquire()
+try:
+    bucket.acquire(timeout=1)
+    raise AssertionError("expected TimeoutError")
+except TimeoutError:
+    pass
+print("✓ token bucket honours rate and burst")
+
+assert domain_for_url("https://www.viajala.com.br/pesquisa-voos/x") == "viajala.com.br"
+assert domain_for_url("https://www.kiwi.com/br/search/results/a/b") == "kiwi.com"
+assert domain_for_url("https://www.google.com/travel/flights?q=x") == "google.com"
+assert domain_for_url("https://example.org/x") == "example.org"
+print("✓ URLs map to configured domains")
+
+# Vários workers no mesmo domínio dividem o bucket (tempo real, rate alto)
+shared = TokenBucket(rate_per_minute=600, burst=1)  # 1 token a cada 0.1s
+stamps = []
+lock = threading.Lock()
+def worker():
+    for _ in range(3):
+        shared.acquire()
+        with lock:
+            stamps.append(time.monotonic())
+threads = [threading.Thread(target=worker) for _ in range(3)]
+t0 = time.monotonic()
+for t in threads: t.start()
+for t in threads: t.join()
+elapsed = time.monotonic() - t0
+assert len(stamps) == 9
+assert elapsed >= 0.75, f"9 tokens at 10/s with burst 1 take ~0.8s, got {elapsed:.2f}s"
+print("✓ parallel workers share the domain bucket")
+
+# polite_get pega token antes do driver.get
+class FakeDriver:
+    def __init__(self): self.urls = []
+    def get(self, url): self.urls.append(url)
+_saved = (rate_limit.RATE_LIMIT_ENABLED, rate_limit.RATE_LIMIT_JITTER_SECONDS, dict(rate_limit._BUCKETS))
+rate_limit.RATE_LIMIT_ENABLED, rate_limit.RATE_LIMIT_JITTER_SECONDS = True, 0
+try:
+    d = FakeDriver()
+    rate_limit.polite_get(d, "https://www.kiwi.com/br/")
+    assert d.urls == ["https://www.kiwi.com/br/"] and "kiwi.com" in rate_limit._BUCKETS
+finally:
+    rate_limit.RATE_LIMIT_ENABLED, rate_limit.RATE_LIMIT_JITTER_SECONDS, buckets = _saved
+    rate_limit._BUCKETS.clear()
+    rate_limit._BUCKETS.update(buckets)
+print("✓ polite_get acquires before navigating")
+
+print("\n✓✓✓ Rate limiter verified ✓✓✓")
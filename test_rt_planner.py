@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test RT planner: (depart, return) pairs pruned by one-way / history lower bounds"""
+import datetime
+import os
+import tempfile
+
+import state_store
+from bot.rt_planner import plan_rt_attempts, pair_lower_bound
+
+assert pair_lower_bound("d", "r", {"d": 400}, {"r": 500}, {}, ow_sum_factor=0.85, history_margin=0.2) == 765
+assert pair_lower_bound("d", "r", {"d": 400}, {}, {("d", "r"): 1500}, ow_sum_factor=0.85, history_margin=0.2) == 1200
+assert pair_lower_bound("d", "r", {}, {}, {}, ow_sum_factor=0.85, history_margin=0.2) is None
+print("✓ lower bound from one-way sums and pair history")
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "rt.db")
+try:
+    state_store.setup_database()
+    start = datetime.date.today() + datetime.timedelta(days=1)
+    day = lambda i: (start + datetime.timedelta(days=i)).isoformat()
+    # Ida barata só nos 2 primeiros dias; volta cara no dia 5
+    for i in range(7):
+        state_store.mark_good("REC", "SSA", "OW", day(i), None, 300 if i < 2 else 900)
+    state_store.mark_bad("SSA", "REC", "OW", day(5), None, 1200)
+    state_store.rt_add_history("REC", "SSA", day(0), day(3), 2000)
+
+    config = {
+        "PRICE_CEILINGS_RT": {"SSA": 1000},
+        "nights_options": [2, 3, 5],
+        "horizon_days": 7,
+        "start_offset_days": 1,
+        "max_pairs": 3,
+        "ow_sum_factor": 0.85,
+        "history_margin": 0.2,
+        "build_url_rt": lambda o, d, dep, ret: f"rt://{o}-{d}/{dep}/{ret}",
+    }
+    attempts, reports, counts = plan_rt_attempts(origin="REC", dests=["SSA"], config=config, state_store=state_store)
+    assert counts["pairs"] == 21
+    # volta no dia 5 (soma das idas acima do teto) e par (0,3) pelo histórico
+    assert counts["pruned_bound"] == 4, counts
+    assert counts["pruned_budget"] == 14 and counts["scraped"] == 3
+    assert [(a["date"], a["return_date"]) for a in attempts] == [(day(0), day(2)), (day(1), day(3)), (day(1), day(4))]
+    assert attempts[0]["url"] == f"rt://REC-SSA/{day(0)}/{day(2)}" and attempts[0]["bound"] == 255
+    assert {r.reason for r in reports} == {"RT_BOUND_ABOVE_CEILING", "RT_PAIR_BUDGET"}
+    print("✓ only promising pairs scraped; pruned vs scraped counted")
+
+    state_store.mark_good("REC", "SSA", "RT", day(0), day(2), 800)
+    attempts, _, counts = plan_rt_attempts(origin="REC", dests=["SSA"], config=config, state_store=state_store)
+    assert counts["cooldown"] == 1 and (day(0), day(2)) not in [(a["date"], a["return_date"]) for a in attempts]
+    print("✓ pairs in cooldown skipped")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ RT PLANNER OK ✓✓✓")
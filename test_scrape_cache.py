@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Test scrape result cache: TTL reuse, compressed storage, metro-city split"""
+import os
+import sqlite3
+import tempfile
+
+import state_store
+from bot import scrape_cache as SC
+from bot.status_codes import ScrapeResult, ScrapeStatus, ScrapeReason
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+calls = []
+def fake_scrape(driver, origin, dest, date, *, ceiling=None, max_cards=30):
+    calls.append((dest, max_cards))
+    if dest == "SAO" and date == "2026-02-16":
+        flights = [{"destination": "SAO", "arr_airport": "SAO", "price_int": 290}]  # card só com a cidade
+    elif dest == "SAO":
+        flights = [
+            {"destination": "SAO", "arr_airport": "GRU", "price_int": 410, "dep_time": "06:00"},
+            {"destination": "SAO", "arr_airport": "CGH", "price_int": 380, "dep_time": "07:00"},
+            {"destination": "SAO", "arr_airport": "GRU", "price_int": 520, "dep_time": "19:00"},
+        ]
+    elif dest == "RIO":
+        flights = [{"destination": "RIO", "arr_airport": None, "price_int": 300}]  # sem aeroporto por card
+    elif dest == "BLK":
+        return ScrapeResult(status=ScrapeStatus.BLOCKED, reason=ScrapeReason.BLOCKED_CHALLENGE)
+    else:
+        flights = [{"destination": dest, "price_int": 250}]
+    return ScrapeResult(status=ScrapeStatus.OK, reason=ScrapeReason.UNKNOWN, flights=flights, min_price=0)
+
+try:
+    res = SC.cached_scrape("kiwi", fake_scrape, None, "REC", "SSA", "2026-02-15")
+    assert res.debug["cache"] == "miss" and calls == [("SSA", 30)]
+    res = SC.cached_scrape("kiwi", fake_scrape, None, "REC", "SSA", "2026-02-15")
+    assert res.debug["cache"] == "hit" and len(calls) == 1 and res.flights == [{"destination": "SSA", "price_int": 250}]
+    print("✓ repeated search served from cache within TTL")
+
+    with sqlite3.connect(state_store.DB_PATH) as conn:
+        blob = conn.execute("SELECT payload FROM scrape_cache WHERE dest = 'SSA'").fetchone()[0]
+    assert not bytes(blob).startswith(b"{")
+    assert state_store.get_scrape_cache("kiwi", "REC", "SSA", "2026-02-15", max_age_seconds=-1) is None
+    print("✓ payload stored compressed; expired entries ignored")
+
+    # GRU/CGH/VCP: uma busca SAO, repartida por aeroporto
+    calls.clear()
+    gru = SC.cached_scrape("viajala", fake_scrape, None, "REC", "GRU", "2026-02-15")
+    cgh = SC.cached_scrape("viajala", fake_scrape, None, "REC", "CGH", "2026-02-15")
+    vcp = SC.cached_scrape("viajala", fake_scrape, None, "REC", "VCP", "2026-02-15")
+    assert calls == [("SAO", 90)]
+    assert [o["price_int"] for o in gru.flights] == [410, 520] and gru.min_price == 410
+    assert all(o["destination"] == "GRU" for o in gru.flights)
+    assert [o["price_int"] for o in cgh.flights] == [380]
+    assert vcp.status == ScrapeStatus.EMPTY and vcp.flights == []
+    print("✓ metro city fetched once and split by airport")
+
+    # Cidade sem aeroporto por oferta: cai na busca do aeroporto
+    calls.clear()
+    gig = SC.cached_scrape("viajala", fake_scrape, None, "REC", "GIG", "2026-02-15")
+    assert [c[0] for c in calls] == ["RIO", "GIG"] and gig.flights[0]["destination"] == "GIG"
+    # Bloqueio não vai para o cache
+    SC.cached_scrape("kiwi", fake_scrape, None, "REC", "BLK", "2026-02-15")
+    assert state_store.get_scrape_cache("kiwi", "REC", "BLK", "2026-02-15", 600) is None
+
+    # Card só com o código da cidade ("SAO"): pode ser a mais barata de qualquer aeroporto, não reparte
+    city_only = [{"arr_airport": "GRU", "price_int": 410}, {"arr_airport": "SAO", "price_int": 290}]
+    assert SC.split_by_airport(city_only, "GRU") is None
+    assert SC.split_by_airport(city_only[:1], "GRU") == [{"arr_airport": "GRU", "price_int": 410, "destination": "GRU"}]
+    calls.clear()
+    gru = SC.cached_scrape("viajala", fake_scrape, None, "REC", "GRU", "2026-02-16")
+    assert [c[0] for c in calls] == ["SAO", "GRU"] and gru.flights[0]["destination"] == "GRU"
+    print("✓ unsplittable city falls back to airport; blocked results not cached")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ SCRAPE CACHE OK ✓✓✓")
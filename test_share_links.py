@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Test lazy share-link enrichment: winners only, cached by offer_id, one thread per browser"""
+import copy
+import os
+import tempfile
+import threading
+
+import state_store
+from bot.decision_engine import DecisionEngine
+from bot.enrichment.lazy_share import enrich_winners
+from bot.offer_model import Offer
+
+
+def offer(provider, dep, price, card_index):
+    return Offer({"provider": provider, "origin": "REC", "destination": "SSA", "depart_date": "2030-05-01",
+                  "dep_time": dep, "arr_time": "23:00", "airline": "GOL", "duration_min": 120, "stops": 0,
+                  "price_int": price, "price": f"R$ {price}", "card_index": card_index})
+
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "share.db")
+try:
+    fetched = []
+    threads = set()
+
+    def fetch(driver, o):
+        fetched.append((driver, o["card_index"]))
+        threads.add(threading.current_thread().name)
+        return (f"https://kiwi.com/s/{o['card_index']}", "OK") if o["card_index"] != 2 else (None, "MODAL_NOT_FOUND")
+
+    winners = [offer("kiwi", "06:00", 300, 0), offer("google", "07:00", 310, 1),
+               offer("kiwi", "08:00", 320, 2), offer("viajala", "09:00", 330, 0)]
+    drivers = {"kiwi": "drv-kiwi", "google": "drv-google"}
+    counts = enrich_winners(winners, drivers, store=state_store, fetch=fetch, providers=("kiwi", "google"))
+    assert counts == {"cached": 0, "fetched": 2, "failed": 1}, counts
+    assert winners[0]["share_link"] == "https://kiwi.com/s/0" and winners[1]["share_link"] == "https://kiwi.com/s/1"
+    assert "share_link" not in winners[2] and "share_link" not in winners[3]
+    assert sorted(fetched) == [("drv-google", 1), ("drv-kiwi", 0), ("drv-kiwi", 2)]
+    assert threads and all(t.startswith("share") for t in threads)  # pool só com 2+ browsers
+    print("✓ only winners of enabled providers fetched, one thread per browser")
+
+    # Mesmo itinerário realertado (preço e card diferentes): sai do cache
+    fetched.clear()
+    again = [offer("kiwi", "06:00", 290, 5)]
+    counts = enrich_winners(again, drivers, store=state_store, fetch=fetch, providers=("kiwi", "google"))
+    assert counts["cached"] == 1 and not fetched and again[0]["share_link"] == "https://kiwi.com/s/0"
+    print("✓ re-alert of same offer_id reuses cached link")
+
+    # evaluate_offer_batch: enrich recebe só os vencedores, depois dos dedupes
+    seen = []
+
+    class _Store:
+        def get_stats(self, *a):
+            return {"avg": None, "n": 0}
+
+        def was_seen_recently(self, *a):
+            return False
+
+    flights = [offer("kiwi", f"{h:02d}:00", 300 + h, h) for h in range(6, 16)]
+    before = copy.deepcopy(flights)
+    result = DecisionEngine.evaluate_offer_batch(flights=flights, min_price=306, ceiling=800, origin="REC", dest="SSA",
+                                                 depart_date="2030-05-01", queue=[], state_store=_Store(),
+                                                 enrich=lambda best: (seen.append(best), best[0].update(share_link="x")))
+    assert flights == before  # entrada intacta: price_text/duration_text/share_link só nas cópias dos vencedores
+    assert len(seen) == 1 and 1 <= len(seen[0]) <= 3
+    assert result.should_enqueue and result.reason == "OK"
+    assert result.message_text.startswith("✈️ REC → SSA\n📅 Data: 01/05/2030\n💰 Melhor preço: R$ 306\n")
+    assert "| R$ 306" in result.message_text and "N/A" not in result.message_text
+    print("✓ evaluate_offer_batch enriches copies of the ≤3 bucket winners and builds the OW message")
+finally:
+    state_store.DB_PATH = _saved_db
+
+print("\n✓✓✓ Share links OK ✓✓✓")
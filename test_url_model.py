@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Test learned ordering of viajala fallback URLs (success rate, time to first price, decay, skip)"""
+from bot import url_model
+from bot.viajala_urls import build_viajala_url_ow_with_fallback, viajala_url_dest_code
+
+H = 3600
+urls = build_viajala_url_ow_with_fallback("REC", "GRU", "2030-02-15")
+airport, city = urls
+assert [viajala_url_dest_code(u) for u in urls] == ["GRU", "SAO"]
+
+
+def order(model, now, **kw):
+    return url_model.order(model, "GRU", urls, viajala_url_dest_code, now=now, **kw)
+
+
+# Sem histórico: ordem do builder (aeroporto, cidade)
+assert order({}, 0) == ([airport, city], [])
+
+# Aeroporto falha, cidade funciona: cidade primeiro
+model = {}
+for t in range(3):
+    url_model.observe(model, "GRU", "GRU", False, now=t * H)
+    url_model.observe(model, "GRU", "SAO", True, 8.0, now=t * H)
+assert order(model, 3 * H) == ([city, airport], [])
+print("✓ city URL first after airport URL keeps failing")
+
+# Empate na taxa: menor tempo até o 1º preço primeiro
+tie = {}
+url_model.observe(tie, "GRU", "GRU", True, 12.0, now=0)
+url_model.observe(tie, "GRU", "SAO", True, 4.0, now=0)
+assert order(tie, 0)[0] == [city, airport]
+print("✓ tie broken by time to first price")
+
+# Zero seguidas: aeroporto pulado até o reprobe; nunca pula todas
+url_model.observe(model, "GRU", "GRU", False, now=3 * H)
+assert model["GRU"]["GRU"]["zero_streak"] == 4
+assert order(model, 4 * H) == ([city], [airport])
+assert order(model, 3 * H + 25 * H) == ([city, airport], [])
+all_dead = {"GRU": {c: {"n": 5, "ok": 0, "ttfp": None, "zero_streak": 9, "ts": 0} for c in ("GRU", "SAO")}}
+assert order(all_dead, H)[0] == [airport, city]
+print("✓ consistently empty URL skipped until re-probe; never skips every URL")
+
+# Decaimento: um sucesso recente do aeroporto pesa mais que falhas de semanas atrás
+url_model.observe(model, "GRU", "GRU", True, 5.0, now=30 * 24 * H)
+assert model["GRU"]["GRU"]["zero_streak"] == 0
+assert url_model.success_rate(model["GRU"]["GRU"], 30 * 24 * H) > 0.6
+assert order(model, 30 * 24 * H)[0][0] == airport
+print("✓ old observations decay")
+
+print("\n✓✓✓ URL model OK ✓✓✓")
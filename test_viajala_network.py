@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Test Viajala network mode: offers parsed from the results JSON the page loads (CDP)"""
+import json
+import tempfile
+
+from bot import viajala_api as VA
+from bot import viajala_scraper as VS
+from bot import rate_limit
+from bot.early_exit import k_below_ceiling
+
+# Formatos de resposta (schema não documentado): lista plana e aninhada com segmentos
+FLAT = {"data": {"results": [
+    {"price": 612.4, "departureTime": "2026-02-15T06:10:00", "arrivalTime": "2026-02-15T09:25:00",
+     "airline": "GOL", "duration": 195, "stops": 0, "deeplink": "/redirect/abc"},
+    {"price": {"amount": 498, "currency": "BRL"}, "departure": "21:30", "arrival": "00:40",
+     "carrier": {"name": "LATAM"}, "duration": "PT3H10M", "stops": 1, "bookingUrl": "https://viajala.com.br/r/x"},
+    {"price": {"amount": 99, "currency": "USD"}, "departure": "10:00", "arrival": "12:00"},  # moeda errada
+    {"price": 300, "label": "sem horário"},
+]}}
+NESTED = {"itineraries": [{"totalPrice": "R$ 455", "legs": [
+    {"departure": {"dateTime": "2026-02-15T13:00:00"}, "arrival": "2026-02-15T14:30:00", "carrier": "AZUL"},
+    {"departure": "2026-02-15T15:10:00", "arrival": {"dateTime": "2026-02-15T17:20:00"}},
+], "url": "https://viajala.com.br/r/y"}]}
+
+offers = VA.parse_results(FLAT, "REC", "GRU", "2026-02-15")
+assert [o["price"] for o in offers] == [498, 612]
+cheap = offers[0]
+assert cheap["dep_time"] == "21:30" and cheap["arr_time"] == "00:40" and cheap.get("next_day") is True
+assert cheap["duration_min"] == 190 and cheap["stops"] == 1 and cheap["airline"]
+assert offers[1]["link"] == "https://viajala.com.br/redirect/abc" and "next_day" not in offers[1]
+assert offers[1]["extract_debug"] == {"source": "network"} and offers[1]["destination"] == "GRU"
+print("✓ flat results parsed (price dict, ISO duration, currency filter, next day)")
+
+nested = VA.parse_results(NESTED, "REC", "GRU", "2026-02-15")
+assert len(nested) == 1
+n = nested[0]
+assert (n["price"], n["dep_time"], n["arr_time"], n["stops"]) == (455, "13:00", "17:20", 1)
+print("✓ nested itinerary with legs parsed")
+
+assert VA.looks_like_results(FLAT) and not VA.looks_like_results({"config": {"locale": "pt-BR"}})
+assert VA.is_results_url("https://viajala.com.br/api/search/results?id=1")
+assert not VA.is_results_url("https://viajala.com.br/static/search.js")
+assert not VA.is_results_url("https://www.google-analytics.com/collect?search=1")
+print("✓ results URL / payload detection")
+
+# scrape_with_selenium em modo rede: retorna no 1º JSON, sem tocar no DOM
+def perf(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+class NetDriver:
+    def __init__(self, body):
+        self.body = body
+        self.log = []
+        self.visited = []
+    def get(self, url):
+        self.visited.append(url)
+        api = "https://viajala.com.br/api/search/results?page=1"
+        self.log += [
+            perf("Network.requestWillBeSent", requestId="7", request={"url": api, "method": "GET"}),
+            perf("Network.responseReceived", requestId="7", response={"url": api, "status": 200, "mimeType": "application/json"}),
+            perf("Network.loadingFinished", requestId="7"),
+        ]
+    def get_log(self, kind):
+        out, self.log = self.log, []
+        return out
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Network.getResponseBody":
+            return {"body": json.dumps(self.body), "base64Encoded": False}
+        return {}
+    def find_elements(self, *a):
+        raise AssertionError("DOM não deveria ser consultado no modo rede")
+
+_saved = (VS._ensure_debug_dir, rate_limit.RATE_LIMIT_ENABLED)
+_debug_dir = tempfile.mkdtemp()
+VS._ensure_debug_dir = lambda: _debug_dir
+rate_limit.RATE_LIMIT_ENABLED = False
+try:
+    drv = NetDriver(FLAT)
+    run = VS.PageRun()
+    got = VS.scrape_with_selenium(drv, "REC", "GRU", "2026-02-15", network_mode=True, run=run)
+    assert len(drv.visited) == 1 and [o["price"] for o in got] == [498, 612]
+    assert all(o["confidence"] >= 60 for o in got)
+    assert run.page_states == ["NETWORK_OK"]
+    print("✓ network mode returns offers from the JSON response without DOM scraping")
+
+    # Streaming: iter_offers entrega oferta a oferta e para no gancho
+    stream = VS.iter_offers(NetDriver(FLAT), "REC", "GRU", "2026-02-15", network_mode=True, stop=k_below_ceiling(1, 550))
+    assert [o["price"] for o in stream] == [498]
+    print("✓ iter_offers streams offers and stops on the early-exit hook")
+
+    # stream_viajala: o gancho vê a oferta já normalizada, não o card cru do DOM
+    from bot import providers
+    def raw_cards(driver, origin, dest, depart_date, max_cards=30, network_mode=None, stop=None, run=None):
+        for card in ({"price": "R$ 1.234", "airline": " gol "}, {"price": "R$ 1.500"}):
+            yield dict(card)  # cópia: o gancho não depende da normalização in place do que foi entregue
+            if stop is not None and stop(card):
+                return
+    seen = []
+    hook = lambda o: seen.append((o.get("provider"), o.get("price_int"), o.get("airline"))) or True
+    saved_iter, VS.iter_offers = VS.iter_offers, raw_cards
+    try:
+        got = list(providers.stream_viajala(None, "REC", "GRU", "2026-02-15", stop=hook))
+    finally:
+        VS.iter_offers = saved_iter
+    assert len(seen) == 1 and seen[0][:2] == ("viajala", 1234) and seen[0][2] == got[0]["airline"]
+    assert [o["price_int"] for o in got] == [1234]
+    print("✓ stream_viajala stop hook sees normalized offers")
+finally:
+    VS._ensure_debug_dir, rate_limit.RATE_LIMIT_ENABLED = _saved
+
+print("\n✓✓✓ VIAJALA NETWORK MODE OK ✓✓✓")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Test write-behind store: buffered per-attempt writes, read-your-writes, batched flush"""
+import os
+import tempfile
+
+import state_store
+from bot import viajala_scraper as VS
+from bot.write_behind import WriteBehindStore
+
+_saved_db = state_store.DB_PATH
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "wb.db")
+try:
+    state_store.setup_database()
+    store = WriteBehindStore(state_store, flush_attempts=3, flush_seconds=3600)
+
+    store.mark_good("REC", "SSA", "OW", "2030-01-10", None, 400, cooldown_days=1)
+    store.mark_no_data("REC", "FOR", "RT", "2030-01-10", "2030-01-13", cooldown_hours=6)
+    store.mark_seen("k1")
+    store.record_sample("REC-SSA", "OW", 400)
+    store.record_sample("REC-SSA", "OW", 600)
+    # Nada no SQLite ainda, mas o ciclo já enxerga
+    assert state_store.should_check("REC", "SSA", "OW", "2030-01-10", None)
+    assert not store.should_check("REC", "SSA", "OW", "2030-01-10", None)
+    assert not store.should_check("REC", "FOR", "RT", "2030-01-10", "2030-01-13")
+    assert store.should_check("REC", "SSA", "OW", "2030-01-11", None)
+    assert store.was_seen_recently("k1") and not state_store.was_seen_recently("k1")
+    assert store.get_stats("REC-SSA", "OW") == {"avg": 500, "n": 2}
+    assert store.pending() == 5 and store.flushes == 0
+    print("✓ buffered writes visible to should_check / was_seen_recently / get_stats")
+
+    store.attempt_done()
+    store.attempt_done()
+    assert store.flushes == 0
+    store.attempt_done()
+    assert store.flushes == 1 and store.pending() == 0
+    assert not state_store.should_check("REC", "SSA", "OW", "2030-01-10", None)
+    assert not state_store.should_check("REC", "FOR", "RT", "2030-01-10", "2030-01-13")
+    assert state_store.was_seen_recently("k1")
+    assert state_store.get_stats("REC-SSA", "OW")["n"] == 2
+    # Chamadas não bufferizadas passam direto
+    assert store.make_offer_hash("OW", "REC", "SSA", "2030-01-10", None, 400, None) == \
+        state_store.make_offer_hash("OW", "REC", "SSA", "2030-01-10", None, 400, None)
+    print("✓ flush every N attempts in one batch; other calls delegated")
+
+    # Última escrita da mesma rota/data vence; flush sem nada pendente não grava
+    store.mark_no_data("REC", "SSA", "OW", "2030-01-12", None, cooldown_hours=1)
+    store.mark_good("REC", "SSA", "OW", "2030-01-12", None, 390, cooldown_days=2)
+    store.flush()
+    assert state_store.get_ow_best_prices("REC", "SSA", max_age_days=1)["2030-01-12"] == 390
+    store.flush()
+    assert store.flushes == 2
+    print("✓ last write per key wins; empty flush is a no-op")
+finally:
+    state_store.DB_PATH = _saved_db
+
+# adapt_state do viajala: com buffer, o SQLite só é gravado no flush
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "adapt.db")
+VS.set_adapt_write_behind(True)
+try:
+    VS.ADAPT.set("wb_probe", {"SAO": "GRU"})
+    VS.ADAPT.save()
+    assert VS.ADAPT.pending() == 1 and "wb_probe" not in state_store.adapt_load("viajala")["values"]
+    assert VS.ADAPT.get("wb_probe") == {"SAO": "GRU"}
+    VS.flush_adapt_state()
+    assert state_store.adapt_load("viajala")["values"]["wb_probe"] == {"SAO": "GRU"}
+finally:
+    VS.set_adapt_write_behind(False)
+    state_store.DB_PATH = _saved_db
+print("✓ viajala adapt state written on flush only")
+
+# WRITE_BEHIND_ENABLED desligado: o ciclo usa a mesma interface e grava direto
+from bot import runner
+
+state_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "direct.db")
+runner.WRITE_BEHIND_ENABLED = False
+try:
+    state_store.setup_database()
+    store = runner._open_store()
+    store.attempt_done()
+    store.mark_seen("k_direct")
+    assert state_store.was_seen_recently("k_direct") and store.pending() == 0
+    runner._close_store(store)
+finally:
+    runner.WRITE_BEHIND_ENABLED = True
+    state_store.DB_PATH = _saved_db
+print("✓ write-behind off: attempt_done/flush are no-ops, writes go straight to SQLite")
+
+print("\n✓✓✓ Write-behind OK ✓✓✓")
@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import argparse
 import datetime
-import json
 import os
 import random
 import re
@@ -20,11 +19,16 @@ from selenium.webdriver.support import expected_conditions as EC
 import settings
 import state_store
 
+from bot import metrics
 from bot.browser import open_browser, close_browser
 from bot.config import (
     SEND_TZ, SEND_WINDOWS,
     MIN_SECONDS_BETWEEN_MESSAGES_PER_GROUP,
+    QUEUE_NOTIFY_COALESCE_SECONDS, QUEUE_NOTIFY_IDLE_SECONDS,
 )
+from bot.queue_models import QueueItem
+from bot.queue_notify import QueueWaiter
+from bot.queue_store import export_queue_depth, load_queue_file, save_queue_file, remove_from_queue_file
 from bot.send_rate_control import can_send_group, can_send_route
 
 
@@ -50,71 +54,18 @@ def sanitize_for_chromedriver(text: str) -> str:
     return re.sub(r"[\U00010000-\U0010FFFF]", "", text)
 
 
-def load_queue(path: str) -> list[dict]:
+def load_queue(path: str) -> list[QueueItem]:
     if not os.path.exists(path):
         return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-    except Exception:
-        log("WARN", "queue file missing/corrupt, returning empty queue")
-        return []
-
-    if not isinstance(raw, list):
-        log("WARN", "queue JSON root is not a list, ignoring")
-        return []
-
-    normalized: list[dict] = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-
-        # compat
-        if "text" not in item and "message" in item:
-            item["text"] = item.get("message")
+    queue = load_queue_file(path)
+    if not queue:
+        log("WARN", "queue file missing/corrupt/empty, returning empty queue")
+    export_queue_depth(queue)
+    return queue
 
-        mid = item.get("id") or item.get("offer_hash") or ""
-        text = item.get("text") or ""
-        if not str(mid).strip() or not str(text).strip():
-            continue
 
-        meta = item.get("meta") if isinstance(item.get("meta"), dict) else {}
-        normalized_item = {
-            "id": str(mid),
-            "text": str(text),
-            "priority": float(item.get("priority", 0.0) or 0.0),
-            "created_at": item.get("created_at") or datetime.datetime.now().isoformat(timespec="seconds"),
-            "group": item.get("group") or GROUP_NAME,
-            "meta": meta,
-        }
-
-        # route opcional (rate-limit por rota)
-        route = item.get("route") or meta.get("route")
-        if route:
-            normalized_item["route"] = route
-        else:
-            o = item.get("origin") or meta.get("origin")
-            d = item.get("dest") or meta.get("dest")
-            if o and d:
-                normalized_item["route"] = f"{o}-{d}"
-
-        price = item.get("min_price") or meta.get("min_price") or meta.get("price")
-        if isinstance(price, (int, float)):
-            normalized_item["price"] = int(price)
-
-        normalized.append(normalized_item)
-
-    return normalized
-
-
-def save_queue(queue: list[dict], path: str) -> None:
-    tmp = path + ".tmp"
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(queue, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    os.replace(tmp, path)
+def save_queue(queue: list[QueueItem], path: str) -> None:
+    save_queue_file(queue, path)
 
 
 def open_whatsapp(driver) -> None:
@@ -241,36 +192,129 @@ def can_send_now(group: str, route_key: str | None, *, price: int | None, offer_
     return True, "OK"
 
 
-def group_items(queue: list[dict]) -> dict[str, list[dict]]:
-    by_group: dict[str, list[dict]] = {}
+def group_items(queue: list[QueueItem]) -> dict[str, list[QueueItem]]:
+    by_group: dict[str, list[QueueItem]] = {}
     for it in queue:
-        g = it.get("group") or GROUP_NAME
+        g = it.group or GROUP_NAME
         by_group.setdefault(g, []).append(it)
 
     # prioridade maior primeiro
     for g in by_group:
-        by_group[g].sort(key=lambda x: (-float(x.get("priority", 0.0) or 0.0), x.get("created_at", "")))
+        by_group[g].sort(key=lambda x: (-float(x.priority or 0.0), x.created_ts))
     return by_group
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--dry-run", action="store_true", help="Não envia nada, só imprime")
-    parser.add_argument("--group", default=None, help="Sobrescreve o nome do grupo padrão")
-    args = parser.parse_args()
-
-    queue_file = QUEUE_FILE
+def send_queue_pass(driver, queue_file: str, args, budget: int) -> int:
+    """Uma passada pela fila: envia até `budget` mensagens. Retorna quantas enviou."""
     queue = load_queue(queue_file)
     if not queue:
         log("INFO", "Fila vazia. Nada para enviar.")
-        return
+        return 0
 
     # override opcional de grupo
     if args.group:
         for item in queue:
-            item["group"] = args.group
+            item.group = args.group
 
     messages_by_group = group_items(queue)
+    total_sent = 0
+
+    for group, items in messages_by_group.items():
+        if total_sent >= budget:
+            log("INFO", f"Limite global {MAX_TO_SEND} atingido. Encerrando.")
+            break
+
+        log("INFO", f"Grupo '{group}' com {len(items)} itens")
+
+        if driver and not args.dry_run:
+            if not open_chat_by_name(driver, group):
+                log("WARN", f"Grupo '{group}' não encontrado. Pulando.")
+                continue
+
+        i = 0
+        sent_in_group = 0
+        while i < len(items):
+            if total_sent >= budget:
+                break
+
+            item = items[i]
+            msg = item.text
+            route_key = item.route
+            price = item.price
+
+            offer_hash = item.id
+            allowed, reason = can_send_now(group, route_key, price=price, offer_hash=offer_hash)
+            if not allowed:
+                log("SEND", f"blocked reason={reason} group={group}")
+                break
+
+            if args.dry_run:
+                print(f"\n[DRY-RUN] Grupo '{group}':\n{msg}\n" + "-" * 40)
+                sent_in_group += 1
+                total_sent += 1
+                i += 1
+                continue
+
+            ok = send_message(driver, msg)
+            if not ok:
+                i += 1
+                continue
+
+            if offer_hash:
+                try:
+                    state_store.mark_announced(offer_hash)
+                except Exception as e:
+                    log("WARN", f"mark_announced falhou: {e}")
+
+            if route_key:
+                try:
+                    state_store.record_route_send(route_key, price=price)
+                except Exception as e:
+                    log("WARN", f"record_route_send falhou: {e}")
+
+            metrics.SENDS.inc(group=group)
+            try:
+                state_store.record_group_send(group)
+            except Exception as e:
+                log("WARN", f"record_group_send falhou: {e}")
+
+            # remove da fila (direto no arquivo, sem sobrescrever o que o runner enfileirou)
+            sent_in_group += 1
+            total_sent += 1
+            items.pop(i)
+            remove_from_queue_file([item.id], queue_file)
+
+            delay = random.randint(SEND_DELAY_MIN_SEC, SEND_DELAY_MAX_SEC)
+            log("INFO", f"Enviado {sent_in_group} no grupo '{group}'. Próxima em {delay}s.")
+            time.sleep(delay)
+
+        log("INFO", f"Grupo '{group}' finalizado: {sent_in_group} enviada(s)")
+
+    return total_sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Não envia nada, só imprime")
+    parser.add_argument("--group", default=None, help="Sobrescreve o nome do grupo padrão")
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Fica aberto e acorda quando o runner enfileira (sem esperar o próximo run_all)",
+    )
+    parser.add_argument(
+        "--coalesce",
+        type=float,
+        default=QUEUE_NOTIFY_COALESCE_SECONDS,
+        help="Segundos para juntar alertas seguidos antes de enviar (modo --follow)",
+    )
+    args = parser.parse_args()
+    metrics.start("sender")
+
+    queue_file = QUEUE_FILE
+    if not args.follow and not load_queue(queue_file):
+        log("INFO", "Fila vazia. Nada para enviar.")
+        return
 
     driver = None
     wait = None
@@ -289,93 +333,27 @@ def main():
         open_whatsapp(driver)
 
     total_sent = 0
+    waiter = QueueWaiter(coalesce_seconds=args.coalesce) if args.follow else None
 
     try:
-        for group, items in messages_by_group.items():
-            if total_sent >= MAX_TO_SEND:
-                log("INFO", f"Limite global {MAX_TO_SEND} atingido. Encerrando.")
-                break
-
-            log("INFO", f"Grupo '{group}' com {len(items)} itens")
-
-            if driver and not args.dry_run:
-                if not open_chat_by_name(driver, group):
-                    log("WARN", f"Grupo '{group}' não encontrado. Pulando.")
-                    continue
-
-            i = 0
-            sent_in_group = 0
-            while i < len(items):
-                if total_sent >= MAX_TO_SEND:
-                    break
-
-                item = items[i]
-                msg = item.get("text") or ""
-                route_key = item.get("route") if isinstance(item.get("route"), str) else None
-                price = item.get("price") if isinstance(item.get("price"), int) else None
-
-                offer_hash = item.get("id") or item.get("offer_hash")
-                allowed, reason = can_send_now(group, route_key, price=price, offer_hash=offer_hash)
-                if not allowed:
-                    log("SEND", f"blocked reason={reason} group={group}")
-                    break
-
-                if args.dry_run:
-                    print(f"\n[DRY-RUN] Grupo '{group}':\n{msg}\n" + "-" * 40)
-                    sent_in_group += 1
-                    total_sent += 1
-                    i += 1
-                    continue
-
-                ok = send_message(driver, msg)
-                if not ok:
-                    i += 1
-                    continue
-
-                offer_hash = item.get("id") or item.get("offer_hash")
-                if offer_hash:
-                    try:
-                        state_store.mark_announced(offer_hash)
-                    except Exception as e:
-                        log("WARN", f"mark_announced falhou: {e}")
-
-                if route_key:
-                    try:
-                        state_store.record_route_send(route_key, price=price)
-                    except Exception as e:
-                        log("WARN", f"record_route_send falhou: {e}")
-
-                try:
-                    state_store.record_group_send(group)
-                except Exception as e:
-                    log("WARN", f"record_group_send falhou: {e}")
-
-                # remove da fila
-                sent_in_group += 1
-                total_sent += 1
-                items.pop(i)
-                if item in queue:
-                    queue.remove(item)
-                save_queue(queue, queue_file)
-
-                delay = random.randint(SEND_DELAY_MIN_SEC, SEND_DELAY_MAX_SEC)
-                log("INFO", f"Enviado {sent_in_group} no grupo '{group}'. Próxima em {delay}s.")
-                time.sleep(delay)
-
-                if MIN_SECONDS_BETWEEN_MESSAGES_PER_GROUP and MIN_SECONDS_BETWEEN_MESSAGES_PER_GROUP > 0:
-                    # delay já cobre; mantido por clareza
-                    pass
-
-            log("INFO", f"Grupo '{group}' finalizado: {sent_in_group} enviada(s)")
-
+        total_sent += send_queue_pass(driver, queue_file, args, MAX_TO_SEND)
+        while waiter is not None:
+            woke, groups = waiter.wait(timeout=QUEUE_NOTIFY_IDLE_SECONDS)
+            if woke:
+                log("INFO", f"Fila alterada (grupos={sorted(g or GROUP_NAME for g in groups)}).")
+            # sem evento: passada periódica para pegar janelas de envio que abriram
+            total_sent += send_queue_pass(driver, queue_file, args, MAX_TO_SEND)
+    except KeyboardInterrupt:
+        log("INFO", "Interrompido.")
     finally:
-        if not args.dry_run:
-            save_queue(queue, queue_file)
+        if waiter is not None:
+            waiter.close()
         if driver:
             close_browser(driver)
+        metrics.flush()
 
     log("INFO", f"Finalizado. Total enviadas: {total_sent}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()